@@ -1,7 +1,46 @@
-import pickle
 import tools.helper.py3x2.six as six
 
+from .tokenizer import Position
+
+INIT_TEMPLATE = """def __init__(self%(parameters)s, **extra):
+  if extra:
+    raise ValueError('Extraneous arguments')
+%(assignments)s  self._position = None
+"""
+
+def make_init(attrs):
+  """Generates the __init__ of a node class: every attribute is a
+  positional or keyword parameter defaulting to None."""
+  namespace = {}
+  source = INIT_TEMPLATE % {
+    'parameters': ''.join(', %s=None' % attr for attr in attrs),
+    'assignments': ''.join('  self.%s = %s\n' % (attr, attr) for attr in attrs),
+  }
+  exec(compile(source, '<node __init__>', 'exec'), namespace)
+
+  return namespace['__init__']
+
+# Node class -> node classes that can occur anywhere below one of its nodes
+REACHABLE = {}
+# (node class, searched class) -> attrs that can hold a node of the class
+SEARCHED_ATTRS = {}
+
 class MetaNode(type):
+  """Merges the attrs of a node class with those of its bases, and gives
+  the class __slots__ for the attributes its bases do not store already
+  together with a generated __init__.
+
+  A class that sits next to another node class in a list of bases has to
+  declare an empty __slots__ itself (see tree.Declaration); its attributes
+  are then stored by its subclasses.
+
+  attr_types is merged the same way as attrs.
+  """
+  # Node classes by name, used to rebuild trees from their packed form
+  node_types = {}
+  # Node classes by kind, the code of each class in the binary format
+  node_kinds = []
+
   def __new__(mcs, name, bases, dict):
     attrs = list(dict['attrs'])
     dict['attrs'] = list()
@@ -12,21 +51,56 @@ class MetaNode(type):
     
     dict['attrs'].extend(attrs)
 
-    return type.__new__(mcs, name, bases, dict)
+    attr_types = {}
+    for base in reversed(bases):
+      attr_types.update(getattr(base, 'attr_types', {}))
+    attr_types.update(dict.get('attr_types', {}))
+    dict['attr_types'] = attr_types
+
+    if '__slots__' not in dict:
+      stored = set(slot for base in bases for cls in base.__mro__ for slot in getattr(cls, '__slots__', ()))
+      dict['__slots__'] = tuple(attr for attr in dict['attrs'] if attr not in stored)
+
+    if '__init__' not in dict:
+      dict['__init__'] = make_init(dict['attrs'])
+
+    dict['kind'] = len(mcs.node_kinds)
+
+    node_type = type.__new__(mcs, name, bases, dict)
+    mcs.node_types[name] = node_type
+    mcs.node_kinds.append(node_type)
+    REACHABLE.clear()
+    SEARCHED_ATTRS.clear()
+
+    return node_type
   
+class LineShift(object):
+  """Line delta shared by the positions of the nodes of a region."""
+  __slots__ = ('lines',)
+
+  def __init__(self):
+    self.lines = 0
+
+class ShiftedPosition(object):
+  """Node position whose line is moved by a LineShift, so that moving all
+  the nodes of a region is a single update of the shared delta. It is
+  turned into a Position when read through Node.position."""
+  __slots__ = ('line', 'column', 'shift')
+
+  def __init__(self, line, column, shift):
+    self.line = line
+    self.column = column
+    self.shift = shift
+
+  def resolve(self):
+    return Position(self.line + self.shift.lines, self.column)
+
 @six.add_metaclass(MetaNode)
 class Node(object):
-  attrs = ()
+  __slots__ = ('_position',)
 
-  def __init__(self, **kwargs):
-    values = kwargs.copy()
-
-    for attr_name in self.attrs:
-      value = values.pop(attr_name, None)
-      setattr(self, attr_name, value)
-    
-    if values:
-      raise ValueError('Extraneous arguments')
+  attrs = ()
+  attr_types = {}
   
   def __equals__(self, other):
     if type(other) is not type(self):
@@ -49,9 +123,10 @@ class Node(object):
     return walk_tree(self)
   
   def filter(self, pattern):
-    for path, node in self:
-      if ((isinstance(pattern, type) and isinstance(node, pattern)) or (node == pattern)):
-        yield path, node
+    if isinstance(pattern, type):
+      return filter_tree(self, pattern)
+
+    return ((path, node) for path, node in self if node == pattern)
   
   @property
   def children(self):
@@ -59,25 +134,168 @@ class Node(object):
 
   @property
   def position(self):
-    if hasattr(self, "_position"):
-      return self._position
+    position = self._position
+
+    if isinstance(position, ShiftedPosition):
+      return position.resolve()
+
+    return position
   
 def walk_tree(root):
-  children = None
+  """Yields (path, node) for every node under root in pre-order, where path
+  is the tuple of nodes and lists leading to the node."""
+  stack = [((), root)]
 
-  if isinstance(root, Node):
-    yield (), root
-    children = root.children
-  else:
-    children = root
-  
-  for child in children:
-    if isinstance(child, (Node, list, tuple)):
-      for path, node in walk_tree(child):
-        yield (root,) + path, node
+  while stack:
+    path, value = stack.pop()
+
+    if isinstance(value, Node):
+      yield path, value
+      children = value.children
+    else:
+      children = value
+
+    path += (value,)
+
+    for child in reversed(children):
+      if isinstance(child, (Node, list, tuple)):
+        stack.append((path, child))
+
+def walk_nodes(root):
+  """Yields the nodes under root in the order of walk_tree(), without
+  their paths."""
+  stack = [root]
+
+  while stack:
+    value = stack.pop()
+
+    if isinstance(value, Node):
+      yield value
+      children = value.children
+    else:
+      children = value
+
+    for child in reversed(children):
+      if isinstance(child, (Node, list, tuple)):
+        stack.append(child)
+
+def attr_node_types(node_type, attr):
+  """Node classes that attr of node_type can hold directly."""
+  names = node_type.attr_types.get(attr)
+  node_types = MetaNode.node_types.values()
+
+  if names is None:
+    return set(node_types)
+
+  bases = tuple(MetaNode.node_types[name] for name in names)
+
+  return set(t for t in node_types if bases and issubclass(t, bases))
+
+def reachable_types(node_type):
+  """Node classes that can occur below a node of node_type, found from the
+  attr_types of the classes its attrs can hold."""
+  if not REACHABLE:
+    direct = dict((t, set().union(*[attr_node_types(t, attr) for attr in t.attrs]))
+                  for t in MetaNode.node_types.values())
+
+    for t in direct:
+      reachable = set()
+      stack = list(direct[t])
+
+      while stack:
+        child = stack.pop()
+
+        if child not in reachable:
+          reachable.add(child)
+          stack.extend(direct[child])
+
+      REACHABLE[t] = frozenset(reachable)
+
+  return REACHABLE[node_type]
+
+def searched_attrs(node_type, pattern):
+  """The attrs of node_type under which a node of class pattern can occur."""
+  try:
+    return SEARCHED_ATTRS[node_type, pattern]
+  except KeyError:
+    pass
+
+  attrs = list()
+
+  for attr in node_type.attrs:
+    for t in attr_node_types(node_type, attr):
+      if issubclass(t, pattern) or any(issubclass(r, pattern) for r in reachable_types(t)):
+        attrs.append(attr)
+        break
+
+  attrs = SEARCHED_ATTRS[node_type, pattern] = tuple(attrs)
+
+  return attrs
+
+def filter_tree(root, pattern):
+  """Yields (path, node) like walk_tree() for the nodes under root that are
+  instances of the class pattern, skipping the attrs that cannot hold one."""
+  stack = [((), root)]
+
+  while stack:
+    path, value = stack.pop()
+
+    if isinstance(value, Node):
+      if isinstance(value, pattern):
+        yield path, value
+
+      children = [getattr(value, attr) for attr in searched_attrs(type(value), pattern)]
+    else:
+      children = value
+
+    path += (value,)
+
+    for child in reversed(children):
+      if isinstance(child, (Node, list, tuple)):
+        stack.append((path, child))
 
 def dump(ast, file):
-  pickle.dump(ast, file)
+  """Writes ast to file in the binary format of the binary module."""
+  from .binary import dump
+
+  dump(ast, file)
+
+def load(file, skip_bodies=False):
+  from .binary import load
+
+  return load(file, skip_bodies)
+
+def pack(value):
+  """Converts a tree into nested tuples of plain values.
+
+  Each node becomes a (class name, position, attribute values) tuple, which
+  pickles far smaller and faster than the node objects themselves. Lists
+  are packed item by item; anything else is kept as is.
+  """
+  if isinstance(value, Node):
+    position = value.position
+
+    if position is not None:
+      position = tuple(position)
+
+    return (type(value).__name__, position, tuple(pack(getattr(value, attr)) for attr in value.attrs))
+  elif isinstance(value, list):
+    return [pack(item) for item in value]
+
+  return value
+
+def unpack(value):
+  """Rebuilds the tree packed by pack()."""
+  if isinstance(value, tuple):
+    name, position, values = value
+    node_type = MetaNode.node_types[name]
+    node = node_type(*[unpack(v) for v in values])
+
+    if position is not None:
+      node._position = Position(*position)
+
+    return node
+  elif isinstance(value, list):
+    return [unpack(item) for item in value]
 
-def load(file):
-  return pickle.load(file)
+  return value
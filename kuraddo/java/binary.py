@@ -0,0 +1,464 @@
+"""Compact binary format for syntax trees.
+
+A file is MAGIC, a version byte and a content byte, followed by records
+and closed by an empty record. Each record is its size as a varint
+followed by
+
+  - the node kinds used for the first time: for each, the kind code given
+    by MetaNode, its number of attrs and its class name
+  - the strings used for the first time, each its UTF-8 length and bytes
+  - one value
+
+so a record can be read without the ones after it. A compilation unit is
+written as the unit without its types, then one record per top level type
+declaration; anything else is written as a single record.
+
+Values are a tag byte followed by
+
+  NONE, FALSE, TRUE  nothing
+  INT                the zigzag encoded varint
+  STRING             the varint index of the string in the string table
+  LIST, TUPLE        the varint size of the rest, the item count and items
+  SET                the item count and the items
+  NODE               the varint kind, the varint size of the rest, the
+                     line (0 for none) and column of the position, and
+                     the value of each attr
+
+The sizes let a reader step over a list or node without decoding it.
+"""
+import io
+from itertools import islice
+
+from .ast import MetaNode, Node
+from .tokenizer import Position
+from . import tree
+
+MAGIC = b'KAST'
+VERSION = 1
+
+VALUE, UNIT = 0, 1
+
+NONE, FALSE, TRUE, INT, STRING, LIST, TUPLE, SET, NODE = range(9)
+
+class BinaryFormatError(ValueError):
+  pass
+
+def write_varint(out, n):
+  while n > 0x7f:
+    out.append((n & 0x7f) | 0x80)
+    n >>= 7
+
+  out.append(n)
+
+def varint_bytes(n):
+  out = bytearray()
+  write_varint(out, n)
+
+  return out
+
+def read_varint(next_byte):
+  n = 0
+  shift = 0
+
+  while True:
+    byte = next_byte()
+    n |= (byte & 0x7f) << shift
+
+    if byte < 0x80:
+      return n
+
+    shift += 7
+
+def write_size(out, start):
+  """Inserts the size of what was written to out after start at start."""
+  size = len(out) - start
+
+  if size < 0x80:
+    out.insert(start, size)
+  else:
+    out[start:start] = varint_bytes(size)
+
+class Writer(object):
+  """Writes records to a binary file as they come, keeping only the string
+  table and the kinds already written."""
+  def __init__(self, file, content=VALUE):
+    self.file = file
+    self.strings = dict()
+    self.kinds = set()
+
+    file.write(MAGIC + bytearray((VERSION, content)))
+
+  def write(self, value):
+    self.new_strings = list()
+    self.new_kinds = list()
+
+    body = bytearray()
+    self.encode(value, body)
+
+    out = bytearray()
+    write_varint(out, len(self.new_kinds))
+
+    for node_type in self.new_kinds:
+      write_varint(out, node_type.kind)
+      write_varint(out, len(node_type.attrs))
+      self.write_text(out, node_type.__name__)
+
+    write_varint(out, len(self.new_strings))
+
+    for string in self.new_strings:
+      self.write_text(out, string)
+
+    out.extend(body)
+
+    self.file.write(varint_bytes(len(out)))
+    self.file.write(out)
+
+  def close(self):
+    self.file.write(varint_bytes(0))
+
+  def write_text(self, out, text):
+    data = text.encode('utf-8', 'surrogatepass')
+
+    write_varint(out, len(data))
+    out.extend(data)
+
+  def encode(self, value, out):
+    value_type = type(value)
+
+    if value_type is str:
+      try:
+        index = self.strings[value]
+      except KeyError:
+        index = self.strings[value] = len(self.strings)
+        self.new_strings.append(value)
+
+      out.append(STRING)
+      write_varint(out, index)
+    elif isinstance(value, Node):
+      if value_type not in self.kinds:
+        self.kinds.add(value_type)
+        self.new_kinds.append(value_type)
+
+      out.append(NODE)
+      write_varint(out, value_type.kind)
+      start = len(out)
+
+      position = value.position
+
+      if position is None:
+        out.append(0)
+      else:
+        write_varint(out, position[0] + 1)
+        write_varint(out, position[1])
+
+      for attr in value_type.attrs:
+        self.encode(getattr(value, attr), out)
+
+      write_size(out, start)
+    elif value_type is list or value_type is tuple:
+      out.append(LIST if value_type is list else TUPLE)
+      start = len(out)
+
+      write_varint(out, len(value))
+      for item in value:
+        self.encode(item, out)
+
+      write_size(out, start)
+    elif value is None:
+      out.append(NONE)
+    elif value_type is bool:
+      out.append(TRUE if value else FALSE)
+    elif value_type is set or value_type is frozenset:
+      out.append(SET)
+      write_varint(out, len(value))
+
+      try:
+        items = sorted(value)
+      except TypeError:
+        items = value
+
+      for item in items:
+        self.encode(item, out)
+    elif isinstance(value, int):
+      out.append(INT)
+      write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+    else:
+      raise TypeError("Cannot write %s values" % (value_type.__name__,))
+
+class Reader(object):
+  """Reads the records of a binary file one at a time.
+
+  With skip_bodies the bodies of methods and constructors are stepped over
+  and loaded as a SkippedBlock without offsets.
+  """
+  def __init__(self, file, skip_bodies=False):
+    self.file = file
+    self.skip_bodies = skip_bodies
+    self.strings = list()
+    # Kind -> (node class, range over its attrs, index of the skipped attr
+    # or None)
+    self.kinds = dict()
+
+    header = file.read(len(MAGIC) + 2)
+
+    if header[:len(MAGIC)] != MAGIC or len(header) < len(MAGIC) + 2:
+      raise BinaryFormatError("Not a binary syntax tree")
+
+    version, self.content = bytearray(header[len(MAGIC):])
+
+    if version != VERSION:
+      raise BinaryFormatError("Unsupported version %d" % (version,))
+
+  def read_size(self):
+    n = 0
+    shift = 0
+
+    while True:
+      byte = self.file.read(1)
+
+      if not byte:
+        raise BinaryFormatError("Unexpected end of file")
+
+      byte = ord(byte)
+      n |= (byte & 0x7f) << shift
+
+      if byte < 0x80:
+        return n
+
+      shift += 7
+
+  def read(self):
+    """Returns the value of the next record, or raises EOFError after the
+    last one."""
+    size = self.read_size()
+
+    if size == 0:
+      raise EOFError()
+
+    data = self.file.read(size)
+
+    if len(data) != size:
+      raise BinaryFormatError("Unexpected end of file")
+
+    byte_iterator = iter(data)
+    next_byte = byte_iterator.__next__
+
+    try:
+      self.read_kinds(byte_iterator)
+
+      for _ in range(read_varint(next_byte)):
+        self.strings.append(read_text(byte_iterator))
+
+      value = decoder(byte_iterator, self.strings, self.kinds)()
+    except (StopIteration, IndexError, KeyError, TypeError, UnicodeError):
+      raise BinaryFormatError("Corrupt record")
+
+    if next(byte_iterator, None) is not None:
+      raise BinaryFormatError("Corrupt record")
+
+    return value
+
+  def read_kinds(self, byte_iterator):
+    next_byte = byte_iterator.__next__
+
+    for _ in range(read_varint(next_byte)):
+      kind = read_varint(next_byte)
+      attrs = read_varint(next_byte)
+      name = read_text(byte_iterator)
+
+      node_type = MetaNode.node_types.get(name)
+
+      if node_type is None or len(node_type.attrs) != attrs:
+        raise BinaryFormatError("Unknown node class %s" % (name,))
+
+      skipped = None
+
+      if self.skip_bodies and issubclass(node_type, (tree.MethodDeclaration, tree.ConstructorDeclaration)):
+        skipped = node_type.attrs.index('body')
+
+      self.kinds[kind] = (node_type, range(attrs), skipped)
+
+def read_text(byte_iterator):
+  length = read_varint(byte_iterator.__next__)
+  data = bytes(islice(byte_iterator, length))
+
+  if len(data) != length:
+    raise BinaryFormatError("Unexpected end of record")
+
+  return data.decode('utf-8', 'surrogatepass')
+
+def decoder(byte_iterator, strings, kinds):
+  """Returns the function decoding the next value from byte_iterator, an
+  iterator over the bytes of a record."""
+  next_byte = byte_iterator.__next__
+
+  def varint(n):
+    shift = 7
+    n &= 0x7f
+
+    while True:
+      byte = next_byte()
+      n |= (byte & 0x7f) << shift
+
+      if byte < 0x80:
+        return n
+
+      shift += 7
+
+  def skip(size):
+    if size:
+      next(islice(byte_iterator, size - 1, None))
+
+  def decode():
+    tag = next_byte()
+
+    if tag == STRING:
+      index = next_byte()
+
+      if index >= 0x80:
+        index = varint(index)
+
+      return strings[index]
+    elif tag == NODE:
+      kind = next_byte()
+
+      if kind >= 0x80:
+        kind = varint(kind)
+
+      node_type, attrs, skipped = kinds[kind]
+      size = next_byte()
+
+      if size >= 0x80:
+        size = varint(size)
+
+      line = next_byte()
+
+      if line >= 0x80:
+        line = varint(line)
+
+      if line:
+        column = next_byte()
+
+        if column >= 0x80:
+          column = varint(column)
+
+      if skipped is None:
+        node = node_type(*[decode() for _ in attrs])
+      else:
+        values = [decode() for _ in range(skipped)]
+        values.append(skip_body())
+        values.extend([decode() for _ in attrs[skipped + 1:]])
+
+        node = node_type(*values)
+
+      if line:
+        node._position = Position(line - 1, column)
+
+      return node
+    elif tag == NONE:
+      return None
+    elif tag == LIST or tag == TUPLE:
+      size = next_byte()
+
+      if size >= 0x80:
+        varint(size)
+
+      count = next_byte()
+
+      if count >= 0x80:
+        count = varint(count)
+
+      items = [decode() for _ in range(count)]
+
+      return items if tag == LIST else tuple(items)
+    elif tag == FALSE or tag == TRUE:
+      return tag == TRUE
+    elif tag == SET:
+      return set([decode() for _ in range(read_varint(next_byte))])
+    elif tag == INT:
+      n = read_varint(next_byte)
+
+      return (n >> 1) if not n & 1 else -(n >> 1) - 1
+
+    raise BinaryFormatError("Unknown tag %d" % (tag,))
+
+  def skip_body():
+    tag = next_byte()
+
+    if tag == NONE:
+      return None
+    elif tag == LIST or tag == TUPLE or tag == NODE:
+      if tag == NODE:
+        read_varint(next_byte)
+
+      skip(read_varint(next_byte))
+
+      return tree.SkippedBlock()
+
+    raise BinaryFormatError("Unexpected body")
+
+  return decode
+
+def dump(value, file):
+  """Writes a tree, or any value made of nodes, lists, tuples, sets,
+  strings, integers, booleans and None, to a binary file."""
+  if isinstance(value, tree.CompilationUnit):
+    writer = Writer(file, UNIT)
+    header = tree.CompilationUnit(value.package, value.imports, [])
+    header._position = value.position
+
+    writer.write(header)
+
+    for type_declaration in value.types or ():
+      writer.write(type_declaration)
+  else:
+    writer = Writer(file)
+    writer.write(value)
+
+  writer.close()
+
+def dumps(value):
+  out = io.BytesIO()
+  dump(value, out)
+
+  return out.getvalue()
+
+def load(file, skip_bodies=False):
+  """Reads the value written by dump(); with skip_bodies, method and
+  constructor bodies are left unread (see Reader)."""
+  reader = Reader(file, skip_bodies)
+
+  try:
+    value = reader.read()
+  except EOFError:
+    raise BinaryFormatError("Missing record")
+
+  try:
+    if reader.content == UNIT:
+      while True:
+        value.types.append(reader.read())
+
+    reader.read()
+  except EOFError:
+    return value
+
+  raise BinaryFormatError("Unexpected record")
+
+def loads(data, skip_bodies=False):
+  return load(io.BytesIO(data), skip_bodies)
+
+def iter_type_declarations(file, skip_bodies=False):
+  """Yields the top level type declarations of a compilation unit written
+  by dump() one at a time, reading the file only as far as needed."""
+  reader = Reader(file, skip_bodies)
+
+  if reader.content != UNIT:
+    raise BinaryFormatError("Not a compilation unit")
+
+  reader.read()
+
+  while True:
+    try:
+      yield reader.read()
+    except EOFError:
+      return
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import tempfile
+
+from . import binary
+from .parser import PARSER_VERSION
+
+DEFAULT_DIRECTORY = os.path.join('.kuraddo', 'cache')
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+ENTRY_SUFFIX = '.ast'
+
+class ParseCache(object):
+  """Directory of parsed compilation units keyed by source content.
+
+  Entries are named by the SHA-1 of the parser version and the source
+  bytes, so an edited file or a new parser simply misses. Each entry holds
+  the tree in the binary format (see binary.py) written to a temporary file
+  and renamed into place, so readers never see a partial entry.
+
+  The directory is kept under ``max_size`` bytes by evicting the least
+  recently used entries; a hit touches the entry's modification time.
+  """
+  def __init__(self, directory=DEFAULT_DIRECTORY, max_size=DEFAULT_MAX_SIZE, version=PARSER_VERSION):
+    self.directory = directory
+    self.max_size = max_size
+    self.version = version
+    self.size = None
+
+    self.hits = 0
+    self.misses = 0
+
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+
+  def key(self, data):
+    digest = hashlib.sha1(('%s\0' % (self.version,)).encode('ascii'))
+    digest.update(data)
+
+    return digest.hexdigest()
+
+  def file_key(self, path):
+    """Returns the key for the current contents of path, or None when the
+    file cannot be read."""
+    try:
+      with open(path, 'rb') as source_file:
+        return self.key(source_file.read())
+    except EnvironmentError:
+      return None
+
+  def entry_path(self, key):
+    return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+  def get(self, key, skip_bodies=False):
+    """Returns the cached unit, or None; with skip_bodies, method and
+    constructor bodies are not read (see binary.load())."""
+    path = self.entry_path(key)
+
+    try:
+      with open(path, 'rb') as entry_file:
+        unit = binary.load(entry_file, skip_bodies)
+
+      os.utime(path, None)
+    except EnvironmentError:
+      self.misses += 1
+      return None
+    except binary.BinaryFormatError:
+      # Unreadable entry, drop it and parse again
+      self.remove(path)
+      self.misses += 1
+      return None
+
+    self.hits += 1
+    return unit
+
+  def put(self, key, unit):
+    self.write(key, binary.dumps(unit))
+
+  def write(self, key, data):
+    """Stores a tree already written with binary.dumps()."""
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+
+    try:
+      with os.fdopen(fd, 'wb') as entry_file:
+        entry_file.write(data)
+
+      size = os.path.getsize(temp_path)
+      os.replace(temp_path, self.entry_path(key))
+    except BaseException:
+      self.remove(temp_path)
+      raise
+
+    if self.size is None:
+      self.evict()
+    else:
+      self.size += size
+
+      if self.size > self.max_size:
+        self.evict()
+
+  def parse_file(self, path):
+    """Parses path, or returns its cached unit when the contents are
+    unchanged."""
+    from .parse import parse_file
+
+    key = self.file_key(path)
+    unit = self.get(key) if key else None
+
+    if unit is None:
+      unit = parse_file(path)
+
+      if key:
+        self.put(key, unit)
+
+    return unit
+
+  def entries(self):
+    entries = list()
+
+    for name in os.listdir(self.directory):
+      if name.endswith(ENTRY_SUFFIX):
+        path = os.path.join(self.directory, name)
+
+        try:
+          stat = os.stat(path)
+        except EnvironmentError:
+          continue
+
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    return entries
+
+  def evict(self):
+    """Removes least recently used entries until the cache fits max_size."""
+    entries = sorted(self.entries())
+    size = sum(entry[1] for entry in entries)
+
+    for _, entry_size, path in entries:
+      if size <= self.max_size:
+        break
+
+      self.remove(path)
+      size -= entry_size
+
+    self.size = size
+
+  def clear(self):
+    for _, _, path in self.entries():
+      self.remove(path)
+
+    self.size = 0
+
+  def remove(self, path):
+    try:
+      os.remove(path)
+    except EnvironmentError:
+      pass
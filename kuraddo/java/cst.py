@@ -0,0 +1,278 @@
+import io
+import textwrap
+
+from .ast import walk_nodes
+from .incremental import Edit, RegionParser, diff
+from .parser import Parser
+from .tokenizer import EndOfInput, JavaTokenizer, tokenize
+
+DEFAULT_INDENT = '    '
+
+class SourceFile(object):
+  """Java source file whose classes and interfaces can be given new,
+  replaced or removed members without reprinting the rest of the text.
+
+  The source is parsed once and every class and interface body, nested
+  ones included, keeps the region of each of its declarations: from the
+  end of the previous declaration (or the opening brace) to the end of its
+  last token, so the whitespace and comments before a member go with it.
+  Editing methods update ``unit`` and record what changed; ``changes()``
+  returns the Edits of the original text they amount to, ``text()`` the
+  edited source and ``write()`` stores only the bytes from the first
+  change on. Enum and annotation type bodies are not editable.
+
+  With skeleton=True the bodies of the methods and constructors read from
+  the source are skipped as in parse.parse(), which is enough to add,
+  replace or remove members.
+  """
+  def __init__(self, source, path=None, encoding='utf-8', skeleton=False):
+    java_tokenizer = JavaTokenizer(source)
+
+    self.source = source
+    self.path = path
+    self.encoding = encoding
+
+    if skeleton:
+      tokens = java_tokenizer.tokenize_buffer()
+    else:
+      tokens = list(java_tokenizer.tokenize())
+
+    parser = RegionParser(tokens, nested=True, skeleton=skeleton)
+    self.unit = parser.parse()
+
+    # Regions are offsets in the tokenized text, which differs from the
+    # source when unicode escapes were replaced
+    offset = java_tokenizer.lines.source_offset
+
+    for body in parser.bodies:
+      body.open_end = offset(body.open_end)
+      body.close_start = offset(body.close_start)
+      body.regions = [[offset(start), offset(end)] for start, end in body.regions]
+      body.original = dict((id(declaration), region) for declaration, region in zip(body.declarations, body.regions))
+      # Holds the parsed declarations, so their ids are not reused by new
+      # members once removed
+      body.original_declarations = list(body.declarations)
+
+    self.bodies = dict((id(body.declarations), body) for body in parser.bodies)
+    self.new_members = dict()
+    self.changed = list()
+    self.newline = '\r\n' if '\r\n' in source else '\n'
+    self.indent_unit = self.detect_indent_unit()
+
+  @classmethod
+  def read(cls, path, encoding='utf-8', skeleton=False):
+    with io.open(path, encoding=encoding, newline='') as source_file:
+      return cls(source_file.read(), path, encoding, skeleton)
+
+  def line_indent(self, offset):
+    """Leading whitespace of the line offset is on."""
+    line_start = self.source.rfind('\n', 0, offset) + 1
+    line = self.source[line_start:offset]
+
+    return line[:len(line) - len(line.lstrip())]
+
+  def member_indent(self, body):
+    for start, end in body.regions:
+      text = self.source[start:end]
+      return self.line_indent(start + len(text) - len(text.lstrip()))
+
+    return self.line_indent(body.close_start) + self.indent_unit
+
+  def detect_indent_unit(self):
+    for body in self.bodies.values():
+      if body.regions:
+        outer = self.line_indent(body.close_start)
+        inner = self.member_indent(body)
+
+        if inner.startswith(outer) and len(inner) > len(outer):
+          return inner[len(outer):]
+
+    return DEFAULT_INDENT
+
+  def find_body(self, member):
+    for body in self.bodies.values():
+      if any(declaration is member for declaration in body.declarations):
+        return body
+
+    raise ValueError('Not a member of an editable body')
+
+  def type_body(self, type_declaration):
+    try:
+      return self.bodies[id(type_declaration.body)]
+    except (KeyError, AttributeError):
+      raise ValueError('Not an editable class or interface')
+
+  def parse_member(self, code, rule):
+    parser = Parser(tokenize(code))
+    declarations = list()
+
+    while not isinstance(parser.tokens.look(), EndOfInput):
+      declaration = getattr(parser, rule)()
+
+      if declaration:
+        declarations.append(declaration)
+
+    if len(declarations) != 1:
+      raise ValueError('Expected one member declaration, found %d' % (len(declarations),))
+
+    # Positions in the snippet do not match the edited file
+    for node in walk_nodes(declarations[0]):
+      node._position = None
+
+    return declarations[0]
+
+  def add_member(self, body, code, index):
+    member = self.parse_member(code, body.rule)
+    self.new_members[id(member)] = textwrap.dedent(code).strip('\r\n')
+    body.declarations.insert(index, member)
+
+    if body not in self.changed:
+      self.changed.append(body)
+
+    self.unit.invalidate_index()
+
+    return member
+
+  def insert_member(self, type_declaration, code, index=None):
+    """Parses code as one member of type_declaration and inserts it at
+    index (by default after the last member). Returns the new node."""
+    body = self.type_body(type_declaration)
+
+    if index is None:
+      index = len(body.declarations)
+
+    return self.add_member(body, code, index)
+
+  def replace_member(self, member, code):
+    """Puts the member parsed from code in the place of member, javadoc
+    included. Returns the new node."""
+    body = self.find_body(member)
+    index = [id(declaration) for declaration in body.declarations].index(id(member))
+
+    self.remove_member(member)
+
+    return self.add_member(body, code, index)
+
+  def remove_member(self, member):
+    body = self.find_body(member)
+    body.declarations[:] = [declaration for declaration in body.declarations if declaration is not member]
+    self.new_members.pop(id(member), None)
+
+    if body not in self.changed:
+      self.changed.append(body)
+
+    self.unit.invalidate_index()
+
+  def member_text(self, member, indent):
+    lines = self.new_members[id(member)].splitlines()
+
+    return self.newline.join(indent + line if line.strip() else '' for line in lines)
+
+  def body_changes(self, body):
+    newline = self.newline
+    indent = self.member_indent(body)
+    regions = body.regions
+    index = dict((id(declaration), i) for i, declaration in enumerate(body.original_declarations))
+    kept = [declaration for declaration in body.declarations if id(declaration) in body.original]
+    changes = list()
+
+    # Between two kept members (or a kept member and the braces), the run of
+    # new members takes the place of the removed ones, leading whitespace
+    # included, or goes after the kept member before it
+    previous = -1
+    run = list()
+
+    for declaration in body.declarations + [None]:
+      if declaration is not None and id(declaration) not in body.original:
+        run.append(self.member_text(declaration, indent))
+        continue
+
+      following = index[id(declaration)] if declaration is not None else len(regions)
+      removed = regions[previous + 1:following]
+      members = (newline * 2).join(run)
+
+      if removed:
+        start, end = removed[0][0], removed[-1][1]
+        text = u''
+
+        if run:
+          region = self.source[start:removed[0][1]]
+          space = region[:len(region) - len(region.lstrip())]
+          text = (space[:space.rfind('\n') + 1] if '\n' in space else space) + members
+        elif previous < 0 and following < len(regions):
+          # The next member follows the opening brace directly: only the
+          # last line break of its leading whitespace is kept
+          region = self.source[end:regions[following][1]]
+          space = region[:len(region) - len(region.lstrip())]
+          end += max(space.rfind('\n'), 0)
+
+        changes.append(Edit(start, end, text))
+      elif run:
+        if previous >= 0:
+          anchor = regions[previous][1]
+          changes.append(Edit(anchor, anchor, newline * 2 + members))
+        elif kept:
+          changes.append(Edit(body.open_end, body.open_end, newline + members + newline))
+        elif not self.source[body.open_end:body.close_start].strip():
+          closing = newline + self.line_indent(body.close_start)
+          changes.append(Edit(body.open_end, body.close_start, newline + members + closing))
+        else:
+          changes.append(Edit(body.open_end, body.open_end, newline + members))
+
+      run = list()
+      previous = following
+
+    return changes
+
+  def changes(self):
+    """Edits of the original source, ordered and not overlapping, that turn
+    it into text()."""
+    changes = list()
+
+    for body in self.changed:
+      changes.extend(self.body_changes(body))
+
+    return sorted(changes, key=lambda edit: (edit.start, edit.end))
+
+  def text(self):
+    parts = list()
+    position = 0
+
+    for start, end, text in self.changes():
+      parts.append(self.source[position:start])
+      parts.append(text)
+      position = end
+
+    parts.append(self.source[position:])
+
+    return u''.join(parts)
+
+  def write(self, path=None):
+    """Writes text() to path (the file read by default), leaving the bytes
+    before the first difference with the file as they are. Returns the
+    number of bytes written."""
+    path = path or self.path
+    data = self.text().encode(self.encoding)
+
+    try:
+      target = open(path, 'r+b')
+    except IOError:
+      target = open(path, 'w+b')
+
+    with target:
+      old = target.read()
+      start, end, text = diff(old, data)
+
+      if start == len(old) and len(old) == len(data):
+        return 0
+
+      target.seek(start)
+
+      if len(old) == len(data):
+        target.write(text)
+        return len(text)
+
+      target.write(data[start:])
+      target.truncate()
+
+      return len(data) - start
@@ -0,0 +1,358 @@
+from collections import namedtuple
+
+from .ast import LineShift, Node, ShiftedPosition
+from .parser import Parser, JavaSyntaxError
+from .tokenizer import EndOfInput, JavaTokenizer, LexerError, LineMap, Position
+
+Edit = namedtuple('Edit', ['start', 'end', 'text'])
+
+def common_length(a, b, limit, suffix=False):
+  # Binary search over slice comparisons, which run at C speed
+  low, high = 0, limit
+
+  while low < high:
+    middle = (low + high + 1) // 2
+
+    if suffix:
+      same = a[len(a) - middle:] == b[len(b) - middle:]
+    else:
+      same = a[:middle] == b[:middle]
+
+    if same:
+      low = middle
+    else:
+      high = middle - 1
+
+  return low
+
+def diff(old, new):
+  """Returns the single Edit turning old into new, found by trimming their
+  common prefix and suffix."""
+  limit = min(len(old), len(new))
+  start = common_length(old, new, limit)
+  end = common_length(old, new, limit - start, suffix=True)
+
+  return Edit(start, len(old) - end, new[start:len(new) - end])
+
+def token_end(token):
+  return token.start + len(token.value)
+
+class Body(object):
+  """Class or interface body of a top level type.
+
+  ``declarations`` is the body list of the type declaration itself.
+  ``regions`` holds a [start, end] character range per declaration: from
+  the end of the previous declaration (or the opening brace) to the end of
+  its last token, so comments and javadoc before a declaration belong to
+  its region. ``open_end`` and ``close_start`` delimit the body interior.
+  ``line_shifts`` holds the LineShift followed by the node positions of
+  each declaration, once set up by the IncrementalParser.
+  """
+  def __init__(self, rule, declarations, regions, open_end, close_start):
+    self.rule = rule
+    self.declarations = declarations
+    self.regions = regions
+    self.open_end = open_end
+    self.close_start = close_start
+    self.type_index = None
+    self.line_shifts = None
+
+  def shift(self, delta):
+    self.open_end += delta
+    self.close_start += delta
+
+    for region in self.regions:
+      region[0] += delta
+      region[1] += delta
+
+class RegionParser(Parser):
+  """Parser recording the regions of the body declarations of top level
+  classes and interfaces, or of all class and interface bodies when
+  nested is set."""
+  def __init__(self, tokens, offset=0, nested=False, skeleton=False):
+    super(RegionParser, self).__init__(tokens, skeleton=skeleton)
+
+    self.offset = offset
+    self.nested = nested
+    self.depth = 0
+    self.bodies = list()
+
+  def last_end(self):
+    return self.offset + token_end(self.tokens.list[self.tokens.marker - 1])
+
+  def parse_regions(self, rule, start):
+    """Parses declarations with rule up to a closing brace or the end of
+    input, returning them with their regions."""
+    declarations = list()
+    regions = list()
+
+    self.depth += 1
+    try:
+      while not (self.would_accept('}') or isinstance(self.tokens.look(), EndOfInput)):
+        declaration = getattr(self, rule)()
+
+        if declaration:
+          end = self.last_end()
+
+          declarations.append(declaration)
+          regions.append([start, end])
+          start = end
+    finally:
+      self.depth -= 1
+
+    return declarations, regions
+
+  def parse_body(self, rule):
+    self.accept('{')
+    open_end = self.last_end()
+
+    declarations, regions = self.parse_regions(rule, open_end)
+    close_start = self.offset + self.tokens.look().start
+    self.accept('}')
+
+    self.bodies.append(Body(rule, declarations, regions, open_end, close_start))
+
+    return declarations
+
+  def parse_class_body(self):
+    if self.depth and not self.nested:
+      return super(RegionParser, self).parse_class_body()
+
+    return self.parse_body('parse_class_body_declaration')
+
+  def parse_interface_body(self):
+    if self.depth and not self.nested:
+      return super(RegionParser, self).parse_interface_body()
+
+    return self.parse_body('parse_interface_body_declaration')
+
+  def parse_enum_body(self):
+    self.depth += 1
+    try:
+      return super(RegionParser, self).parse_enum_body()
+    finally:
+      self.depth -= 1
+
+  def parse_annotation_type_body(self):
+    self.depth += 1
+    try:
+      return super(RegionParser, self).parse_annotation_type_body()
+    finally:
+      self.depth -= 1
+
+class WindowLineMap(LineMap):
+  """LineMap of a slice of a file that starts at the given line and column."""
+  def __init__(self, data, line, column):
+    super(WindowLineMap, self).__init__(data)
+    self.first_line = line
+    self.first_column = column
+
+  def line(self, offset):
+    return super(WindowLineMap, self).line(offset) + self.first_line - 1
+
+  def position(self, offset):
+    line, column = super(WindowLineMap, self).position(offset)
+
+    if line == 1:
+      return Position(self.first_line, column + self.first_column - 1)
+
+    return Position(line + self.first_line - 1, column)
+
+def offset_position(source, offset):
+  line_start = source.rfind('\n', 0, offset) + 1
+
+  return Position(source.count('\n', 0, offset) + 1, offset - line_start + 1)
+
+def anchor_positions(root, shift, skip=None):
+  """Makes the positions of the nodes under root, leaving out the list
+  skip, follow the line delta of shift."""
+  stack = [root]
+
+  while stack:
+    value = stack.pop()
+
+    if isinstance(value, Node):
+      position = value.position
+
+      if position is not None:
+        value._position = ShiftedPosition(position.line - shift.lines, position.column, shift)
+
+      stack.extend(value.children)
+    elif isinstance(value, (list, tuple)) and value is not skip:
+      stack.extend(value)
+
+def shift_columns(root, line, column_delta):
+  """Moves the nodes under root that are on the given line sideways."""
+  stack = [root]
+
+  while stack:
+    value = stack.pop()
+
+    if isinstance(value, Node):
+      position = value._position
+
+      if isinstance(position, ShiftedPosition):
+        if position.resolve().line == line:
+          value._position = ShiftedPosition(position.line, position.column + column_delta, position.shift)
+      elif position is not None and position.line == line:
+        value._position = Position(line, position.column + column_delta)
+
+      stack.extend(value.children)
+    elif isinstance(value, (list, tuple)):
+      stack.extend(value)
+
+def is_blank(text):
+  text = text.strip()
+
+  return not text or text.startswith('//')
+
+class IncrementalParser(object):
+  """Keeps a compilation unit up to date with edits of its source.
+
+  An edit inside the body of a top level class or interface re-tokenizes
+  and re-parses only the body declarations whose regions it touches; the
+  other declaration nodes are kept as they are. Node positions follow a
+  line delta shared per top level type and per body declaration, so an
+  edit that adds or removes lines only updates the deltas of the
+  declarations after it, whatever their size. Anything else, as well as an edit
+  that does not parse on its own, falls back to parsing the whole source.
+
+  The unit is updated in place. ``reparsed`` is the number of declarations
+  parsed again by the last update, or None after a full parse.
+  """
+  def __init__(self, source):
+    self.parse(source)
+
+  def parse(self, source):
+    java_tokenizer = JavaTokenizer(source)
+    parser = RegionParser(list(java_tokenizer.tokenize()))
+    unit = parser.parse()
+
+    for body in parser.bodies:
+      for i, type_declaration in enumerate(unit.types):
+        if type_declaration.body is body.declarations:
+          body.type_index = i
+
+    self.source = source
+    self.unit = unit
+    self.bodies = [body for body in parser.bodies if body.type_index is not None]
+    self.type_shifts = []
+
+    for i, type_declaration in enumerate(unit.types):
+      bodies = [body for body in self.bodies if body.type_index == i]
+      shift = LineShift()
+
+      anchor_positions(type_declaration, shift, skip=bodies[0].declarations if bodies else None)
+      self.type_shifts.append(shift)
+
+      for body in bodies:
+        body.line_shifts = [self.anchor(declaration) for declaration in body.declarations]
+    # Token offsets only match the source when no unicode escape was replaced
+    self.escapes = java_tokenizer.data is not source
+    self.reparsed = None
+
+    return unit
+
+  def anchor(self, declaration):
+    shift = LineShift()
+    anchor_positions(declaration, shift)
+
+    return shift
+
+  def update(self, source):
+    return self.edit(*diff(self.source, source))
+
+  def edit(self, start, end, text):
+    source = self.source[:start] + text + self.source[end:]
+
+    try:
+      if not self.escapes and not '\\u' in text and self.reparse(source, start, end, text):
+        return self.unit
+    except (JavaSyntaxError, LexerError):
+      pass
+
+    return self.parse(source)
+
+  def reparse(self, source, start, end, text):
+    for body in self.bodies:
+      if body.open_end <= start and end <= body.close_start:
+        break
+    else:
+      return False
+
+    regions = body.regions
+    tail = [regions[-1][1] if regions else body.open_end, body.close_start]
+    affected = [i for i, region in enumerate(regions + [tail]) if region[0] <= end and region[1] >= start]
+
+    first, last = affected[0], affected[-1]
+    window_start = (regions + [tail])[first][0]
+    window_end = (regions + [tail])[last][1]
+    delta = len(text) - (end - start)
+
+    window = source[window_start:window_end + delta]
+    window_position = offset_position(source, window_start)
+    window_lines = WindowLineMap(window, *window_position)
+
+    tokens = list(JavaTokenizer(window).tokenize())
+    for token in tokens:
+      token.lines = window_lines
+
+    parser = RegionParser(tokens, window_start)
+    declarations, new_regions = parser.parse_regions(body.rule, window_start)
+
+    if not isinstance(parser.tokens.look(), EndOfInput):
+      return False
+
+    old_end = offset_position(self.source, window_end)
+    new_end = offset_position(source, window_end + delta)
+    stop = min(last + 1, len(regions))
+
+    body.declarations[first:stop] = declarations
+    regions[first:stop] = new_regions
+    body.line_shifts[first:stop] = [self.anchor(declaration) for declaration in declarations]
+    self.unit.invalidate_index()
+
+    following = first + len(declarations)
+    for region in regions[following:]:
+      region[0] += delta
+      region[1] += delta
+
+    if following < len(regions):
+      regions[following][0] = new_regions[-1][1] if new_regions else window_start
+
+    body.close_start += delta
+
+    later = [b for b in self.bodies if b.open_end > body.open_end]
+    for later_body in later:
+      later_body.shift(delta)
+
+    line_delta = new_end.line - old_end.line
+
+    if line_delta:
+      for shift in body.line_shifts[following:] + self.type_shifts[body.type_index + 1:]:
+        shift.lines += line_delta
+
+      for later_body in later:
+        for shift in later_body.line_shifts:
+          shift.lines += line_delta
+
+    # Only nodes on the last line of the window move sideways, so an edit
+    # that ends its line needs no walk at all
+    line_end = source.find('\n', window_end + delta)
+    line_end = line_end if line_end != -1 else len(source)
+
+    if old_end.column != new_end.column and not is_blank(source[window_end + delta:line_end]):
+      column_delta = new_end.column - old_end.column
+      on_line = following
+
+      while on_line < len(regions) and regions[on_line][0] < line_end:
+        shift_columns(body.declarations[on_line], new_end.line, column_delta)
+        on_line += 1
+
+      if on_line == len(regions) and not is_blank(source[body.close_start + 1:line_end]):
+        shift_columns(self.unit.types[body.type_index + 1:], new_end.line, column_delta)
+
+    self.source = source
+    self.reparsed = len(declarations)
+
+    return True
@@ -1,10 +1,28 @@
-import re
+from functools import lru_cache
+
+# Comments kept by scan(); a project reads the same license headers and
+# accessor comments over and over
+CACHE_SIZE = 1024
 
 def join(s):
   return ' '.join(l.strip() for l in s.split('\n'))
 
 class DocBlock(object):
-  def __init__(self):
+  """Parsed Javadoc comment.
+
+  A DocBlock made from the raw comment only scans it the first time one of
+  its FIELDS is read, so comments nobody looks at cost nothing but the
+  object. DocBlock() starts empty, to be filled with add_block().
+  """
+  FIELDS = ('description', 'return_doc', 'params', 'authors', 'deprecated', 'throws', 'exceptions', 'tags')
+
+  def __init__(self, raw=None):
+    self.raw = raw
+
+    if raw is None:
+      self.clear()
+
+  def clear(self):
     self.description = ''
     self.return_doc = None
     self.params = []
@@ -17,6 +35,21 @@ class DocBlock(object):
 
     self.tags = {}
 
+  def __getattr__(self, name):
+    # Only called for attributes not set yet
+    if name in DocBlock.FIELDS and self.__dict__.get('raw') is not None:
+      description, blocks = scan(self.raw)
+
+      self.clear()
+      self.description = description
+
+      for tag, value in blocks:
+        self.add_block(tag, value)
+
+      return self.__dict__[name]
+
+    raise AttributeError(name)
+
   def add_block(self, name, value):
     value = value.strip()
 
@@ -39,77 +72,73 @@ class DocBlock(object):
       self.authors.append(value)
     elif name == 'deprecated':
       self.deprecated = True
-    
+
     self.tags.setdefault(name, []).append(value)
-  
-blocks_re = re.compile('(^@)', re.MULTILINE)
-leading_space_re = re.compile(r'^\s*\*', re.MULTILINE)
-blocks_justify_re = re.compile(r'^\s*@', re.MULTILINE)
 
-def _sanitize(s):
-  s = s.strip()
+def check(raw):
+  s = raw.strip()
 
-  if not (s[:3] == '/***' and s[-2:] == '*/'):
+  if not (s[:3] == '/**' and s[-2:] == '*/'):
     raise ValueError('not a valid Javadoc comment')
-  
-  s = s.replace('\t', '    ')
-  
-  return s
-
-def _uncomment(s):
-  s = s[3:-2].strip()
 
-  return leading_space_re.sub('', s)
+  return s
 
-def _get_indent_level(s):
-  return len(s) - (s.lstrip())
+@lru_cache(maxsize=CACHE_SIZE)
+def scan(raw):
+  """Splits a Javadoc comment into its description and a tuple of (tag,
+  value) blocks, in one pass over its lines.
 
-def _left_justify(s):
-  lines = s.rstrip().splitlines()
+  The comment delimiters and the leading '*' of each line are dropped and
+  the lines left justified by their common indentation. A block starts at
+  each line beginning with '@'.
+  """
+  s = check(raw)
+  lines = []
+  common_indent = None
 
-  if not lines:
-    return ''
-  
-  indent_levels = []
+  for line in s[3:-2].strip().replace('\t', '    ').splitlines():
+    stripped = line.lstrip()
 
-  for line in lines:
-    if line.strip():
-      indent_levels.append(_get_indent_level(line))
-  indent_levels.sort()
+    if stripped[:1] == '*':
+      line = stripped[1:]
+      stripped = line.lstrip()
 
-  common_indent = indent_levels[0]
-  if common_indent == 0:
-    return s
-  else:
-    lines = [line[common_indent:] for line in lines]
-    return '\n'.join(lines)
+    if stripped:
+      indent = len(line) - len(stripped)
 
-def _force_block_left(s):
-  return blocks_justify_re.sub("@", s)
+      if common_indent is None or indent < common_indent:
+        common_indent = indent
 
-def parse(raw):
-  sanitize = _sanitize(raw)
-  uncommented = _uncomment(sanitize)
-  justified = _left_justify(uncommented)
-  justified_fixed = _force_block_left(justified)
-  prepared = justified_fixed
+    lines.append((line, stripped))
 
-  blocks = blocks_re.split(prepared)
+  description = []
+  blocks = []
+  current = description
 
-  doc = DocBlock()
+  for line, stripped in lines:
+    if stripped[:1] == '@':
+      current = [stripped[1:]]
+      blocks.append(current)
+    else:
+      current.append(line[common_indent:])
 
-  if blocks[0] != '@':
-    doc.description = blocks[0].strip()
-    blocks = blocks[2::2]
-  else:
-    blocks = blocks[1::2]
+  tags = []
 
   for block in blocks:
+    block = '\n'.join(block)
+
     try:
       tag, value = block.split(None, 1)
     except ValueError:
       tag, value = block, ''
 
-    doc.add_block(tag, value)
+    tags.append((tag, value))
+
+  return '\n'.join(description).strip(), tuple(tags)
+
+def parse(raw):
+  """DocBlock of the raw comment, scanned when it is first read. Raises
+  ValueError right away if raw is not a Javadoc comment."""
+  check(raw)
 
-  return doc
\ No newline at end of file
+  return DocBlock(raw)
@@ -0,0 +1,213 @@
+"""Entity models of JPA annotated classes.
+
+extract() reads the entities of a parsed compilation unit into Entity
+tuples, which is what the CRUD templates need to know about a class:
+
+  Entity    name, package, table, extends, id (the Column of the @Id or
+            @EmbeddedId field, or None), columns and relations
+  Column    field, type, name, nullable, unique, length and generated (the
+            @GeneratedValue strategy, or None)
+  Relation  field, kind (the annotation name), target, mapped_by,
+            join_column and collection
+
+Only type declarations and their fields are looked at, never method
+bodies, so units parsed with skeleton=True or loaded by binary.load()
+with skip_bodies give the same models. extract_many() models a batch of
+files through parse.parse_many().
+"""
+import os
+from collections import namedtuple
+
+from . import tree
+from .parse import parse_many
+
+Entity = namedtuple('Entity', ['name', 'package', 'table', 'extends', 'id', 'columns', 'relations'])
+Column = namedtuple('Column', ['field', 'type', 'name', 'nullable', 'unique', 'length', 'generated'])
+Relation = namedtuple('Relation', ['field', 'kind', 'target', 'mapped_by', 'join_column', 'collection'])
+
+ModelResult = namedtuple('ModelResult', ['path', 'entities', 'error'])
+
+RELATIONS = set(['OneToOne', 'OneToMany', 'ManyToOne', 'ManyToMany'])
+
+COLLECTIONS = set(['Collection', 'List', 'Set', 'SortedSet', 'Map', 'Iterable'])
+
+def simple_name(name):
+  return name.rpartition('.')[2]
+
+def annotation_map(declaration):
+  """Annotations of a declaration by simple name."""
+  return dict((simple_name(annotation.name), annotation) for annotation in declaration.annotations or ())
+
+def element_value(value):
+  """Python value of an annotation element: strings, numbers and booleans
+  for literals, the member name of enum constants, the type name of class
+  literals and tuples for arrays. Anything else is None."""
+  if isinstance(value, tree.Literal):
+    text = value.value
+
+    if text[:1] == '"':
+      return text[1:-1]
+    elif text in ('true', 'false'):
+      return text == 'true'
+
+    try:
+      number = int(text.rstrip('lL'))
+    except ValueError:
+      return text
+
+    return -number if '-' in (value.prefix_operators or ()) else number
+  elif isinstance(value, tree.MemberReference):
+    return value.member
+  elif isinstance(value, tree.ClassReference):
+    return '.'.join(filter(None, [value.qualifier, type_name(value.type)]))
+  elif isinstance(value, tree.ElementArrayValue):
+    return tuple(element_value(item) for item in value.values or ())
+
+def annotation_values(annotation):
+  """Elements of an annotation by name; a single element is 'value'."""
+  if annotation is None or annotation.element is None:
+    return dict()
+
+  if isinstance(annotation.element, list):
+    return dict((pair.name, element_value(pair.value)) for pair in annotation.element)
+
+  return {'value': element_value(annotation.element)}
+
+def type_name(java_type):
+  """Type as written, without type arguments."""
+  names = [java_type.name]
+  sub_type = getattr(java_type, 'sub_type', None)
+
+  while sub_type is not None:
+    names.append(sub_type.name)
+    sub_type = sub_type.sub_type
+
+  return '.'.join(names) + '[]' * len(java_type.dimensions or ())
+
+def relation_target(java_type, values):
+  """Entity a relation field points to: targetEntity, or the last type
+  argument of a collection, or the field type."""
+  if values.get('targetEntity'):
+    return values['targetEntity']
+
+  if simple_name(java_type.name) in COLLECTIONS:
+    arguments = getattr(java_type, 'arguments', None)
+
+    if arguments and arguments[-1].type is not None:
+      return type_name(arguments[-1].type)
+
+  return type_name(java_type)
+
+def field_models(field):
+  """(columns, relations) of a field declaration."""
+  if 'static' in field.modifiers or 'transient' in field.modifiers:
+    return (), ()
+
+  annotations = annotation_map(field)
+
+  if 'Transient' in annotations:
+    return (), ()
+
+  names = [declarator.name for declarator in field.declarators]
+  kinds = sorted(RELATIONS.intersection(annotations))
+
+  if kinds:
+    values = annotation_values(annotations[kinds[0]])
+    target = relation_target(field.type, values)
+    join_column = annotation_values(annotations.get('JoinColumn')).get('name')
+    collection = simple_name(field.type.name) in COLLECTIONS
+
+    return (), [Relation(name, kinds[0], target, values.get('mappedBy'), join_column, collection) for name in names]
+
+  values = annotation_values(annotations.get('Column'))
+  java_type = type_name(field.type)
+  nullable = values.get('nullable', True) and 'Id' not in annotations and 'EmbeddedId' not in annotations
+  generated = None
+
+  if 'GeneratedValue' in annotations:
+    generated = annotation_values(annotations['GeneratedValue']).get('strategy', 'AUTO')
+
+  # A column name given to a field declaring several variables applies to
+  # the first one only
+  columns = [Column(name, java_type, values.get('name') if i == 0 and values.get('name') else name, nullable,
+                    values.get('unique', False), values.get('length'), generated) for i, name in enumerate(names)]
+
+  return columns, ()
+
+def is_id(field):
+  annotations = annotation_map(field)
+
+  return 'Id' in annotations or 'EmbeddedId' in annotations
+
+def entity_model(declaration, package=None):
+  """Entity of a class declaration annotated with @Entity."""
+  annotations = annotation_map(declaration)
+  table = annotation_values(annotations.get('Table')).get('name')
+  name = annotation_values(annotations.get('Entity')).get('name')
+  columns = list()
+  relations = list()
+  id_column = None
+
+  for member in declaration.body:
+    if isinstance(member, tree.FieldDeclaration):
+      field_columns, field_relations = field_models(member)
+
+      if field_columns and id_column is None and is_id(member):
+        id_column = field_columns[0]
+
+      columns.extend(field_columns)
+      relations.extend(field_relations)
+
+  extends = type_name(declaration.extends) if declaration.extends is not None else None
+
+  return Entity(declaration.name, package, table or name or declaration.name, extends, id_column, tuple(columns),
+                tuple(relations))
+
+def type_declarations(declarations):
+  """Type declarations and the ones nested in their bodies, outermost
+  first, without going into method bodies."""
+  stack = list(reversed(declarations))
+
+  while stack:
+    declaration = stack.pop()
+
+    yield declaration
+
+    body = declaration.body
+
+    if isinstance(body, tree.EnumBody):
+      body = body.declarations
+
+    stack.extend(member for member in reversed(body or ()) if isinstance(member, tree.TypeDeclaration))
+
+def extract(unit):
+  """Entities of the classes of a compilation unit annotated with @Entity,
+  nested ones included."""
+  package = unit.package.name if unit.package is not None else None
+
+  return [entity_model(declaration, package) for declaration in type_declarations(unit.types or ())
+          if isinstance(declaration, tree.ClassDeclaration) and 'Entity' in annotation_map(declaration)]
+
+def java_files(*roots):
+  """Paths of the .java files under each root, in a stable order."""
+  for root in roots:
+    for directory, directories, files in os.walk(root):
+      directories[:] = sorted(name for name in directories if not name.startswith('.'))
+
+      for name in sorted(files):
+        if name.endswith('.java'):
+          yield os.path.join(directory, name)
+
+def extract_many(paths, workers=None, cache=None):
+  """Models a batch of source files, parsed over a pool of worker processes
+  by parse.parse_many() and taken from cache when they are in it, without
+  their method bodies.
+
+  Yields a ModelResult(path, entities, error) per path in completion
+  order, with the parse.ParseError of files that could not be parsed.
+  """
+  for result in parse_many(paths, workers, cache, skip_bodies=True):
+    if result.unit is None:
+      yield ModelResult(result.path, [], result.error)
+    else:
+      yield ModelResult(result.path, extract(result.unit), None)
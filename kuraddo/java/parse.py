@@ -1,5 +1,20 @@
-from .parser import Parser
-from .tokenizer import tokenize
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import tools.helper.py3x2.six as six
+
+from . import binary
+from .parser import Parser, JavaParserBaseException
+from .tokenizer import tokenize, tokenize_buffer, tokenize_file, tokenize_stream, LexerError
+
+ParseResult = namedtuple('ParseResult', ['path', 'unit', 'error', 'errors'])
+ParseResult.__new__.__defaults__ = ((),)
+
+ParseError = namedtuple('ParseError', ['type', 'message', 'position'])
+
+PARSE_ERRORS = (JavaParserBaseException, LexerError, EnvironmentError, UnicodeError)
 
 def parse_expression(exp):
   if not exp.endswith(';'):
@@ -45,8 +60,168 @@ def parse_type_signature(sig):
 
   return parser.parse_class_or_interface_declaration()
 
-def parse(s):
-  tokens = tokenize(s)
+def javadoc_mode(javadoc):
+  return 'text' if javadoc else 'skip'
+
+def parse(s, skeleton=False, javadoc=True):
+  """Parses a compilation unit. With skeleton=True the bodies of methods
+  and constructors are skipped and given as tree.SkippedBlock spans, which
+  is all that is needed to read the declarations of a file. With
+  javadoc=False comments are not attached, and every documentation is
+  None."""
+  if skeleton:
+    # Skipped tokens are never created from the buffer
+    tokens = tokenize_buffer(s, javadoc=javadoc_mode(javadoc))
+  else:
+    tokens = tokenize(s, javadoc=javadoc_mode(javadoc))
+
+  parser = Parser(tokens, skeleton=skeleton)
+
+  return parser.parse()
+
+def iter_type_declarations(s):
+  """Yields the top level type declarations of a compilation unit as soon
+  as each is parsed.
+
+  The source is tokenized only as far as the parser has read, and the
+  tokens of the declarations already yielded are let go, so a caller that
+  stops early (once it found the class it was after, say) never pays for
+  the rest of the file.
+  """
+  tokens = tokenize_stream(s)
   parser = Parser(tokens)
+  parser.parse_compilation_unit_header()
+
+  for type_declaration in parser.iter_type_declarations():
+    tokens.release(parser.tokens.marker)
+
+    yield type_declaration
+
+def parse_partial(s, skeleton=False):
+  """Parses a compilation unit, skipping the imports, type declarations
+  and body declarations that have syntax errors.
+
+  Returns the unit built from the rest together with the list of
+  JavaSyntaxErrors found; errors outside those declarations (in the
+  package declaration, say) are still raised.
+  """
+  tokens = tokenize_buffer(s) if skeleton else tokenize(s)
+  parser = Parser(tokens, skeleton=skeleton, recover=True)
+  unit = parser.parse()
+
+  return unit, parser.errors
+
+def parse_file(path, skeleton=False, javadoc=True):
+  # As in parse(), skeletons read a buffer so skipped tokens are never made
+  tokens = tokenize_file(path, javadoc=javadoc_mode(javadoc), buffer=skeleton)
+  parser = Parser(tokens, skeleton=skeleton)
+
+  return parser.parse()
+
+def parse_error(error):
+  position = None
+  message = getattr(error, 'description', None) or six.text_type(error)
+  at = getattr(error, 'at', None)
+
+  if at is not None:
+    position = at.position
+
+  return ParseError(type(error).__name__, message, position)
+
+def parse_path(path, recover=False):
+  try:
+    if recover:
+      parser = Parser(tokenize_file(path), recover=True)
+      unit = parser.parse()
+
+      return ParseResult(path, unit, None, [parse_error(e) for e in parser.errors])
+
+    return ParseResult(path, parse_file(path), None)
+  except PARSE_ERRORS as e:
+    return ParseResult(path, None, parse_error(e))
+
+def parse_packed(path, recover=False):
+  # Runs in the worker processes: the unit travels back in the binary
+  # format, ready to be stored in the cache
+  path, unit, error, errors = parse_path(path, recover)
+
+  if unit is not None:
+    unit = binary.dumps(unit)
+
+  return path, unit, error, errors
+
+def parse_many(paths, workers=None, cache=None, recover=False, skip_bodies=False):
+  """Parses a batch of source files over a pool of worker processes.
+
+  Yields a ParseResult(path, unit, error, errors) per path in completion
+  order; ``unit`` is the CompilationUnit, or None with ``error`` holding a
+  ParseError(type, message, position) when the file could not be read,
+  tokenized or parsed, or when the worker parsing it died. ``workers``
+  defaults to the CPU count, and with a single worker (or a single path)
+  the files are parsed in this process. Closing the generator early
+  cancels the files not started yet.
+
+  With recover=True declarations with syntax errors are skipped as in
+  parse_partial(): ``unit`` holds the rest of the file and ``errors`` a
+  ParseError per skipped declaration.
+
+  With a ParseCache, files whose contents are cached are yielded first
+  without being parsed, and newly parsed units are stored. Units with
+  errors are not stored. With skip_bodies the cached units are loaded
+  without their method and constructor bodies, for callers that only look
+  at declarations.
+  """
+  paths = list(paths)
+  keys = dict()
+
+  if cache is not None:
+    pending = list()
+
+    for path in paths:
+      key = cache.file_key(path)
+      unit = cache.get(key, skip_bodies) if key else None
+
+      if unit is not None:
+        yield ParseResult(path, unit, None)
+      else:
+        keys[path] = key
+        pending.append(path)
+
+    paths = pending
+
+  if workers is None:
+    workers = os.cpu_count() or 1
+
+  if workers <= 1 or len(paths) <= 1:
+    for path in paths:
+      result = parse_path(path, recover)
+
+      if result.unit is not None and not result.errors and keys.get(path):
+        cache.put(keys[path], result.unit)
+
+      yield result
+    return
+
+  with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+    futures = dict((executor.submit(parse_packed, path, recover), path) for path in paths)
+
+    try:
+      for future in as_completed(futures):
+        try:
+          path, unit, error, errors = future.result()
+        except BrokenProcessPool as e:
+          # Every file still in the pool fails this way once a worker dies
+          yield ParseResult(futures[future], None, parse_error(e))
+          continue
+
+        if unit is not None:
+          if keys.get(path) and not errors:
+            cache.write(keys[path], unit)
+
+          unit = binary.loads(unit)
 
-  return parser.parse()
\ No newline at end of file
+        yield ParseResult(path, unit, error, errors)
+    finally:
+      # The executor waits for its queued files on exit
+      for future in futures:
+        future.cancel()
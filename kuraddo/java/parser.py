@@ -12,11 +12,41 @@ from .tokenizer import (
   Annotation, 
   Literal, 
   Operator, 
-  JavaToken
+  JavaToken,
+  TokenBuffer,
+  TOKEN_TYPES
 )
 
 ENABLE_DEBUG_SUPPORT = False
 
+# Bumped whenever the shape of the trees built by the parser changes, so
+# stored trees (see cache.py) from older versions are not reused
+PARSER_VERSION = 3
+
+# accept() arguments -> their compiled expectations, see compile_expectations
+EXPECTATIONS = dict()
+
+def compile_expectations(accepts):
+  """Resolves the arguments of accept(), would_accept() and try_accept()
+  once into (value, kinds, name) triples: a token value to compare, or the
+  set of token kind codes (see tokenizer.TOKEN_TYPES) that are instances of
+  a token class, so matching a token never has to introspect types again."""
+  if len(accepts) == 0:
+    raise JavaParserError("Missing acceptable values")
+
+  expectations = list()
+
+  for accept in accepts:
+    if isinstance(accept, six.string_types):
+      expectations.append((accept, None, None))
+    else:
+      kinds = frozenset(token_type.kind for token_type in TOKEN_TYPES if issubclass(token_type, accept))
+      expectations.append((None, kinds, accept.__name__))
+
+  EXPECTATIONS[accepts] = expectations = tuple(expectations)
+
+  return expectations
+
 def parse_debug(method):
   global ENABLE_DEBUG_SUPPORT
 
@@ -38,7 +68,7 @@ def parse_debug(method):
         self.recursion_depth += 1
 
         try:
-          r.method(self)
+          r = method(self)
         except JavaSyntaxError as e:
           e_message = e.description
           raise
@@ -56,7 +86,9 @@ def parse_debug(method):
         finally:
           self.recursion_depth -= 1
       
-      return _method
+      return r
+
+    return _method
   else:
     return method
 
@@ -85,12 +117,30 @@ class Parser(object):
                           set(('<<', '>>', '>>>')),
                           set(('+', '-')),
                           set(('*', '/', '%')) ]
+
+  operator_levels = dict((operator, level) for level, operators in enumerate(operator_precedence) for operator in operators)
+
+  # Tokens after which 'yield' is a name rather than a yield statement
+  yield_identifier_followers = Operator.ASSIGNMENT | set(('.', '[', ';', ':', ',', ')', '++', '--', '->', '::'))
   
-  def __init__(self, tokens):
+  def __init__(self, tokens, memoize=False, skeleton=False, recover=False):
     self.tokens = util.LookAheadListIterator(tokens)
     self.tokens.set_default(EndOfInput(None))
 
-    set.debug = False
+    self.debug = False
+
+    # (rule, token index) -> (result, token index after it)
+    self.memo = dict() if memoize else None
+    self.memo_hits = 0
+    self.memo_misses = 0
+
+    # Method and constructor bodies are skipped, see parse_method_body
+    self.skeleton = skeleton
+
+    # Syntax errors in declarations are collected instead of raised, see
+    # parse_or_skip
+    self.recover = recover
+    self.errors = list()
   
   def set_debug(self, debug=True):
     self.debug = debug
@@ -105,85 +155,182 @@ class Parser(object):
     raise JavaSyntaxError(description, at)
   
   def accept(self, *accepts):
-    last = None
+    try:
+      expectations = EXPECTATIONS[accepts]
+    except KeyError:
+      expectations = compile_expectations(accepts)
 
-    if len(accepts) == 0:
-      raise JavaParserError("Missing acceptable values")
-    
-    for accept in accepts:
-      token = next(self.tokens)
-      if isinstance(accept, six.string_types) and (not token.value == accept):
-        self.illegal("Expected '%s'" % (accept,))
-      elif isinstance(accept, type) and not isinstance(token, accept):
-        self.illegal("Expected %s" % (accept.__name__,))
-      
-      last = token
+    tokens = self.tokens
+
+    for value, kinds, name in expectations:
+      try:
+        token = next(tokens)
+      except StopIteration:
+        self.illegal("Unexpected end of input")
+
+      if kinds is None:
+        if token.value != value:
+          self.illegal("Expected '%s'" % (value,), token)
+      elif token.kind not in kinds:
+        self.illegal("Expected %s" % (name,), token)
     
-    return last.value
+    return token.value
   
   def would_accept(self, *accepts):
-    if len(accepts) == 0:
-      raise JavaParserError("Missing acceptable values")
-    
-    for i, accept in enumerate(accepts):
-      token = self.tokens.look(i)
+    try:
+      expectations = EXPECTATIONS[accepts]
+    except KeyError:
+      expectations = compile_expectations(accepts)
 
-      if isinstance(accept, six.string_types) and (not token.value == accept):
-        return False
-      elif isinstance(accept, type) and not isinstance(token, accept):
+    # Indexes the token list directly instead of going through look()
+    tokens = self.tokens
+    token_list = tokens.list
+    index = tokens.marker
+
+    for value, kinds, _ in expectations:
+      try:
+        token = token_list[index]
+      except IndexError:
+        token = tokens.default
+
+      if kinds is None:
+        if token.value != value:
+          return False
+      elif token.kind not in kinds:
         return False
+
+      index += 1
     
     return True
   
   def try_accept(self, *accepts):
-    if len(accepts) == 0:
-      raise JavaParserError("Missing acceptable values")
-    
-    for i, accept in enumerate(accepts):
-      token = self.tokens.look(i)
+    if not self.would_accept(*accepts):
+      return False
 
-      if isinstance(accept, six.string_types) and (not token.value == accept):
-        return False
-      elif isinstance(accept, type) and not isinstance(token, accept):
-        return False
-    for i in range(0, len(accepts)):
-      next(self.tokens)
+    tokens = self.tokens
+    tokens.marker += len(accepts)
+    tokens.value = tokens.list[tokens.marker - 1]
     
     return True
   
-  def build_binary_operation(self, parts, start_level=0):
-    if len(parts) == 1:
-      return parts[0]
-    
-    operands = list()
+  def parse_or_skip(self, rule):
+    """Returns rule(). When recovering, a JavaSyntaxError raised by it is
+    added to errors instead, the tokens of the declaration it was parsing
+    are skipped and None is returned."""
+    if not self.recover:
+      return rule()
+
+    tokens = self.tokens
+    start = tokens.marker
+    markers = len(tokens.saved_markers)
+
+    try:
+      return rule()
+    except JavaSyntaxError as e:
+      self.errors.append(e)
+
+      del tokens.saved_markers[markers:]
+      tokens.marker = self.declaration_end(start)
+
+  def declaration_end(self, start):
+    """Index of the token after the declaration starting at start: past
+    the first ';' outside braces or the '}' closing its first block, or at
+    a '}' closing the enclosing body.
+
+    Parentheses and braces share one stack, so a ')' also closes the braces
+    left open inside it, as in @Ann({1, 2) int z;, and a '}' the
+    parentheses."""
+    token_list = self.tokens.list
+    openers = list()
+
+    for index in range(start, len(token_list)):
+      value = token_list[index].value
+
+      if value == '{' or value == '(':
+        openers.append(value)
+      elif value == ')':
+        if '(' in openers:
+          del openers[len(openers) - 1 - openers[::-1].index('('):]
+      elif value == '}':
+        if '{' not in openers:
+          return max(index, start + 1)
+
+        del openers[len(openers) - 1 - openers[::-1].index('{'):]
+
+        if '{' not in openers:
+          return index + 1
+      elif value == ';' and '{' not in openers:
+        return index + 1
+
+    return len(token_list)
+
+  def unclosed_body(self):
+    """True when recovering at the end of input inside a body, after
+    adding the missing brace to errors."""
+    if self.recover and isinstance(self.tokens.look(), EndOfInput):
+      token_list = self.tokens.list
+      self.errors.append(JavaSyntaxError("Unexpected end of input", token_list[len(token_list) - 1]))
+      return True
+
+    return False
+
+  def speculate(self, rule):
+    """Parses rule at the current position, or returns None and leaves the
+    position unchanged when it does not parse there.
+
+    With memoize=True the outcome is kept per (rule, token index), so each
+    speculative rule runs at most once per position however the callers
+    backtrack around it.
+    """
+    tokens = self.tokens
+    result = None
+
+    if self.memo is not None:
+      key = (rule, tokens.marker)
+      entry = self.memo.get(key)
+
+      if entry is not None:
+        self.memo_hits += 1
+        result, tokens.marker = entry
+
+        return result
+
+      self.memo_misses += 1
+
+    try:
+      with tokens:
+        result = getattr(self, rule)()
+    except JavaSyntaxError:
+      pass
+
+    if self.memo is not None:
+      self.memo[key] = (result, tokens.marker)
+
+    return result
+  
+  def build_binary_operation(self, parts):
+    """Builds the left associative BinaryOperation tree of a flat
+    [operand, operator, operand, ...] list with one pass of
+    precedence climbing over operator_levels."""
+    levels = self.operator_levels
+    operands = [parts[0]]
     operators = list()
 
-    i = 0
+    for i in range(1, len(parts), 2):
+      level = levels[parts[i]]
 
-    for level in range(start_level, len(self.operator_precedence)):
-      for j in range(1, len(parts) - 1, 2):
-        if parts[j] in self.operator_precedence[level]:
-          operand = self.build_binary_operation(parts[i:j], level + 1)
-          operator = parts[j]
-          i = j + 1
+      while operators and levels[operators[-1]] >= level:
+        operandr = operands.pop()
+        operands[-1] = tree.BinaryOperation(operator=operators.pop(), operandl=operands[-1], operandr=operandr)
 
-          operands.append(operand)
-          operators.append(operator)
-      
-      if operands:
-        break
-    
-    operand = self.build_binary_operation(parts[i:], level + 1)
-    operands.append(operand)
+      operators.append(parts[i])
+      operands.append(parts[i + 1])
 
-    operation = operands[0]
+    while operators:
+      operandr = operands.pop()
+      operands[-1] = tree.BinaryOperation(operator=operators.pop(), operandl=operands[-1], operandr=operandr)
 
-    for operator, operandr in zip(operators, operands[1:]):
-      operation = tree.BinaryOperation(operandl=operation)
-      operation.operator = operator
-      operation.operandr = operandr
-    
-    return operation
+    return operands[0]
   
   def is_annotation(self, i=0):
     """Returns true if the position is the start of an annotation application
@@ -197,6 +344,45 @@ class Parser(object):
     """
     return (isinstance(self.tokens.look(i), Annotation) and self.tokens.look(i + 1).value == 'interface')
   
+  def is_record_declaration(self, i=0):
+    """Returns true if the position is the start of a record declaration,
+    'record' being a name anywhere else"""
+    return (self.tokens.look(i).value == 'record' and isinstance(self.tokens.look(i + 1), Identifier) and
+            self.tokens.look(i + 2).value in ('(', '<'))
+  
+  def is_class_modifier(self, i):
+    """Returns true if the token at i can follow a class modifier, which
+    tells 'sealed' and 'non-sealed' apart from names"""
+    token = self.tokens.look(i)
+
+    return isinstance(token, (Modifier, Annotation)) or token.value in ('class', 'interface', 'sealed', 'non')
+  
+  def is_method_reference_type(self):
+    """Returns true if the position may start a type that is not an
+    expression in front of '::', as in String[]::new, int[]::new or
+    List<String>::size"""
+    look = self.tokens.look
+
+    if isinstance(look(), BasicType):
+      return look(1).value == '['
+
+    i = 0
+    while isinstance(look(i), Identifier) and look(i + 1).value == '.':
+      i += 2
+
+    if not isinstance(look(i), Identifier):
+      return False
+
+    follower = look(i + 1).value
+
+    return follower == '<' or (follower == '[' and look(i + 2).value == ']')
+  
+  def is_yield_statement(self):
+    """Returns true if the position is the start of a yield statement
+    rather than an expression using a variable named yield"""
+    return (self.would_accept('yield') and isinstance(self.tokens.look(), Identifier) and
+            self.tokens.look(1).value not in self.yield_identifier_followers)
+  
   @parse_debug
   def parse_identifier(self):
     return self.accept(Identifier)
@@ -219,8 +405,13 @@ class Parser(object):
     qualified_identifiers = list()
 
     while True:
-      qualified_identifiers = self.parse_qualified_identifier()
-      qualified_identifiers.append(qualified_identifiers)
+      # Type annotations, as in throws @Critical IOException, are read but
+      # not kept; the list holds plain names
+      if self.is_annotation():
+        self.parse_annotations()
+
+      qualified_identifier = self.parse_qualified_identifier()
+      qualified_identifiers.append(qualified_identifier)
 
       if not self.try_accept(','):
         break
@@ -229,11 +420,17 @@ class Parser(object):
   
   @parse_debug
   def parse_compilation_unit(self):
+    package, import_declarations = self.parse_compilation_unit_header()
+    type_declarations = list(self.iter_type_declarations())
+
+    return tree.CompilationUnit(package=package, imports=import_declarations, types=type_declarations)
+  
+  @parse_debug
+  def parse_compilation_unit_header(self):
     package = None
     package_annotations = None
     javadoc = None
     import_declarations = list()
-    type_declarations = list()
 
     self.tokens.push_marker()
     next_token = self.tokens.look()
@@ -258,19 +455,25 @@ class Parser(object):
     
     while self.would_accept('import'):
       token = self.tokens.look()
-      import_declaration = self.parse_import_declaration()
-      import_declaration._position = token.position
-      import_declarations.append(import_declaration)
+      import_declaration = self.parse_or_skip(self.parse_import_declaration)
+
+      if import_declaration:
+        import_declaration._position = token.position
+        import_declarations.append(import_declaration)
+    
+    return package, import_declarations
+  
+  def iter_type_declarations(self):
+    """Yields the type declarations that follow the package and imports
+    one at a time, as each is parsed."""
     while not isinstance(self.tokens.look(), EndOfInput):
       try:
-        type_declaration = self.parse_type_declaration()
+        type_declaration = self.parse_or_skip(self.parse_type_declaration)
       except StopIteration:
         self.illegal("Unexpected end of input")
       
       if type_declaration:
-        type_declarations.append(type_declaration)
-    
-    return tree.CompilationUnit(package=package, imports=import_declarations, types=type_declarations)
+        yield type_declaration
   
   @parse_debug
   def parse_import_declaration(self):
@@ -318,7 +521,9 @@ class Parser(object):
     elif token.value == 'interface':
       type_declaration = self.parse_normal_interface_declaration()
     elif self.is_annotation_declaration():
-      type_declaration - self.parse_annotation_type_declaration()
+      type_declaration = self.parse_annotation_type_declaration()
+    elif self.is_record_declaration():
+      type_declaration = self.parse_record_declaration()
     else:
       self.illegal("Expected type declaration")
     
@@ -335,6 +540,7 @@ class Parser(object):
     type_params = None
     extends = None
     implements = None
+    permits = None
     body = None
 
     self.accept('class')
@@ -349,9 +555,12 @@ class Parser(object):
     if self.try_accept('implements'):
       implements = self.parse_type_list()
     
+    if self.try_accept('permits'):
+      permits = self.parse_type_list()
+    
     body = self.parse_class_body()
 
-    return tree.ClassDeclaration(name=name, type_parameter=type_params, extends=extends, implements=implements, body=body)
+    return tree.ClassDeclaration(name=name, type_parameters=type_params, extends=extends, implements=implements, permits=permits, body=body)
   
   @parse_debug
   def parse_enum_declaration(self):
@@ -374,6 +583,7 @@ class Parser(object):
     name = None
     type_parameters = None
     extends = None
+    permits = None
     body = None
 
     self.accept('interface')
@@ -385,9 +595,32 @@ class Parser(object):
     if self.try_accept('extends'):
       extends = self.parse_type_list()
     
+    if self.try_accept('permits'):
+      permits = self.parse_type_list()
+    
     body = self.parse_interface_body()
 
-    return tree.InterfaceDeclaration(name=name, type_parameters=type_parameters, extends=extends, body=body)
+    return tree.InterfaceDeclaration(name=name, type_parameters=type_parameters, extends=extends, permits=permits, body=body)
+  
+  @parse_debug
+  def parse_record_declaration(self):
+    type_parameters = None
+    implements = None
+
+    self.accept('record')
+    name = self.parse_identifier()
+
+    if self.would_accept('<'):
+      type_parameters = self.parse_type_parameters()
+    
+    components = self.parse_formal_parameters()
+
+    if self.try_accept('implements'):
+      implements = self.parse_type_list()
+    
+    body = self.parse_class_body()
+
+    return tree.RecordDeclaration(name=name, type_parameters=type_parameters, components=components, implements=implements, body=body)
   
   @parse_debug
   def parse_annotation_type_declaration(self):
@@ -404,6 +637,7 @@ class Parser(object):
   @parse_debug
   def parse_type(self):
     java_type = None
+    annotations = self.parse_type_annotations()
 
     if isinstance(self.tokens.look(), BasicType):
       java_type = self.parse_basic_type()
@@ -412,10 +646,20 @@ class Parser(object):
     else:
       self.illegal("Expected type")
     
-    java_type.dimension = self.parse_array_dimension()
+    java_type.dimensions = self.parse_array_dimension()
+
+    if annotations:
+      java_type.annotations = annotations
 
     return java_type
   
+  @parse_debug
+  def parse_type_annotations(self):
+    """Type annotations in front of a type, as in List<@Valid Item>, or
+    None."""
+    if self.is_annotation():
+      return self.parse_annotations()
+  
   @parse_debug
   def parse_basic_type(self):
     return tree.BasicType(name=self.accept(BasicType))
@@ -426,10 +670,11 @@ class Parser(object):
     tail = reference_type
 
     while True:
+      tail.annotations = self.parse_type_annotations()
       tail.name = self.parse_identifier()
 
       if self.would_accept('<'):
-        tail_arguments = self.parse_type_arguments()
+        tail.arguments = self.parse_type_arguments()
       
       if self.try_accept('.'):
         tail.sub_type = tree.ReferenceType()
@@ -446,7 +691,7 @@ class Parser(object):
     self.accept('<')
 
     while True:
-      type_argument = self.parse_type_arguments()
+      type_argument = self.parse_type_argument()
       type_arguments.append(type_argument)
 
       if self.try_accept('>'):
@@ -467,15 +712,20 @@ class Parser(object):
       else:
         return tree.TypeArgument(pattern_type='?')
     
+    annotations = self.parse_type_annotations()
+
     if self.would_accept(BasicType):
       base_type = self.parse_basic_type()
-      self.accept('[', ']')
-      base_type.dimensions = [None]
+      base_type.dimensions = self.parse_array_dimension()
+
+      if not base_type.dimensions:
+        self.illegal("Expected '['")
     else:
       base_type = self.parse_reference_type()
-      base_type.dimensions = []
-    
-    base_type.dimensions += self.parse_array_dimension()
+      base_type.dimensions = self.parse_array_dimension()
+
+    if annotations:
+      base_type.annotations = annotations
 
     return tree.TypeArgument(type=base_type, pattern_type=pattern_type)
   
@@ -485,22 +735,28 @@ class Parser(object):
     type_arguments = self.parse_type_list()
     self.accept('>')
 
-    return [tree.Type(type=t) for t in type_arguments]
+    return [tree.TypeArgument(type=t) for t in type_arguments]
   
   @parse_debug
   def parse_type_list(self):
     types = list()
 
     while True:
+      annotations = self.parse_type_annotations()
+
       if self.would_accept(BasicType):
         base_type = self.parse_basic_type()
-        self.accept('[', ']')
-        base_type.dimensions = [None]
+        base_type.dimensions = self.parse_array_dimension()
+
+        if not base_type.dimensions:
+          self.illegal("Expected '['")
       else:
         base_type = self.parse_reference_type()
-        base_type.dimensions = []
-      
-      base_type.dimensions += self.parse_array_dimension()
+        base_type.dimensions = self.parse_array_dimension()
+
+      if annotations:
+        base_type.annotations = annotations
+
       types.append(base_type)
 
       if not self.try_accept(','):
@@ -515,7 +771,7 @@ class Parser(object):
       return self.parse_type_arguments()
   
   @parse_debug
-  def parse_nonwildcard_type_arguments_or_diamong(self):
+  def parse_nonwildcard_type_arguments_or_diamond(self):
     if self.try_accept('<', '>'):
       return list()
     else:
@@ -557,12 +813,30 @@ class Parser(object):
   
   @parse_debug
   def parse_array_dimension(self):
-    array_dimension = 0
+    dimensions = list()
+
+    while True:
+      if self.try_accept('[', ']'):
+        dimensions.append(None)
+      elif self.is_annotation():
+        # Annotations not followed by [] belong to what comes next
+        annotations = self.speculate('parse_annotated_dimension')
+
+        if annotations is None:
+          break
 
-    while self.try_accept('[', ']'):
-      array_dimension += 1
+        dimensions.append(annotations)
+      else:
+        break
     
-    return [None] * array_dimension
+    return dimensions
+  
+  @parse_debug
+  def parse_annotated_dimension(self):
+    annotations = self.parse_annotations()
+    self.accept('[', ']')
+
+    return annotations
   
   @parse_debug
   def parse_modifiers(self):
@@ -581,6 +855,13 @@ class Parser(object):
       if self.would_accept(Modifier):
         modifiers.add(self.accept(Modifier))
       
+      elif token.value == 'sealed' and self.is_class_modifier(1):
+        modifiers.add(self.accept('sealed'))
+      
+      elif token.value == 'non' and self.would_accept('non', '-', 'sealed') and self.is_class_modifier(3):
+        self.accept('non', '-', 'sealed')
+        modifiers.add('non-sealed')
+      
       elif self.is_annotation():
         annotation = self.parse_annotation()
         annotation._position = token.position
@@ -617,7 +898,7 @@ class Parser(object):
 
     if self.try_accept('('):
       if not self.would_accept(')'):
-        annotation_element = self.parse_annotation_identifier()
+        annotation_element = self.parse_annotation_element()
       self.accept(')')
     
     return tree.Annotation(name=qualified_identifier, element=annotation_element)
@@ -702,7 +983,10 @@ class Parser(object):
     self.accept('{')
 
     while not self.would_accept('}'):
-      declaration = self.parse_class_body_declaration()
+      if self.unclosed_body():
+        return declarations
+
+      declaration = self.parse_or_skip(self.parse_class_body_declaration)
       if declaration:
         declarations.append(declaration)
     
@@ -747,10 +1031,15 @@ class Parser(object):
       member = self.parse_normal_interface_declaration()
     elif self.is_annotation_declaration():
       member = self.parse_annotation_type_declaration()
+    elif self.is_record_declaration():
+      member = self.parse_record_declaration()
     elif self.would_accept(Identifier, '('):
       constructor_name = self.parse_identifier()
       member = self.parse_constructor_declarator_rest()
       member.name = constructor_name
+    elif self.would_accept(Identifier, '{'):
+      constructor_name = self.parse_identifier()
+      member = tree.CompactConstructorDeclaration(name=constructor_name, body=self.parse_method_body())
     else:
       member = self.parse_method_or_field_declaration()
     
@@ -794,13 +1083,13 @@ class Parser(object):
   @parse_debug
   def parse_field_declarators_rest(self):
     array_dimension, initializer = self.parse_variable_declarator_rest()
-    declarators = [tree.VariableDeclarator(dimension=array_dimension, initializer=initializer)]
+    declarators = [tree.VariableDeclarator(dimensions=array_dimension, initializer=initializer)]
 
     while self.try_accept(','):
       declarator = self.parse_variable_declarator()
       declarators.append(declarator)
     
-    return tree.FIeldDeclaration(declarators=declarators)
+    return tree.FieldDeclaration(declarators=declarators)
   
   @parse_debug
   def parse_method_declarator_rest(self):
@@ -813,7 +1102,7 @@ class Parser(object):
       throws = self.parse_qualified_identifier_list()
     
     if self.would_accept('{'):
-      body = self.parse_block()
+      body = self.parse_method_body()
     else:
       self.accept(';')
     
@@ -829,7 +1118,7 @@ class Parser(object):
       throws = self.parse_qualified_identifier_list()
     
     if self.would_accept('{'):
-      body = self.parse_block()
+      body = self.parse_method_body()
     else:
       self.accept(';')
     
@@ -844,7 +1133,7 @@ class Parser(object):
     if self.try_accept('throws'):
       throws = self.parse_qualified_identifier_list()
     
-    body = self.parse_block()
+    body = self.parse_method_body()
 
     return tree.ConstructorDeclaration(parameters=formal_parameters, throws=throws, body=body)
   
@@ -883,7 +1172,10 @@ class Parser(object):
 
     self.accept('{')
     while not self.would_accept('}'):
-      declaration = self.parse_interface_body_declaration()
+      if self.unclosed_body():
+        return declarations
+
+      declaration = self.parse_or_skip(self.parse_interface_body_declaration)
 
       if declaration:
         declarations.append(declaration)
@@ -919,6 +1211,8 @@ class Parser(object):
       declaration = self.parse_enum_declaration()
     elif self.is_annotation_declaration():
       declaration = self.parse_annotation_type_declaration()
+    elif self.is_record_declaration():
+      declaration = self.parse_record_declaration()
     elif self.would_accept('<'):
       declaration = self.parse_interface_generic_method_declarator()
     elif self.try_accept('void'):
@@ -962,8 +1256,8 @@ class Parser(object):
   
   @parse_debug
   def parse_constant_declarators_rest(self):
-    array_dimension, initializer = self.parse_constant_declarator_self()
-    declarators = [tree.VariableDeclaration(dimensions=array_dimension, initializer=initializer)]
+    array_dimension, initializer = self.parse_constant_declarator_rest()
+    declarators = [tree.VariableDeclarator(dimensions=array_dimension, initializer=initializer)]
 
     while self.try_accept(','):
       declarator = self.parse_constant_declarator()
@@ -975,7 +1269,7 @@ class Parser(object):
   def parse_constant_declarator_rest(self):
     array_dimension = self.parse_array_dimension()
     self.accept('=')
-    initializer = self.parse_varible_initializer()
+    initializer = self.parse_variable_initializer()
 
     return (array_dimension, initializer)
   
@@ -996,12 +1290,12 @@ class Parser(object):
     if self.try_accept('throws'):
       throws = self.parse_qualified_identifier_list()
 
-      if self.would_accept('{'):
-        body = self.parse_block()
-      else:
-        self.accept(';')
-      
-      return tree.MethodDeclaration(parameters=parameters, throws=throws, body=body, return_type=tree.Type(dimensions=array_dimension))
+    if self.would_accept('{'):
+      body = self.parse_method_body()
+    else:
+      self.accept(';')
+    
+    return tree.MethodDeclaration(parameters=parameters, throws=throws, body=body, return_type=tree.Type(dimensions=array_dimension))
   
   @parse_debug
   def parse_void_interface_method_declarator_rest(self):
@@ -1013,7 +1307,7 @@ class Parser(object):
       throws = self.parse_qualified_identifier_list()
     
     if self.would_accept('{'):
-      body = self.parse_block()
+      body = self.parse_method_body()
     else:
       self.accept(';')
 
@@ -1035,13 +1329,1357 @@ class Parser(object):
     method.type_parameters = type_parameters
 
     return method
-  ## Stopped in parse_formal_parameters
   
+  @parse_debug
+  def parse_formal_parameters(self):
+    formal_parameters = list()
+
+    self.accept('(')
+
+    if self.try_accept(')'):
+      return formal_parameters
+
+    while True:
+      modifiers, annotations = self.parse_variable_modifiers()
+
+      token = self.tokens.look()
+      parameter_type = self.parse_type()
+      varargs = False
+
+      if self.try_accept('...'):
+        varargs = True
+
+      parameter_name = self.parse_identifier()
+      parameter_type.dimensions += self.parse_array_dimension()
+
+      formal_parameter = tree.FormalParameter(modifiers=modifiers, annotations=annotations, type=parameter_type, name=parameter_name, varargs=varargs)
+      formal_parameter._position = token.position
+      formal_parameters.append(formal_parameter)
+
+      if varargs:
+        # varargs parameter must be the last
+        break
+
+      if not self.try_accept(','):
+        break
+
+    self.accept(')')
+
+    return formal_parameters
+  
+  @parse_debug
+  def parse_variable_modifiers(self):
+    modifiers = set()
+    annotations = list()
+
+    while True:
+      token = self.tokens.look()
+
+      if self.try_accept('final'):
+        modifiers.add('final')
+      elif self.is_annotation():
+        annotation = self.parse_annotation()
+        annotation._position = token.position
+        annotations.append(annotation)
+      else:
+        break
+
+    return modifiers, annotations
+  
+  @parse_debug
+  def parse_variable_declarators(self):
+    variable_declarators = list()
+
+    while True:
+      variable_declarator = self.parse_variable_declarator()
+      variable_declarators.append(variable_declarator)
+
+      if not self.try_accept(','):
+        break
+
+    return variable_declarators
+  
+  @parse_debug
+  def parse_variable_declarator(self):
+    identifier = self.parse_identifier()
+    array_dimension, initializer = self.parse_variable_declarator_rest()
+
+    return tree.VariableDeclarator(name=identifier, dimensions=array_dimension, initializer=initializer)
+  
+  @parse_debug
+  def parse_variable_declarator_rest(self):
+    array_dimension = self.parse_array_dimension()
+    initializer = None
+
+    if self.try_accept('='):
+      initializer = self.parse_variable_initializer()
+
+    return (array_dimension, initializer)
+  
+  @parse_debug
+  def parse_variable_initializer(self):
+    if self.would_accept('{'):
+      return self.parse_array_initializer()
+    else:
+      return self.parse_expression()
+  
+  @parse_debug
+  def parse_array_initializer(self):
+    array_initializer = tree.ArrayInitializer(initializers=list())
+
+    self.accept('{')
+
+    if self.try_accept(','):
+      self.accept('}')
+      return array_initializer
+
+    if self.try_accept('}'):
+      return array_initializer
+
+    while True:
+      initializer = self.parse_variable_initializer()
+      array_initializer.initializers.append(initializer)
+
+      if not self.would_accept('}'):
+        self.accept(',')
+
+      if self.try_accept('}'):
+        return array_initializer
+  
+  def parse_method_body(self):
+    if self.skeleton:
+      return self.skip_block()
+
+    return self.parse_block()
+
+  def skip_block(self):
+    """Moves past a block by counting braces instead of parsing it, and
+    returns its span as a SkippedBlock."""
+    tokens = self.tokens
+    token_list = tokens.list
+    open_brace = tokens.look()
+    index = tokens.marker
+
+    if open_brace.value != '{':
+      self.illegal("Expected '{'")
+
+    if isinstance(token_list, TokenBuffer):
+      end = token_list.matching_brace(index)
+    else:
+      end = None
+      depth = 0
+
+      for i in range(index, len(token_list)):
+        value = token_list[i].value
+
+        if value == '{':
+          depth += 1
+        elif value == '}':
+          depth -= 1
+
+          if not depth:
+            end = i
+            break
+
+    if end is None:
+      self.illegal("Unexpected end of input", tokens.default)
+
+    close_brace = token_list[end]
+    tokens.marker = end + 1
+    tokens.value = close_brace
+
+    start, end = open_brace.start, close_brace.start + 1
+
+    if open_brace.lines is not None:
+      start, end = open_brace.lines.source_offset(start), open_brace.lines.source_offset(end)
+
+    block = tree.SkippedBlock(start=start, end=end)
+    block._position = open_brace.position
+
+    return block
+
+  @parse_debug
+  def parse_block(self):
+    statements = list()
+
+    self.accept('{')
+
+    while not self.would_accept('}'):
+      statement = self.parse_block_statement()
+      statements.append(statement)
+
+    self.accept('}')
+
+    return statements
+  
+  @parse_debug
+  def parse_block_statement(self):
+    token = None
+    found_annotations = False
+    i = 0
+
+    # Look past annotations and modifiers. If we find a local class
+    # declaration we can skip the statement forms
+    while True:
+      token = self.tokens.look(i)
+
+      if isinstance(token, Modifier):
+        i += 1
+      elif self.is_annotation(i):
+        found_annotations = True
+
+        i += 2
+        while self.tokens.look(i).value == '.':
+          i += 2
+
+        if self.tokens.look(i).value == '(':
+          parens = 1
+          i += 1
+
+          while parens > 0 and not isinstance(self.tokens.look(i), EndOfInput):
+            token = self.tokens.look(i)
+
+            if token.value == '(':
+              parens += 1
+            elif token.value == ')':
+              parens -= 1
+
+            i += 1
+      else:
+        break
+
+    if token.value in ('class', 'enum', 'interface', '@') or (token.value == 'record' and self.is_record_declaration(i)):
+      return self.parse_class_or_interface_declaration()
+
+    if found_annotations or isinstance(token, BasicType):
+      statement = self.parse_local_variable_declaration_statement()
+      statement._position = token.position
+
+      return statement
+
+    # A local variable declaration has to start with a type, so anything
+    # other than an identifier here is a plain statement
+    if not isinstance(token, Identifier) or (token.value == 'yield' and self.is_yield_statement()):
+      return self.parse_statement()
+
+    # Try a local variable declaration first and fall back to a statement
+    statement = self.speculate('parse_local_variable_declaration_statement')
+
+    if statement is None:
+      return self.parse_statement()
+
+    statement._position = token.position
+
+    return statement
+  
+  @parse_debug
+  def parse_local_variable_declaration_statement(self):
+    modifiers, annotations = self.parse_variable_modifiers()
+    java_type = self.parse_type()
+    declarators = self.parse_variable_declarators()
+    self.accept(';')
+
+    return tree.LocalVariableDeclaration(modifiers=modifiers, annotations=annotations, type=java_type, declarators=declarators)
+  
+  @parse_debug
+  def parse_statement(self):
+    token = self.tokens.look()
+    statement = None
+
+    if self.would_accept('{'):
+      block = self.parse_block()
+      statement = tree.BlockStatement(statements=block)
+
+    elif self.try_accept(';'):
+      statement = tree.Statement()
+
+    elif self.try_accept('if'):
+      condition = self.parse_par_expression()
+      then = self.parse_statement()
+      else_statement = None
+
+      if self.try_accept('else'):
+        else_statement = self.parse_statement()
 
+      statement = tree.IfStatement(condition=condition, then_statement=then, else_statement=else_statement)
 
+    elif self.try_accept('assert'):
+      condition = self.parse_expression()
+      value = None
 
+      if self.try_accept(':'):
+        value = self.parse_expression()
+
+      self.accept(';')
+      statement = tree.AssertStatement(condition=condition, value=value)
+
+    elif self.try_accept('switch'):
+      switch_expression = self.parse_par_expression()
+      self.accept('{')
+      switch_block = self.parse_switch_block_statement_groups()
+      self.accept('}')
+
+      statement = tree.SwitchStatement(expression=switch_expression, cases=switch_block)
+
+    elif self.try_accept('while'):
+      condition = self.parse_par_expression()
+      action = self.parse_statement()
+
+      statement = tree.WhileStatement(condition=condition, body=action)
+
+    elif self.try_accept('do'):
+      action = self.parse_statement()
+      self.accept('while')
+      condition = self.parse_par_expression()
+      self.accept(';')
 
+      statement = tree.DoStatement(condition=condition, body=action)
 
+    elif self.try_accept('for'):
+      self.accept('(')
+      for_control = self.parse_for_control()
+      self.accept(')')
+      for_statement = self.parse_statement()
+
+      statement = tree.ForStatement(control=for_control, body=for_statement)
+
+    elif self.would_accept('break') or self.would_accept('continue'):
+      keyword = self.accept(Keyword)
+      label = None
+
+      if self.would_accept(Identifier):
+        label = self.parse_identifier()
+
+      self.accept(';')
+
+      if keyword == 'break':
+        statement = tree.BreakStatement(goto=label)
+      else:
+        statement = tree.ContinueStatement(goto=label)
+
+    elif self.try_accept('return'):
+      value = None
+
+      if not self.would_accept(';'):
+        value = self.parse_expression()
+
+      self.accept(';')
+      statement = tree.ReturnStatement(expression=value)
+
+    elif self.try_accept('synchronized'):
+      lock = self.parse_par_expression()
+      block = self.parse_block()
+
+      statement = tree.SynchronizedStatement(lock=lock, block=block)
+
+    elif self.try_accept('throw'):
+      expression = self.parse_expression()
+      self.accept(';')
+
+      statement = tree.ThrowStatement(expression=expression)
+
+    elif self.try_accept('try'):
+      resource_specification = None
+      catches = None
+      finally_block = None
+
+      if not self.would_accept('{'):
+        resource_specification = self.parse_resource_specification()
+
+      block = self.parse_block()
+
+      if self.would_accept('catch'):
+        catches = self.parse_catches()
+
+      if self.try_accept('finally'):
+        finally_block = self.parse_block()
+
+      if resource_specification is None and catches is None and finally_block is None:
+        self.illegal("Expected catch/finally block")
+
+      statement = tree.TryStatement(resources=resource_specification, block=block, catches=catches, finally_block=finally_block)
+
+    elif token.value == 'yield' and self.is_yield_statement():
+      self.accept('yield')
+      expression = self.parse_expression()
+      self.accept(';')
+
+      statement = tree.YieldStatement(expression=expression)
+
+    elif self.would_accept(Identifier, ':'):
+      label = self.parse_identifier()
+      self.accept(':')
+
+      statement = self.parse_statement()
+      statement.label = label
+
+    else:
+      expression = self.parse_expression()
+      self.accept(';')
+
+      statement = tree.StatementExpression(expression=expression)
+
+    statement._position = token.position
+
+    return statement
+  
+  @parse_debug
+  def parse_catches(self):
+    catches = list()
+
+    while True:
+      catch = self.parse_catch_clause()
+      catches.append(catch)
+
+      if not self.would_accept('catch'):
+        break
+
+    return catches
+  
+  @parse_debug
+  def parse_catch_clause(self):
+    self.accept('catch', '(')
+
+    modifiers, annotations = self.parse_variable_modifiers()
+    catch_parameter = tree.CatchClauseParameter(modifiers=modifiers, annotations=annotations, types=list())
+
+    while True:
+      catch_type = self.parse_qualified_identifier()
+      catch_parameter.types.append(catch_type)
+
+      if not self.try_accept('|'):
+        break
+
+    catch_parameter.name = self.parse_identifier()
+
+    self.accept(')')
+    block = self.parse_block()
+
+    return tree.CatchClause(parameter=catch_parameter, block=block)
+  
+  @parse_debug
+  def parse_resource_specification(self):
+    resources = list()
+
+    self.accept('(')
+
+    while True:
+      resource = self.parse_resource()
+      resources.append(resource)
+
+      if not self.would_accept(')'):
+        self.accept(';')
+
+      if self.try_accept(')'):
+        break
+
+    return resources
+  
+  @parse_debug
+  def parse_resource(self):
+    modifiers, annotations = self.parse_variable_modifiers()
+    reference_type = self.parse_reference_type()
+    reference_type.dimensions = self.parse_array_dimension()
+    name = self.parse_identifier()
+    reference_type.dimensions += self.parse_array_dimension()
+    self.accept('=')
+    value = self.parse_expression()
+
+    return tree.TryResource(modifiers=modifiers, annotations=annotations, type=reference_type, name=name, value=value)
+  
+  @parse_debug
+  def parse_switch_block_statement_groups(self):
+    statement_groups = list()
+
+    while self.tokens.look().value in ('case', 'default'):
+      statement_group = self.parse_switch_block_statement_group()
+      statement_groups.append(statement_group)
+
+    return statement_groups
+  
+  @parse_debug
+  def parse_switch_block_statement_group(self):
+    labels = list()
+    statements = list()
+    guard = None
+
+    while True:
+      if self.try_accept('default'):
+        labels.append('default')
+      else:
+        self.accept('case')
+
+        while True:
+          labels.append(self.parse_switch_label())
+
+          if not self.try_accept(','):
+            break
+
+        if self.try_accept('when'):
+          guard = self.parse_expression()
+
+      if self.try_accept('->'):
+        return tree.SwitchRule(case=labels, guard=guard, statements=[self.parse_switch_rule_body()])
+
+      self.accept(':')
+
+      if self.tokens.look().value not in ('case', 'default'):
+        break
+
+    while self.tokens.look().value not in ('case', 'default', '}'):
+      statement = self.parse_block_statement()
+      statements.append(statement)
+
+    return tree.SwitchStatementCase(case=labels, guard=guard, statements=statements)
+  
+  @parse_debug
+  def parse_switch_label(self):
+    if self.try_accept('default'):
+      return 'default'
+
+    token = self.tokens.look(1)
+
+    if isinstance(self.tokens.look(), Identifier) and token.value in (':', '->', ','):
+      return self.parse_identifier()
+
+    # A type pattern has a type followed by a name, a record pattern a type
+    # followed by parentheses; anything else is a constant expression
+    pattern = self.speculate('parse_pattern')
+
+    if pattern is not None:
+      return pattern
+
+    return self.parse_expressionl()
+  
+  @parse_debug
+  def parse_switch_rule_body(self):
+    token = self.tokens.look()
+
+    if self.would_accept('{'):
+      statement = tree.BlockStatement(statements=self.parse_block())
+    elif self.would_accept('throw'):
+      return self.parse_statement()
+    else:
+      statement = tree.StatementExpression(expression=self.parse_expression())
+      self.accept(';')
+
+    statement._position = token.position
+
+    return statement
+  
+  @parse_debug
+  def parse_pattern(self):
+    modifiers, annotations = self.parse_variable_modifiers()
+    token = self.tokens.look()
+    pattern_type = self.parse_type()
+
+    pattern = self.parse_pattern_rest(pattern_type)
+    pattern._position = token.position
+
+    if isinstance(pattern, tree.TypePattern):
+      pattern.modifiers = modifiers
+      pattern.annotations = annotations
+
+    return pattern
+  
+  def parse_pattern_rest(self, pattern_type):
+    if self.try_accept('('):
+      patterns = list()
+
+      if not self.would_accept(')'):
+        while True:
+          patterns.append(self.parse_pattern())
+
+          if not self.try_accept(','):
+            break
+
+      self.accept(')')
+
+      return tree.RecordPattern(type=pattern_type, patterns=patterns)
+
+    return tree.TypePattern(type=pattern_type, name=self.parse_identifier())
+  
+  @parse_debug
+  def parse_for_control(self):
+    # Try a variable declaration control first and fall back to the
+    # three part expression control
+    control = self.speculate('parse_for_var_control')
+
+    if control is not None:
+      return control
+
+    init = None
+    if not self.would_accept(';'):
+      init = self.parse_for_init_or_update()
+
+    self.accept(';')
+
+    condition = None
+    if not self.would_accept(';'):
+      condition = self.parse_expression()
+
+    self.accept(';')
+
+    update = None
+    if not self.would_accept(')'):
+      update = self.parse_for_init_or_update()
+
+    return tree.ForControl(init=init, condition=condition, update=update)
+  
+  @parse_debug
+  def parse_for_var_control(self):
+    modifiers, annotations = self.parse_variable_modifiers()
+    var_type = self.parse_type()
+    var_name = self.parse_identifier()
+    var_type.dimensions += self.parse_array_dimension()
+
+    var = tree.VariableDeclaration(modifiers=modifiers, annotations=annotations, type=var_type)
+
+    rest = self.parse_for_var_control_rest()
+
+    if isinstance(rest, tree.Expression):
+      var.declarators = [tree.VariableDeclarator(name=var_name)]
+
+      return tree.EnhancedForControl(var=var, iterable=rest)
+    else:
+      declarators, condition, update = rest
+      declarators[0].name = var_name
+      var.declarators = declarators
+
+      return tree.ForControl(init=var, condition=condition, update=update)
+  
+  @parse_debug
+  def parse_for_var_control_rest(self):
+    if self.try_accept(':'):
+      return self.parse_expression()
+
+    declarators = self.parse_for_variable_declarator_rest()
+    self.accept(';')
+
+    condition = None
+    if not self.would_accept(';'):
+      condition = self.parse_expression()
+
+    self.accept(';')
+
+    update = None
+    if not self.would_accept(')'):
+      update = self.parse_for_init_or_update()
+
+    return (declarators, condition, update)
+  
+  @parse_debug
+  def parse_for_variable_declarator_rest(self):
+    initializer = None
+
+    if self.try_accept('='):
+      initializer = self.parse_variable_initializer()
+
+    declarators = [tree.VariableDeclarator(dimensions=list(), initializer=initializer)]
+
+    while self.try_accept(','):
+      declarator = self.parse_variable_declarator()
+      declarators.append(declarator)
+
+    return declarators
+  
+  @parse_debug
+  def parse_for_init_or_update(self):
+    expressions = list()
+
+    while True:
+      expression = self.parse_expression()
+      expressions.append(expression)
+
+      if not self.try_accept(','):
+        break
+
+    return expressions
+  
+  @parse_debug
+  def parse_expression(self):
+    expressionl = self.parse_expressionl()
+
+    if self.tokens.look().value in Operator.ASSIGNMENT:
+      assignment_type = self.tokens.next().value
+      assignment_expression = self.parse_expression()
+
+      return tree.Assignment(expressionl=expressionl, type=assignment_type, value=assignment_expression)
+    else:
+      return expressionl
+  
+  @parse_debug
+  def parse_expressionl(self):
+    expression_2 = self.parse_expression_2()
+
+    if self.try_accept('?'):
+      true_expression = self.parse_expression()
+      self.accept(':')
+      false_expression = self.parse_expressionl()
+
+      return tree.TernaryExpression(condition=expression_2, if_true=true_expression, if_false=false_expression)
+
+    if self.would_accept('->') and isinstance(expression_2, tree.MemberReference) and not expression_2.qualifier:
+      self.accept('->')
+      parameter = tree.InferredFormalParameter(name=expression_2.member)
+      parameter._position = expression_2.position
+      body = self.parse_lambda_method_body()
+
+      return tree.LambdaExpression(parameters=[parameter], body=body)
+
+    if self.try_accept('::'):
+      method_reference, type_arguments = self.parse_method_reference()
+
+      return tree.MethodReference(expression=expression_2, method=method_reference, type_arguments=type_arguments)
+
+    return expression_2
+  
+  @parse_debug
+  def parse_expression_2(self):
+    expression_3 = self.parse_expression_3()
+    token = self.tokens.look()
+
+    if token.value in Operator.INFIX or token.value == 'instanceof':
+      parts = self.parse_expression_2_rest()
+      parts.insert(0, expression_3)
+
+      return self.build_binary_operation(parts)
+
+    return expression_3
+  
+  @parse_debug
+  def parse_expression_2_rest(self):
+    parts = list()
+
+    token = self.tokens.look()
+    while token.value in Operator.INFIX or token.value == 'instanceof':
+      if self.try_accept('instanceof'):
+        token = self.tokens.look()
+
+        if self.would_accept('final') or self.is_annotation():
+          comparison_type = self.parse_pattern()
+        else:
+          comparison_type = self.parse_type()
+
+          if self.would_accept(Identifier) or self.would_accept('('):
+            comparison_type = self.parse_pattern_rest(comparison_type)
+            comparison_type._position = token.position
+
+        parts.extend(('instanceof', comparison_type))
+      else:
+        operator = self.parse_infix_operator()
+        expression = self.parse_expression_3()
+        parts.extend((operator, expression))
+
+      token = self.tokens.look()
+
+    return parts
+  
+  @parse_debug
+  def parse_infix_operator(self):
+    operator = self.accept(Operator)
+
+    if not operator in Operator.INFIX:
+      self.illegal("Expected infix operator")
+
+    # The tokenizer splits '>>' and '>>>' so type argument lists can close
+    if operator == '>' and self.try_accept('>'):
+      operator = '>>'
+
+      if self.try_accept('>'):
+        operator = '>>>'
+
+    return operator
+  
+  @parse_debug
+  def parse_expression_3(self):
+    prefix_operators = list()
+
+    while self.tokens.look().value in Operator.PREFIX:
+      prefix_operators.append(self.tokens.next().value)
+
+    if self.would_accept('('):
+      expression = self.speculate('parse_lambda_expression')
+
+      if expression is None:
+        expression = self.speculate('parse_cast')
+
+      if expression is not None:
+        if prefix_operators:
+          # Keep the operators of e.g. -(int) x on a parenthesized wrapper
+          expression = tree.ParenthesizedExpression(expression=expression, prefix_operators=prefix_operators, selectors=list(), postfix_operators=list())
+
+        return expression
+
+    elif not prefix_operators and self.is_method_reference_type():
+      # A type such as String[] or List<String> can only be followed by
+      # '::' here; anything else is an expression
+      token = self.tokens.look()
+      method_type = self.speculate('parse_method_reference_type')
+
+      if method_type is not None:
+        method_type._position = token.position
+
+        return method_type
+
+    primary = self.parse_primary()
+    primary.prefix_operators = prefix_operators
+    primary.selectors = list()
+    primary.postfix_operators = list()
+
+    token = self.tokens.look()
+    while token.value in ('[', '.'):
+      selector = self.parse_selector()
+      selector._position = token.position
+      primary.selectors.append(selector)
+
+      token = self.tokens.look()
+
+    while token.value in Operator.POSTFIX:
+      primary.postfix_operators.append(self.tokens.next().value)
+      token = self.tokens.look()
+
+    return primary
+  
+  @parse_debug
+  def parse_cast(self):
+    self.accept('(')
+    cast_target = self.parse_type()
+    self.accept(')')
+
+    # (Name) + x is an addition; only primitive casts take a signed operand
+    if not isinstance(cast_target, tree.BasicType) and self.tokens.look().value in ('+', '-', '++', '--'):
+      self.illegal("Expected cast operand")
+
+    expression = self.parse_expression_3()
+
+    return tree.Cast(type=cast_target, expression=expression)
+  
+  @parse_debug
+  def parse_method_reference_type(self):
+    method_type = self.parse_type()
+
+    if not self.would_accept('::'):
+      self.illegal("Expected '::'")
+
+    return method_type
+  
+  @parse_debug
+  def parse_method_reference(self):
+    type_arguments = list()
+
+    if self.would_accept('<'):
+      type_arguments = self.parse_nonwildcard_type_arguments()
+
+    if self.would_accept('new'):
+      method_reference = tree.MemberReference(member=self.accept('new'))
+    else:
+      method_reference = tree.MemberReference(member=self.parse_identifier())
+
+    return method_reference, type_arguments
+  
+  @parse_debug
+  def parse_lambda_expression(self):
+    if self.would_accept('(', Identifier, ',') or self.would_accept('(', Identifier, ')'):
+      parameters = list()
+
+      self.accept('(')
+
+      while True:
+        parameters.append(tree.InferredFormalParameter(name=self.parse_identifier()))
+
+        if not self.try_accept(','):
+          break
+
+      self.accept(')')
+    else:
+      parameters = self.parse_formal_parameters()
+
+    self.accept('->')
+    body = self.parse_lambda_method_body()
+
+    return tree.LambdaExpression(parameters=parameters, body=body)
+  
+  @parse_debug
+  def parse_lambda_method_body(self):
+    if self.would_accept('{'):
+      return self.parse_block()
+    else:
+      return self.parse_expression()
+  
+  @parse_debug
+  def parse_primary(self):
+    token = self.tokens.look()
+
+    if isinstance(token, Literal):
+      literal = self.parse_literal()
+      literal._position = token.position
+
+      return literal
+
+    elif token.value == '(':
+      expression = tree.ParenthesizedExpression(expression=self.parse_par_expression())
+      expression._position = token.position
+
+      return expression
+
+    elif self.try_accept('switch'):
+      switch_expression = self.parse_par_expression()
+      self.accept('{')
+      switch_block = self.parse_switch_block_statement_groups()
+      self.accept('}')
+
+      expression = tree.SwitchExpression(expression=switch_expression, cases=switch_block)
+      expression._position = token.position
+
+      return expression
+
+    elif self.try_accept('this'):
+      if self.would_accept('('):
+        arguments = self.parse_arguments()
+        return tree.ExplicitConstructorInvocation(arguments=arguments)
+
+      return tree.This()
+
+    elif self.try_accept('super'):
+      return self.parse_super_suffix()
+
+    elif self.try_accept('new'):
+      return self.parse_creator()
+
+    elif token.value == '<':
+      type_arguments = self.parse_nonwildcard_type_arguments()
+
+      if self.try_accept('this'):
+        arguments = self.parse_arguments()
+        return tree.ExplicitConstructorInvocation(type_arguments=type_arguments, arguments=arguments)
+      else:
+        invocation = self.parse_explicit_generic_invocation_suffix()
+        invocation._position = token.position
+        invocation.type_arguments = type_arguments
+
+        return invocation
+
+    elif isinstance(token, Identifier):
+      qualified_identifier = [self.parse_identifier()]
+
+      while self.would_accept('.', Identifier):
+        self.accept('.')
+        identifier = self.parse_identifier()
+        qualified_identifier.append(identifier)
+
+      identifier_suffix = self.parse_identifier_suffix()
+
+      if isinstance(identifier_suffix, (tree.MemberReference, tree.MethodInvocation)):
+        # Take the last identifier as the member and leave the rest for the qualifier
+        identifier_suffix.member = qualified_identifier.pop()
+
+      elif isinstance(identifier_suffix, tree.ClassReference):
+        identifier_suffix.type = tree.ReferenceType(name=qualified_identifier.pop(), dimensions=identifier_suffix.type.dimensions)
+
+      identifier_suffix._position = token.position
+      identifier_suffix.qualifier = '.'.join(qualified_identifier)
+
+      return identifier_suffix
+
+    elif isinstance(token, BasicType):
+      base_type = self.parse_basic_type()
+      base_type.dimensions = self.parse_array_dimension()
+      self.accept('.', 'class')
+
+      return tree.ClassReference(type=base_type)
+
+    elif self.try_accept('void'):
+      self.accept('.', 'class')
+
+      return tree.VoidClassReference()
+
+    self.illegal("Expected expression")
+  
+  @parse_debug
+  def parse_literal(self):
+    literal = self.accept(Literal)
+
+    return tree.Literal(value=literal)
+  
+  @parse_debug
+  def parse_par_expression(self):
+    self.accept('(')
+    expression = self.parse_expression()
+    self.accept(')')
+
+    return expression
+  
+  @parse_debug
+  def parse_arguments(self):
+    expressions = list()
+
+    self.accept('(')
+
+    if self.try_accept(')'):
+      return expressions
+
+    while True:
+      expression = self.parse_expression()
+      expressions.append(expression)
+
+      if not self.try_accept(','):
+        break
+
+    self.accept(')')
+
+    return expressions
+  
+  @parse_debug
+  def parse_super_suffix(self):
+    identifier = None
+    type_arguments = None
+    arguments = None
+
+    if self.would_accept('::'):
+      # super::method, the method reference itself is built by parse_expressionl
+      return tree.SuperMemberReference()
+
+    if self.try_accept('.'):
+      if self.would_accept('<'):
+        type_arguments = self.parse_nonwildcard_type_arguments()
+
+      identifier = self.parse_identifier()
+
+      if self.would_accept('('):
+        arguments = self.parse_arguments()
+    else:
+      arguments = self.parse_arguments()
+
+    if identifier and arguments is not None:
+      return tree.SuperMethodInvocation(member=identifier, arguments=arguments, type_arguments=type_arguments)
+    elif arguments is not None:
+      return tree.SuperConstructorInvocation(arguments=arguments)
+    else:
+      return tree.SuperMemberReference(member=identifier)
+  
+  @parse_debug
+  def parse_explicit_generic_invocation_suffix(self):
+    if self.try_accept('super'):
+      return self.parse_super_suffix()
+    else:
+      identifier = self.parse_identifier()
+      arguments = self.parse_arguments()
+
+      return tree.MethodInvocation(member=identifier, arguments=arguments)
+  
+  @parse_debug
+  def parse_creator(self):
+    constructor_type_arguments = None
+
+    if self.would_accept(BasicType):
+      created_name = self.parse_basic_type()
+      rest = self.parse_array_creator_rest()
+      rest.type = created_name
+
+      return rest
+
+    if self.would_accept('<'):
+      constructor_type_arguments = self.parse_nonwildcard_type_arguments()
+
+    created_name = self.parse_created_name()
+
+    if self.would_accept('['):
+      if constructor_type_arguments:
+        self.illegal("Array creator not allowed with generic constructor type arguments")
+
+      rest = self.parse_array_creator_rest()
+      rest.type = created_name
+
+      return rest
+    else:
+      arguments, body = self.parse_class_creator_rest()
+
+      return tree.ClassCreator(constructor_type_arguments=constructor_type_arguments, type=created_name, arguments=arguments, body=body)
+  
+  @parse_debug
+  def parse_created_name(self):
+    created_name = tree.ReferenceType()
+    tail = created_name
+
+    while True:
+      tail.annotations = self.parse_type_annotations()
+      tail.name = self.parse_identifier()
+
+      if self.would_accept('<'):
+        tail.arguments = self.parse_type_arguments_or_diamond()
+
+      if self.try_accept('.'):
+        tail.sub_type = tree.ReferenceType()
+        tail = tail.sub_type
+      else:
+        break
+
+    return created_name
+  
+  @parse_debug
+  def parse_class_creator_rest(self):
+    arguments = self.parse_arguments()
+    class_body = None
+
+    if self.would_accept('{'):
+      class_body = self.parse_class_body()
+
+    return (arguments, class_body)
+  
+  @parse_debug
+  def parse_array_creator_rest(self):
+    if self.would_accept('[', ']'):
+      array_dimension = self.parse_array_dimension()
+      array_initializer = self.parse_array_initializer()
+
+      return tree.ArrayCreator(dimensions=array_dimension, initializer=array_initializer)
+    else:
+      array_dimensions = list()
+
+      while self.would_accept('[') and not self.would_accept('[', ']'):
+        self.accept('[')
+        expression = self.parse_expression()
+        array_dimensions.append(expression)
+        self.accept(']')
+
+      array_dimensions += self.parse_array_dimension()
+
+      return tree.ArrayCreator(dimensions=array_dimensions)
+  
+  @parse_debug
+  def parse_identifier_suffix(self):
+    if self.try_accept('[', ']'):
+      array_dimension = [None] + self.parse_array_dimension()
+      self.accept('.', 'class')
+
+      return tree.ClassReference(type=tree.Type(dimensions=array_dimension))
+
+    elif self.would_accept('('):
+      arguments = self.parse_arguments()
+
+      return tree.MethodInvocation(arguments=arguments)
+
+    elif self.try_accept('.', 'class'):
+      return tree.ClassReference(type=tree.Type(dimensions=list()))
+
+    elif self.try_accept('.', 'this'):
+      return tree.This()
+
+    elif self.would_accept('.', '<'):
+      self.accept('.')
+
+      return self.parse_explicit_generic_invocation()
+
+    elif self.try_accept('.', 'new'):
+      type_arguments = None
+
+      if self.would_accept('<'):
+        type_arguments = self.parse_nonwildcard_type_arguments()
+
+      inner_creator = self.parse_inner_creator()
+      inner_creator.constructor_type_arguments = type_arguments
+
+      return inner_creator
+
+    elif self.would_accept('.', 'super', '('):
+      self.accept('.', 'super')
+      arguments = self.parse_arguments()
+
+      return tree.SuperConstructorInvocation(arguments=arguments)
+
+    else:
+      return tree.MemberReference()
+  
+  @parse_debug
+  def parse_explicit_generic_invocation(self):
+    type_arguments = self.parse_nonwildcard_type_arguments()
+
+    token = self.tokens.look()
+
+    invocation = self.parse_explicit_generic_invocation_suffix()
+    invocation._position = token.position
+    invocation.type_arguments = type_arguments
+
+    return invocation
+  
+  @parse_debug
+  def parse_inner_creator(self):
+    identifier = self.parse_identifier()
+    type_arguments = None
+
+    if self.would_accept('<'):
+      type_arguments = self.parse_nonwildcard_type_arguments_or_diamond()
+
+    java_type = tree.ReferenceType(name=identifier, arguments=type_arguments)
+
+    arguments, class_body = self.parse_class_creator_rest()
+
+    return tree.InnerClassCreator(type=java_type, arguments=arguments, body=class_body)
+  
+  @parse_debug
+  def parse_selector(self):
+    if self.try_accept('['):
+      expression = self.parse_expression()
+      self.accept(']')
+
+      return tree.ArraySelector(index=expression)
+
+    elif self.try_accept('.'):
+      token = self.tokens.look()
+
+      if isinstance(token, Identifier):
+        identifier = self.parse_identifier()
+
+        if self.would_accept('('):
+          arguments = self.parse_arguments()
+
+          return tree.MethodInvocation(member=identifier, arguments=arguments)
+        else:
+          return tree.MemberReference(member=identifier)
+
+      elif self.would_accept('<'):
+        return self.parse_explicit_generic_invocation()
+
+      elif self.try_accept('this'):
+        return tree.This()
+
+      elif self.try_accept('super'):
+        return self.parse_super_suffix()
+
+      elif self.try_accept('new'):
+        type_arguments = None
+
+        if self.would_accept('<'):
+          type_arguments = self.parse_nonwildcard_type_arguments()
+
+        inner_creator = self.parse_inner_creator()
+        inner_creator.constructor_type_arguments = type_arguments
+
+        return inner_creator
+
+    self.illegal("Expected selector")
+  
+  @parse_debug
+  def parse_enum_body(self):
+    constants = list()
+    body_declarations = list()
+
+    self.accept('{')
+
+    if not self.try_accept(','):
+      while not (self.would_accept(';') or self.would_accept('}')):
+        constant = self.parse_enum_constant()
+        constants.append(constant)
+
+        if not self.try_accept(','):
+          break
+
+    if self.try_accept(';'):
+      while not self.would_accept('}'):
+        declaration = self.parse_class_body_declaration()
+
+        if declaration:
+          body_declarations.append(declaration)
+
+    self.accept('}')
+
+    return tree.EnumBody(constants=constants, declarations=body_declarations)
+  
+  @parse_debug
+  def parse_enum_constant(self):
+    annotations = list()
+    javadoc = None
+    arguments = None
+    body = None
+
+    token = self.tokens.look()
+
+    if token:
+      javadoc = token.javadoc
+
+    if self.is_annotation():
+      annotations = self.parse_annotations()
+
+    constant_name = self.parse_identifier()
+
+    if self.would_accept('('):
+      arguments = self.parse_arguments()
+
+    if self.would_accept('{'):
+      body = self.parse_class_body()
+
+    constant = tree.EnumConstantDeclaration(annotations=annotations, documentation=javadoc, name=constant_name, arguments=arguments, body=body)
+    constant._position = token.position
+
+    return constant
+  
+  @parse_debug
+  def parse_annotation_type_body(self):
+    declarations = list()
+
+    self.accept('{')
+
+    while not self.would_accept('}'):
+      declaration = self.parse_annotation_type_element_declaration()
+
+      if declaration:
+        declarations.append(declaration)
+
+    self.accept('}')
+
+    return declarations
+  
+  @parse_debug
+  def parse_annotation_type_element_declaration(self):
+    if self.try_accept(';'):
+      return None
+
+    modifiers, annotations, javadoc = self.parse_modifiers()
+    declaration = None
+
+    token = self.tokens.look()
+
+    if self.would_accept('class'):
+      declaration = self.parse_normal_class_declaration()
+    elif self.would_accept('interface'):
+      declaration = self.parse_normal_interface_declaration()
+    elif self.would_accept('enum'):
+      declaration = self.parse_enum_declaration()
+    elif self.is_annotation_declaration():
+      declaration = self.parse_annotation_type_declaration()
+    else:
+      attribute_type = self.parse_type()
+      attribute_name = self.parse_identifier()
+      declaration = self.parse_annotation_method_or_constant_rest()
+      self.accept(';')
+
+      if isinstance(declaration, tree.AnnotationMethod):
+        declaration.name = attribute_name
+        declaration.return_type = attribute_type
+      else:
+        declaration.declarators[0].name = attribute_name
+        declaration.type = attribute_type
+
+    declaration._position = token.position
+    declaration.modifiers = modifiers
+    declaration.annotations = annotations
+    declaration.documentation = javadoc
+
+    return declaration
+  
+  @parse_debug
+  def parse_annotation_method_or_constant_rest(self):
+    if self.try_accept('(', ')'):
+      array_dimension = self.parse_array_dimension()
+      default = None
+
+      if self.try_accept('default'):
+        default = self.parse_element_value()
+
+      return tree.AnnotationMethod(dimensions=array_dimension, default=default)
+    else:
+      return self.parse_constant_declarators_rest()
 
 def parse(tokens, debug=False):
   parser = Parser(tokens)
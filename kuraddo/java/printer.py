@@ -0,0 +1,210 @@
+import io
+
+from .tokenizer import Annotation, Identifier, Keyword, Literal, Operator, Trivia
+
+BRACE_STYLES = ('attach', 'break')
+
+WORD_TOKENS = (Literal, Keyword, Identifier)
+
+# Tokens put on a new line after a closing brace, and after a word with a
+# space between them
+LEADING_TOKENS = WORD_TOKENS + (Annotation,)
+
+# Lines are not broken right after these
+JOINING = set(['.', '(', '[', '@', '::'])
+
+class CodePrinter(object):
+  """Prints Java tokens as formatted source to a text sink.
+
+  Output is collected in a small buffer and written to the sink each time
+  it reaches chunk_size characters, so neither the tokens nor the text of
+  a file are held in memory at once. Trailing spaces are held back until
+  more text follows them, so trim() sees them whatever has been flushed. A printer keeps no state between
+  write() calls and can print any number of files.
+
+  indent is the text of one indentation level. With a width, a line is
+  broken before a word, operator or dot that would pass it, unless it
+  follows a dot or an opening bracket, and continues two levels further
+  in. brace_style 'attach' opens blocks at the end of the
+  line, 'break' on a line of their own. With javadoc, the Javadoc comment
+  of a token is printed on the lines before it.
+  """
+  def __init__(self, indent='    ', width=None, brace_style='attach', javadoc=True, newline='\n',
+               chunk_size=8192):
+    if brace_style not in BRACE_STYLES:
+      raise ValueError('Unknown brace style %r' % (brace_style,))
+
+    self.indent = indent
+    self.width = width
+    self.brace_style = brace_style
+    self.javadoc = javadoc
+    self.newline = newline
+    self.chunk_size = chunk_size
+
+  def write(self, tokens, out):
+    """Prints tokens to out, anything with a write(text) method, and
+    returns the number of characters written."""
+    self.out = out
+    self.buffer = list()
+    self.buffered = 0
+    self.spaces = 0
+    self.written = 0
+    self.level = 0
+    self.column = 0
+    self.parentheses = 0
+
+    closed_block = False
+    spaced = False
+    last = None
+
+    for token in tokens:
+      if isinstance(token, Trivia):
+        continue
+
+      value = token.value
+
+      if closed_block:
+        closed_block = False
+
+        if isinstance(token, LEADING_TOKENS):
+          self.line_break()
+
+      if self.javadoc and token.javadoc:
+        self.print_javadoc(token.javadoc)
+
+      if value == '{':
+        self.open_block()
+      elif value == '}':
+        self.close_block()
+        closed_block = True
+      elif value == ';':
+        self.emit(';')
+
+        if self.parentheses:
+          self.emit(' ')
+        else:
+          self.line_break()
+      elif value == ',':
+        self.emit(', ')
+      elif isinstance(token, LEADING_TOKENS):
+        self.emit(' ' + value if spaced else value, last not in JOINING)
+      elif isinstance(token, Operator):
+        self.emit(' ' + value + ' ', last not in JOINING)
+      elif value == '.':
+        self.emit(value, True)
+      else:
+        if value == '(':
+          self.parentheses += 1
+        elif value == ')' and self.parentheses:
+          self.parentheses -= 1
+
+        self.emit(value)
+
+      spaced = isinstance(token, WORD_TOKENS) or value == ')'
+      last = value
+
+    if self.column:
+      self.line_break()
+
+    self.flush()
+
+    return self.written
+
+  def emit(self, text, breakable=False):
+    if not self.column:
+      text = text.lstrip(' ')
+
+      if not text:
+        return
+
+      self.raw(self.indent * self.level)
+    elif breakable and self.width and self.column + len(text.rstrip(' ')) > self.width:
+      self.line_break()
+      self.raw(self.indent * (self.level + 2))
+      text = text.lstrip(' ')
+
+    self.raw(text)
+
+  def raw(self, text):
+    stripped = text.rstrip(' ')
+
+    if stripped:
+      if self.spaces:
+        self.buffer.append(' ' * self.spaces)
+        self.buffered += self.spaces
+        self.spaces = 0
+
+      self.buffer.append(stripped)
+      self.buffered += len(stripped)
+
+    self.spaces += len(text) - len(stripped)
+    self.column += len(text)
+
+    if self.buffered >= self.chunk_size:
+      self.flush()
+
+  def trim(self):
+    """Drops the spaces at the end of the text printed so far."""
+    self.column -= self.spaces
+    self.spaces = 0
+
+  def line_break(self):
+    self.trim()
+    self.buffer.append(self.newline)
+    self.buffered += len(self.newline)
+    self.column = 0
+
+  def flush(self):
+    if self.buffer:
+      self.out.write(''.join(self.buffer))
+      self.written += self.buffered
+      self.buffer = list()
+      self.buffered = 0
+
+  def open_block(self):
+    if self.brace_style == 'break' and self.column:
+      self.line_break()
+
+    self.trim()
+    self.emit(' {' if self.column else '{')
+    self.line_break()
+    self.level += 1
+
+  def close_block(self):
+    if self.column:
+      self.line_break()
+
+    self.level = max(self.level - 1, 0)
+    self.emit('}')
+
+  def print_javadoc(self, javadoc):
+    if self.column:
+      self.line_break()
+
+    for line in javadoc.splitlines():
+      line = line.strip()
+
+      if line.startswith('*'):
+        line = ' ' + line
+
+      self.raw(self.indent * self.level + line)
+      self.line_break()
+
+def print_tokens(tokens, out, **options):
+  """Prints tokens to out with a CodePrinter made with options."""
+  return CodePrinter(**options).write(tokens, out)
+
+def write_files(files, encoding='utf-8', **options):
+  """Prints each (path, tokens) pair of files to its path, one file at a
+  time. files can be a generator, so only the file being printed is in
+  memory. Returns the number of files written."""
+  printer = CodePrinter(**options)
+  count = 0
+
+  for path, tokens in files:
+    with io.open(path, 'w', encoding=encoding, newline='') as java_file:
+      printer.write(tokens, java_file)
+
+    count += 1
+
+  return count
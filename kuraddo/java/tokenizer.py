@@ -1,5 +1,10 @@
+import codecs
+import io
+import mmap
 import re
 import unicodedata
+from array import array
+from bisect import bisect_right
 from collections import namedtuple
 
 import tools.helper.py3x2.six as six
@@ -9,11 +14,146 @@ class LexerError(Exception):
 
 Position = namedtuple('Position', ['line', 'column'])
 
+class LineMap(object):
+  """Newline offset index of one source file.
+
+  The index (a sorted array of line start offsets) is built on first use,
+  and offsets are turned into 1-based Position values with a bisect.
+
+  When the tokenized text had unicode escapes replaced, ``escape_offsets``
+  and ``escape_shifts`` map its offsets back to the original source: from
+  escape_offsets[k] on, offsets are shifted right by escape_shifts[k].
+  ``tokenized`` is then the rewritten text, which text() slices.
+  """
+  def __init__(self, data, escape_offsets=None, escape_shifts=None, tokenized=None):
+    self.data = data
+    self.tokenized = data if tokenized is None else tokenized
+    self.line_starts = None
+    self.escape_offsets = escape_offsets
+    self.escape_shifts = escape_shifts
+
+  def build(self, start=0, newline='\n'):
+    data = self.data
+    line_starts = array('l', [start])
+
+    i = data.find(newline, start)
+    while i != -1:
+      line_starts.append(i + 1)
+      i = data.find(newline, i + 1)
+
+    self.line_starts = line_starts
+
+  def source_offset(self, offset):
+    if self.escape_offsets:
+      k = bisect_right(self.escape_offsets, offset)
+
+      if k:
+        return offset + self.escape_shifts[k - 1]
+
+    return offset
+
+  def line(self, offset):
+    if self.line_starts is None:
+      self.build()
+
+    return bisect_right(self.line_starts, self.source_offset(offset))
+
+  def position(self, offset):
+    if self.line_starts is None:
+      self.build()
+
+    offset = self.source_offset(offset)
+    line = bisect_right(self.line_starts, offset)
+
+    return Position(line, offset - self.line_starts[line - 1] + 1)
+
+  def text(self, start, end):
+    """Text between two offsets of the tokenized text."""
+    return self.tokenized[start:end]
+
+class ByteLineMap(LineMap):
+  """LineMap over an encoded buffer (bytes or mmap).
+
+  Offsets are byte offsets; columns are counted in characters by decoding
+  the start of the line the offset is on, and source_offset() gives the
+  character offset in the decoded source.
+  """
+  def __init__(self, data, codec, start=0):
+    super(ByteLineMap, self).__init__(data)
+    self.codec = codec
+    self.start = start
+    # Last (codec, byte offset, character offset) given by source_offset()
+    self.last_offset = (None, start, 0)
+
+  def build(self):
+    super(ByteLineMap, self).build(self.start, b'\n')
+
+  def source_offset(self, offset):
+    # Offsets asked for in increasing order, as the parser does, only
+    # decode the bytes since the previous one
+    codec, byte, char = self.last_offset
+
+    if codec != self.codec or offset < byte:
+      byte, char = self.start, 0
+
+    char += len(self.data[byte:offset].decode(self.codec, 'replace'))
+    self.last_offset = (self.codec, offset, char)
+
+    return char
+
+  def line(self, offset):
+    if self.line_starts is None:
+      self.build()
+
+    return bisect_right(self.line_starts, offset)
+
+  def position(self, offset):
+    line = self.line(offset)
+    prefix = self.data[self.line_starts[line - 1]:offset]
+
+    return Position(line, len(prefix.decode(self.codec, 'replace')) + 1)
+
+  def text(self, start, end):
+    return self.data[start:end].decode(self.codec, 'replace')
+
 class JavaToken(object):
-  def __init__(self, value, position=None, javadoc=None):
+  __slots__ = ('value', '_position', '_javadoc', 'start', 'lines')
+
+  def __init__(self, value, position=None, javadoc=None, start=None, lines=None):
     self.value = value
-    self.position = position
-    self.javadoc = javadoc
+    self._position = position
+    self._javadoc = javadoc
+    self.start = start
+    self.lines = lines
+
+  @property
+  def javadoc(self):
+    """Javadoc comment before the token. Tokenizers in 'span' javadoc mode
+    give the (start, end) offsets of the comment, which is sliced from the
+    text the first time it is requested."""
+    javadoc = self._javadoc
+
+    if type(javadoc) is tuple:
+      javadoc = self._javadoc = self.lines.text(*javadoc)
+
+    return javadoc
+
+  @javadoc.setter
+  def javadoc(self, javadoc):
+    self._javadoc = javadoc
+
+  @property
+  def position(self):
+    """Position(line, column) of the token, computed from its start offset
+    the first time it is requested."""
+    if self._position is None and self.lines is not None:
+      self._position = self.lines.position(self.start)
+
+    return self._position
+
+  @position.setter
+  def position(self, position):
+    self._position = position
   
   def __repr__(self):
     if self.position:
@@ -28,9 +168,11 @@ class JavaToken(object):
     raise Exception("Direct comparison not allowed")
 
 class EndOfInput(JavaToken):
-  pass
+  __slots__ = ()
 
 class Keyword(JavaToken):
+  __slots__ = ()
+
   VALUES = set(['abstract', 'assert', 'boolean', 'break', 'byte', 'case',
                   'catch', 'char', 'class', 'const', 'continue', 'default',
                   'do', 'double', 'else', 'enum', 'extends', 'final',
@@ -42,57 +184,67 @@ class Keyword(JavaToken):
                   'void', 'volatile', 'while'])
 
 class Modifier(Keyword):
+  __slots__ = ()
+
   VALUES = set(['abstract', 'default', 'final', 'native', 'private',
                   'protected', 'public', 'static', 'strictfp', 'synchronized',
                   'transient', 'volatile'])
 
 class BasicType(Keyword):
+  __slots__ = ()
+
   VALUES = set(['boolean', 'byte', 'char', 'double',
                   'float', 'int', 'long', 'short'])
 
 class Literal(JavaToken):
-  pass
+  __slots__ = ()
 
 class Integer(Literal):
-  pass
+  __slots__ = ()
 
 class DecimalInteger(Literal):
-  pass
+  __slots__ = ()
 
 class OCtalInteger(Integer):
-  pass
+  __slots__ = ()
 
 class BinaryInteger(Integer):
-  pass
+  __slots__ = ()
 
 class HexInteger(Integer):
-  pass
+  __slots__ = ()
 
 class FloatingPoint(Literal):
-  pass
+  __slots__ = ()
 
 class DecimalFloatingPoint(FloatingPoint):
-  pass
+  __slots__ = ()
 
 class HexFloatingPoint(FloatingPoint):
-  pass
+  __slots__ = ()
 
 class Boolean(Literal):
+  __slots__ = ()
+
   VALUES = set(["true", "false"])
 
 class Character(Literal):
-  pass
+  __slots__ = ()
 
 class String(Literal):
-  pass
+  __slots__ = ()
 
 class Null(Literal):
-  pass
+  __slots__ = ()
 
 class Separator(JavaToken):
+  __slots__ = ()
+
   VALUES = set(['(', ')', '{', '}', '[', ']', ';', ',', '.'])
 
 class Operator(JavaToken):
+  __slots__ = ()
+
   MAX_LEN = 4
   VALUES = set(['>>>=', '>>=', '<<=',  '%=', '^=', '|=', '&=', '/=',
                   '*=', '-=', '+=', '<<', '--', '++', '||', '&&', '!=',
@@ -126,22 +278,244 @@ class Operator(JavaToken):
     return self.value in self.ASSIGNMENT
 
 class Annotation(JavaToken):
-  pass
+  __slots__ = ()
 
 class Identifier(JavaToken):
-  pass
+  __slots__ = ()
+
+# Whitespace and comments, only produced in trivia mode
+class Trivia(JavaToken):
+  __slots__ = ()
+
+class Whitespace(Trivia):
+  __slots__ = ()
+
+class Comment(Trivia):
+  __slots__ = ()
+
+def ascii_table(categories):
+  return tuple(unicodedata.category(six.unichr(code)) in categories for code in range(128))
+
+unicode_categories = {}
+
+def unicode_category(c):
+  try:
+    return unicode_categories[c]
+  except KeyError:
+    category = unicode_categories[c] = unicodedata.category(c)
+    return category
+
+KEYWORD_TYPES = dict((value, Keyword) for value in Keyword.VALUES)
+KEYWORD_TYPES.update((value, Modifier) for value in Modifier.VALUES)
+KEYWORD_TYPES.update((value, BasicType) for value in BasicType.VALUES)
+KEYWORD_TYPES.update((value, Boolean) for value in Boolean.VALUES)
+KEYWORD_TYPES['null'] = Null
+
+# Words given a meaning by Java 14 to 21 (record, sealed, non-sealed,
+# permits, yield, when) are restricted identifiers rather than keywords:
+# they stay Identifier tokens, as they are still legal names elsewhere, and
+# the parser recognizes them by where they appear.
+CONTEXTUAL_KEYWORDS = set(['record', 'sealed', 'non', 'permits', 'yield', 'when'])
+
+# A text block opens with three quotes and a line terminator and ends at
+# the next three quotes that are not escaped
+TEXT_BLOCK = r'"""[ \t\f]*(?:\r\n|\r|\n)(?:[^"\\]|\\.|"(?!""))*"""'
+
+INTERNED_VALUES = dict((value, six.moves.intern(value)) for value in
+                       Keyword.VALUES | Boolean.VALUES | Separator.VALUES | Operator.VALUES | set(['null']) |
+                       CONTEXTUAL_KEYWORDS)
+
+# How tokenizers attach the javadoc comment before a token: as its text, as
+# the (start, end) offsets of the text (see JavaToken.javadoc), or not at
+# all
+JAVADOC_MODES = ('text', 'span', 'skip')
+
+TOKEN_TYPES = (JavaToken, EndOfInput, Keyword, Modifier, BasicType, Literal, Integer, DecimalInteger,
+               OCtalInteger, BinaryInteger, HexInteger, FloatingPoint, DecimalFloatingPoint,
+               HexFloatingPoint, Boolean, Character, String, Null, Separator, Operator, Annotation,
+               Identifier, Trivia, Whitespace, Comment)
+
+for kind, token_type in enumerate(TOKEN_TYPES):
+  token_type.kind = kind
+del kind, token_type
+
+class TokenBuffer(object):
+  """Array-backed token stream.
+
+  Tokens are kept as parallel arrays of kind codes (indexes into
+  TOKEN_TYPES) and start/end offsets into ``data``; lines and columns are
+  derived from the offsets through ``lines`` when asked for. The buffer is
+  a sequence, so the parser can consume it directly; a JavaToken is only
+  created the first time its index is requested.
+  """
+  OPEN_BRACE, CLOSE_BRACE = '{', '}'
+
+  def __init__(self, data=u'', lines=None):
+    self.data = data
+    self.lines = lines or LineMap(data)
+    self.kinds = array('B')
+    self.starts = array('l')
+    self.ends = array('l')
+    self.javadocs = {}
+    self.tokens = {}
+
+  def append(self, token_type, start, end, javadoc=None):
+    if javadoc:
+      self.javadocs[len(self.kinds)] = javadoc
+
+    self.kinds.append(token_type.kind)
+    self.starts.append(start)
+    self.ends.append(end)
+
+  def __len__(self):
+    return len(self.kinds)
+
+  def __getitem__(self, index):
+    try:
+      return self.tokens[index]
+    except KeyError:
+      pass
+
+    token_type = TOKEN_TYPES[self.kinds[index]]
+    token = self.tokens[index] = token_type(self.value(index), None, self.javadocs.get(index),
+                                            self.starts[index], self.lines)
+
+    return token
+
+  def __iter__(self):
+    for index in range(len(self)):
+      yield self[index]
+
+  def token_type(self, index):
+    return TOKEN_TYPES[self.kinds[index]]
+
+  def value(self, index):
+    value = self.data[self.starts[index]:self.ends[index]]
+    return INTERNED_VALUES.get(value, value)
+
+  def position(self, index):
+    return self.lines.position(self.starts[index])
+
+  def matching_brace(self, index):
+    """Index of the '}' closing the '{' at index, or None when the input
+    ends first. Only kind codes and the first character of separators are
+    looked at, so no token is created for the tokens in between."""
+    separator = Separator.kind
+    open_brace = self.OPEN_BRACE
+    close_brace = self.CLOSE_BRACE
+    kinds = self.kinds
+    starts = self.starts
+    data = self.data
+    depth = 0
+
+    for i in range(index, len(kinds)):
+      if kinds[i] == separator:
+        char = data[starts[i]]
+
+        if char == open_brace:
+          depth += 1
+        elif char == close_brace:
+          depth -= 1
+
+          if not depth:
+            return i
+
+    return None
+
+class BytesTokenBuffer(TokenBuffer):
+  """TokenBuffer over the encoded buffer scanned by BytesJavaTokenizer.
+
+  Offsets are byte offsets, each value is decoded on its own when its
+  token is created, and matching_brace() compares bytes.
+  """
+  OPEN_BRACE, CLOSE_BRACE = ord('{'), ord('}')
+
+  def value(self, index):
+    data = self.data[self.starts[index]:self.ends[index]]
+
+    try:
+      value = data.decode(self.lines.codec)
+    except UnicodeDecodeError:
+      # Same fallback as BytesJavaTokenizer.decode
+      self.lines.codec = 'iso-8859-1'
+      value = data.decode(self.lines.codec)
+
+    return INTERNED_VALUES.get(value, value)
+
+class StreamingTokenBuffer(TokenBuffer):
+  """TokenBuffer filled from a tokenizer as its tokens are asked for.
+
+  Nothing past the furthest index requested is scanned, so a parser that
+  stops early never tokenizes the rest of the input; asking for the length
+  scans everything. ``release()`` lets go of the token objects before an
+  index once the parser is done with them.
+  """
+  def __init__(self, tokenizer):
+    super(StreamingTokenBuffer, self).__init__()
+
+    self.scanner = tokenizer.scan()
+    self.fill(0)
+
+    # The tokenizer decodes its input on the first scan
+    self.data = tokenizer.data
+    self.lines = tokenizer.lines
+
+  def fill(self, index=None):
+    """Scans tokens until the one at index (or the last one) is read."""
+    kinds = self.kinds
+    scanner = self.scanner
+
+    while scanner is not None and (index is None or len(kinds) <= index):
+      try:
+        self.append(*next(scanner))
+      except StopIteration:
+        self.scanner = scanner = None
+
+  def release(self, index):
+    for buffered in [i for i in self.tokens if i < index]:
+      del self.tokens[buffered]
+
+    for buffered in [i for i in self.javadocs if i < index]:
+      del self.javadocs[buffered]
+
+  def __len__(self):
+    self.fill()
+    return len(self.kinds)
+
+  def __getitem__(self, index):
+    if index >= len(self.kinds):
+      self.fill(index)
+
+    return super(StreamingTokenBuffer, self).__getitem__(index)
+
+  def matching_brace(self, index):
+    self.fill()
+    return super(StreamingTokenBuffer, self).matching_brace(index)
 
 class JavaTokenizer(object):
   IDENT_START_CATEGORIES = set(['Lu', 'Ll', 'Lt', 'Lm', 'Lo', 'Nl', 'Pc', 'Sc'])
   IDENT_PART_CATEGORIES = set(['Lu', 'Ll', 'Lt', 'Lm', 'Lo', 'Mc', 'Mn', 'Nd', 'Nl', 'Pc', 'Sc'])
 
-  def __init__(self, data, ignore_errors=False):
+  ASCII_IDENT_START = ascii_table(IDENT_START_CATEGORIES)
+  ASCII_IDENT_PART = ascii_table(IDENT_PART_CATEGORIES)
+  ASCII_IDENT_PART_RUN = re.compile(r'[A-Za-z0-9_$]*')
+
+  TEXT_BLOCK_PATTERN = re.compile(TEXT_BLOCK, re.DOTALL)
+  TEXT_BLOCK_OPENING = re.compile(r'"""[ \t\f]*[\r\n]')
+
+  def __init__(self, data, ignore_errors=False, trivia=False, javadoc='text'):
+    if javadoc not in JAVADOC_MODES:
+      raise ValueError('Unknown javadoc mode %r' % (javadoc,))
+
     self.data = data
     self.ignore_errors = ignore_errors
+    # With trivia set, whitespace and comments are scanned as Whitespace and
+    # Comment tokens too, so the token values add up to the whole text
+    self.trivia = trivia
+    self.javadoc_mode = javadoc
+    self.attach_javadoc = javadoc != 'skip'
     self.errors = []
-
-    self.current_line = 1
-    self.start_of_line = -1
+    self.lines = None
 
     self.operators = [set() for i in range(0, Operator.MAX_LEN)]
 
@@ -150,6 +524,14 @@ class JavaTokenizer(object):
     
     self.whitespace_consumer = re.compile(r'[^\s]')
     self.javadoc = None
+
+  def found_javadoc(self, start, end):
+    """Keeps the javadoc comment between start and end for the next token,
+    as its text or its offsets."""
+    if self.javadoc_mode == 'span':
+      self.javadoc = (start, end)
+    else:
+      self.javadoc = self.data[start:end]
   
   def reset(self):
     self.i = 0
@@ -162,17 +544,26 @@ class JavaTokenizer(object):
       self.i = self.length
       return
     
-    i = match.start()
+    self.i = match.start()
 
-    start_of_line = self.data.rfind('\n', self.i, i)
+  def read_text_block(self):
+    match = self.TEXT_BLOCK_PATTERN.match(self.data, self.i)
 
-    if start_of_line != -1:
-      self.start_of_line = start_of_line
-      self.current_line += self.data.count('\n', self.i, i)
-    
-    self.i = i
+    if match:
+      self.j = match.end()
+      return
+
+    if self.TEXT_BLOCK_OPENING.match(self.data, self.i):
+      self.error('Unterminated text block', '"""')
+    else:
+      self.error('Illegal text block opening delimiter', '"""')
+
+    self.j = self.length
 
   def read_string(self):
+    if self.data.startswith('"""', self.i):
+      return self.read_text_block()
+
     delim = self.data[self.i]
 
     state = 0
@@ -219,7 +610,7 @@ class JavaTokenizer(object):
   
   def try_operator(self):
     for l in range(min(self.length - self.i, Operator.MAX_LEN), 0, -1):
-      if self.data[self.i:self.i + 1] in self.operators[l - 1]:
+      if self.data[self.i:self.i + l] in self.operators[l - 1]:
         self.j = self.i + l
 
         return True
@@ -239,21 +630,11 @@ class JavaTokenizer(object):
       i = self.length
     else:
       self.error('Unterminated block comment')
-      partial_comment = self.data[self.i:]
       self.i = self.length
 
-      return partial_comment
-    
-    comment = self.data[self.i:i]
-    start_of_line = self.data.rfind('\n', self.i, i)
-
-    if start_of_line != -1:
-      self.start_of_line = start_of_line
-      self.current_line += self.data.count('\n', self.i, i)
+      return
     
     self.i = i
-
-    return comment
   
   def read_decimal_float_or_integer(self):
     orig_i = self.i
@@ -277,7 +658,7 @@ class JavaTokenizer(object):
       self.i = self.j
       self.read_decimal_integer()
     
-    if self.j < len(self.data) and self.data[self.j] in 'ffdD':
+    if self.j < len(self.data) and self.data[self.j] in 'fFdD':
       self.j = self.j + 1
     
     self.i = orig_i
@@ -328,7 +709,7 @@ class JavaTokenizer(object):
       else:
         break
     
-    if c in '1L':
+    if c and c in 'lL':
       self.j += 1
     
   
@@ -349,12 +730,12 @@ class JavaTokenizer(object):
     self.read_digits('01234567')
   
   def read_integer_or_float(self, c, c_next):
-    if c == '0' and c_next in 'xX':
+    if c == '0' and c_next and c_next in 'xX':
       return self.read_hex_integer_or_float()
-    elif c == '0' and c_next in 'bB':
+    elif c == '0' and c_next and c_next in 'bB':
       self.read_bin_integer()
-      return BinaryInteger()
-    elif c == '0' and c_next in '01234567':
+      return BinaryInteger
+    elif c == '0' and c_next and c_next in '01234567':
       self.read_octal_integer()
       return OCtalInteger
     else:
@@ -382,34 +763,53 @@ class JavaTokenizer(object):
     self.error('Could not decode input data')
   
   def is_java_identifier_start(self, c):
-    return unicodedata.category(c) in self.IDENT_START_CATEGORIES
-  
+    if c < '\x80':
+      return self.ASCII_IDENT_START[ord(c)]
+    return unicode_category(c) in self.IDENT_START_CATEGORIES
+
+  def is_java_identifier_part(self, c):
+    if c < '\x80':
+      return self.ASCII_IDENT_PART[ord(c)]
+    return unicode_category(c) in self.IDENT_PART_CATEGORIES
+
   def read_identifier(self):
-    self.j = self.i + 1
+    data = self.data
+    length = self.length
+    j = self.ASCII_IDENT_PART_RUN.match(data, self.i + 1).end()
 
-    while self.j < len(self.data) and unicodedata.catagory(self.data[self.j]) in self.IDENT_PART_CATEGORIES:
-      self.j += 1
+    while j < length:
+      c = data[j]
 
-    ident = self.data[self.i:self.j]
-    if ident in Keyword.VALUES:
-      toke_type = Keyword
-
-      if ident in BasicType.VALUES:
-        toke_type = BasicType
-      elif ident in Modifier.VALUES:
-        toke_type = Modifier
-    elif ident in Boolean.VALUES:
-      toke_type = Boolean
-    elif ident == 'null':
-      toke_type = Null
-    else:
-      toke_type = Identifier
-    
-    return toke_type
+      if c < '\x80':
+        if not self.ASCII_IDENT_PART[ord(c)]:
+          break
+        j = self.ASCII_IDENT_PART_RUN.match(data, j).end()
+      elif unicode_category(c) in self.IDENT_PART_CATEGORIES:
+        j += 1
+      else:
+        break
+
+    self.j = j
+
+    return KEYWORD_TYPES.get(data[self.i:j], Identifier)
   
   def pre_tokenize(self):
-    new_data = list()
     data = self.decode_data()
+    self.source = data
+
+    # Nearly all files have no unicode escapes: tokenize the decoded string
+    # itself instead of rebuilding it.
+    if '\\u' not in data:
+      self.data = data
+      self.length = len(data)
+      self.lines = LineMap(data)
+      return
+
+    new_data = list()
+    new_length = 0
+    escape_offsets = array('l')
+    escape_shifts = array('l')
+    shift = 0
 
     i = 0
     j = 0
@@ -435,7 +835,9 @@ class JavaTokenizer(object):
 
         if c == 'u':
           state = MARKER_FOUND
-          new_data.append(data[i:j - 1])
+          escape_start = j - 1
+          new_data.append(data[i:escape_start])
+          new_length += escape_start - i
         else:
           state = NONE
       elif state == MARKER_FOUND:
@@ -448,10 +850,17 @@ class JavaTokenizer(object):
             self.error('Invalid unicode escape', data[j:j+4])
           
           new_data.append(six.unichr(escape_code))
+          new_length += 1
 
           i = j + 4
           j = i
 
+          # Everything after the escaped character sits further right in
+          # the original source by the escape length minus one.
+          shift += i - escape_start - 1
+          escape_offsets.append(new_length)
+          escape_shifts.append(shift)
+
           state = NONE
 
           continue
@@ -459,8 +868,10 @@ class JavaTokenizer(object):
     new_data.append(data[i:])
     self.data = ''.join(new_data)
     self.length = len(self.data)
+    self.lines = LineMap(data, escape_offsets, escape_shifts, self.data)
 
-  def tokenize(self):
+  def scan(self):
+    """Yield (token_type, start, end, javadoc) for each token."""
     self.reset()
 
     self.pre_tokenize()
@@ -477,13 +888,21 @@ class JavaTokenizer(object):
         startswith = c + c_next
       
       if c.isspace():
+        start = self.i
         self.consume_whitespace()
+
+        if self.trivia:
+          yield Whitespace, start, self.i, None
         continue
       elif startswith in ("//", "/*"):
-        comment = self.read_comment()
+        start = self.i
+        self.read_comment()
+
+        if self.attach_javadoc and self.data.startswith("/**", start):
+          self.found_javadoc(start, self.i)
 
-        if comment.startswith("/**"):
-          self.javadoc = comment
+        if self.trivia:
+          yield Comment, start, self.i, None
         continue
       elif startswith == '..' and self.try_operator():
         token_type = Operator
@@ -508,24 +927,41 @@ class JavaTokenizer(object):
         self.i = self.i + 1
         continue
       
-      position = Position(self.current_line, self.i - self.start_of_line)
-      token = token_type(self.data[self.i:self.j], position, self.javadoc)
-      yield token
+      yield token_type, self.i, self.j, self.javadoc
 
       if self.javadoc:
         self.javadoc = None
       
       self.i = self.j
+
+  def tokenize(self):
+    interned = INTERNED_VALUES
+
+    for token_type, start, end, javadoc in self.scan():
+      value = self.data[start:end]
+      yield token_type(interned.get(value, value), None, javadoc, start, self.lines)
+
+  def tokenize_buffer(self):
+    tokens = TokenBuffer()
+    append = tokens.append
+
+    for token_type, start, end, javadoc in self.scan():
+      append(token_type, start, end, javadoc)
+
+    tokens.data = self.data
+    tokens.lines = self.lines
+    return tokens
   
   def error(self, message, char=None):
     line_start = self.data.rfind('\n', 0, self.i) + 1
     line_end = self.data.find('\n', self.i)
     line = self.data[line_start:line_end].strip()
 
-    line_number = self.current_line
+    lines = self.lines or LineMap(self.data)
+    line_number = lines.line(self.i)
 
     if not char:
-      char = self.data[self.j]
+      char = self.data[self.j] if self.j < len(self.data) else ''
 
     message = u'%s at "%s", line %s: %s' % (message, char, line_number, line)
     error = LexerError(message)
@@ -534,56 +970,338 @@ class JavaTokenizer(object):
     if not self.ignore_errors:
       raise error
 
-def tokenize(code, ignore_errors=False):
-  tokenizer = JavaTokenizer(code , ignore_errors)
-  return tokenizer.tokenize()
+class RegexJavaTokenizer(JavaTokenizer):
+  """Tokenizer engine built on one master regular expression.
+
+  Each token is recognized by a single ``match`` of ``MASTER_PATTERN``, so
+  the per-character dispatch of JavaTokenizer.tokenize runs inside the regex
+  engine instead of Python. For valid Java source it yields the same token
+  types, values, positions and javadoc as JavaTokenizer.
+  """
+  DECIMAL_DIGITS = r'[0-9](?:_*[0-9])*'
+  HEX_DIGITS = r'[0-9a-fA-F](?:_*[0-9a-fA-F])*'
+
+  PATTERNS = [
+    ('whitespace', r'\s+'),
+    ('comment', r'//[^\n]*\n?|/\*.*?\*/'),
+    ('unterminated_comment', r'/\*'),
+    ('text_block', TEXT_BLOCK),
+    ('string', r'(?!""")"(?:[^"\\]|\\.)*"|' r"'(?:[^'\\]|\\.)*'"),
+    ('hex_float', r'0[xX](?:' + HEX_DIGITS + r')?(?:\.(?:' + HEX_DIGITS + r')?)?[pP][+-]?' + DECIMAL_DIGITS + r'[fFdD]?'),
+    ('hex', r'0[xX](?:' + HEX_DIGITS + r')?[lL]?'),
+    ('binary', r'0[bB](?:[01](?:_*[01])*)?[lL]?'),
+    ('octal', r'0[0-7](?:_*[0-7])*[lL]?'),
+    ('decimal_float', r'(?:' + DECIMAL_DIGITS + r'\.(?:' + DECIMAL_DIGITS + r')?|\.' + DECIMAL_DIGITS + r')'
+                      r'(?:[eE][+-]?' + DECIMAL_DIGITS + r')?[fFdD]?|' +
+                      DECIMAL_DIGITS + r'(?:[eE][+-]?' + DECIMAL_DIGITS + r'[fFdD]?|[fFdD])'),
+    ('decimal', DECIMAL_DIGITS + r'[lL]?'),
+    ('identifier', r'[A-Za-z_$][A-Za-z0-9_$]*'),
+    ('annotation', r'@'),
+    ('operator', '|'.join(re.escape(v) for v in sorted(Operator.VALUES, key=len, reverse=True))),
+    ('separator', r'[(){}\[\];,.]'),
+    ('other', r'.'),
+  ]
+
+  MASTER_PATTERN = re.compile('|'.join(['(?P<%s>%s)' % pattern for pattern in PATTERNS]), re.DOTALL)
+
+  GROUP_TYPES = {
+    'text_block': String,
+    'string': String,
+    'hex_float': HexFloatingPoint,
+    'hex': HexInteger,
+    'binary': BinaryInteger,
+    'octal': OCtalInteger,
+    'decimal_float': DecimalFloatingPoint,
+    'decimal': DecimalInteger,
+    'annotation': Annotation,
+    'operator': Operator,
+    'separator': Separator,
+  }
+
+  def extend_identifier(self):
+    while self.j < self.length and self.is_java_identifier_part(self.data[self.j]):
+      self.j += 1
 
-def reformat_tokens(tokens):
-  indent = 0
-  closed_block = False
-  ident_last = False
+  def scan(self):
+    self.reset()
 
-  output = list()
+    self.pre_tokenize()
 
-  for token in tokens:
-    if closed_block:
-      closed_block = False
-      indent -= 4
+    data = self.data
+    length = self.length
+    match_token = self.MASTER_PATTERN.match
+    group_types = self.GROUP_TYPES
 
-      output.append('\n')
-      output.append(' ' * indent)
-      output.append('}')
+    while self.i < length:
+      match = match_token(data, self.i)
+      kind = match.lastgroup
+      self.j = match.end()
 
-      if isinstance(token, (Literal, Keyword, Identifier)):
-        output.append('\n')
-        output.append(' ' * indent)
-    
-    if token.value == '{':
-      indent += 4
-      output.append(' {\n')
-      output.append(' ' * indent)
-    elif token.value == '}':
-      closed_block = True
-    elif token.value == ',':
-      output.append(', ')
-    elif isinstance(token, (Literal, Keyword, Identifier)):
-      if ident_last:
-        output.append(' ')
-      ident_last = True
-      output.append(token.value)
-    elif isinstance(token, Operator):
-      output.append(' ' + token.value + ' ')
-    elif token.value == ';':
-      output.append(';\n')
-      output.append(' ' * indent)
+      if kind == 'whitespace' or kind == 'comment':
+        if kind == 'comment' and self.attach_javadoc and data.startswith('/**', self.i):
+          self.found_javadoc(self.i, self.j)
+
+        if self.trivia:
+          yield (Whitespace if kind == 'whitespace' else Comment), self.i, self.j, None
+
+        self.i = self.j
+        continue
+      elif kind == 'identifier':
+        if self.j < length and data[self.j] > '\x7f':
+          self.extend_identifier()
+        token_type = KEYWORD_TYPES.get(data[self.i:self.j], Identifier)
+      elif kind == 'other':
+        if data[self.i] in ("'", '"'):
+          token_type = String
+          self.read_string()
+        elif self.is_java_identifier_start(data[self.i]):
+          self.j = self.i + 1
+          self.extend_identifier()
+          token_type = KEYWORD_TYPES.get(data[self.i:self.j], Identifier)
+        else:
+          self.error('Could not process token', data[self.i])
+          self.i = self.i + 1
+          continue
+      elif kind == 'unterminated_comment':
+        self.error('Unterminated block comment')
+
+        if self.trivia:
+          yield Comment, self.i, length, None
+
+        self.i = length
+        continue
+      else:
+        token_type = group_types[kind]
+
+      yield token_type, self.i, self.j, self.javadoc
+
+      if self.javadoc:
+        self.javadoc = None
+
+      self.i = self.j
+
+class BytesJavaTokenizer(RegexJavaTokenizer):
+  """Regex engine running directly over an ASCII-compatible encoded buffer.
+
+  ``data`` may be bytes or a memory map; it is never decoded as a whole.
+  Each token value (and javadoc) is decoded on its own, token start
+  offsets are byte offsets, and positions come from a ByteLineMap. Input
+  with unicode escapes must go through JavaTokenizer instead, as their
+  rewriting needs the decoded text.
+  """
+  PATTERNS = [(name, pattern.replace(r'[A-Za-z_$][A-Za-z0-9_$]*', r'[A-Za-z_$\x80-\xff][A-Za-z0-9_$\x80-\xff]*'))
+              for name, pattern in RegexJavaTokenizer.PATTERNS]
+
+  MASTER_PATTERN = re.compile(('|'.join(['(?P<%s>%s)' % pattern for pattern in PATTERNS])).encode('ascii'), re.DOTALL)
+  NON_ASCII = re.compile(b'[\x80-\xff]')
+
+  def __init__(self, data, ignore_errors=False, codec='utf_8', start=0, trivia=False, javadoc='text'):
+    super(BytesJavaTokenizer, self).__init__(data, ignore_errors, trivia, javadoc)
+    self.codec = codec
+    self.start = start
+
+  def found_javadoc(self, start, end):
+    if self.javadoc_mode == 'span':
+      self.javadoc = (start, end)
     else:
-      output.append(token.value)
-    
-    ident_last = isinstance(token, (Literal, Keyword, Identifier))
-  
-  if closed_block:
-    output.append('\n}')
-  
-  output.append('\n')
+      self.javadoc = self.decode(self.data[start:end])
+
+  def decode(self, value):
+    try:
+      return value.decode(self.codec)
+    except UnicodeDecodeError:
+      # Same fallback as decode_data, from the first undecodable token on.
+      self.codec = 'iso-8859-1'
+      self.lines.codec = self.codec
+      return value.decode(self.codec)
+
+  def scan(self):
+    self.i = self.start
+    self.j = self.start
+    self.length = len(self.data)
+    self.lines = ByteLineMap(self.data, self.codec, self.start)
+
+    data = self.data
+    length = self.length
+    match_token = self.MASTER_PATTERN.match
+    group_types = self.GROUP_TYPES
+
+    while self.i < length:
+      match = match_token(data, self.i)
+      kind = match.lastgroup
+      self.j = match.end()
+
+      if kind == 'whitespace' or kind == 'comment':
+        if kind == 'comment' and self.attach_javadoc and data[self.i:self.i + 3] == b'/**':
+          self.found_javadoc(self.i, self.j)
+
+        if self.trivia:
+          yield (Whitespace if kind == 'whitespace' else Comment), self.i, self.j, None
+
+        self.i = self.j
+        continue
+      elif kind == 'identifier':
+        value = data[self.i:self.j]
+        token_type = Identifier
+
+        if not self.NON_ASCII.search(value):
+          token_type = KEYWORD_TYPES.get(value.decode('ascii', 'replace'), Identifier)
+        else:
+          value = self.decode(value)
+
+          if not self.is_java_identifier_start(value[0]) or \
+              not all(self.is_java_identifier_part(c) for c in value[1:]):
+            self.error('Could not process token', value)
+            self.i = self.j
+            continue
+      elif kind == 'unterminated_comment':
+        self.error('Unterminated block comment')
+
+        if self.trivia:
+          yield Comment, self.i, length, None
+
+        self.i = length
+        continue
+      elif kind == 'other':
+        char = self.decode(data[self.i:self.i + 1])
+
+        if char in ("'", '"'):
+          self.error('Unterminated character/string literal', char)
+          token_type = String
+          self.j = length
+        else:
+          self.error('Could not process token', char)
+          self.i = self.i + 1
+          continue
+      else:
+        token_type = group_types[kind]
+
+      yield token_type, self.i, self.j, self.javadoc
+
+      if self.javadoc:
+        self.javadoc = None
+
+      self.i = self.j
+
+  def tokenize(self):
+    interned = INTERNED_VALUES
+
+    for token_type, start, end, javadoc in self.scan():
+      value = self.decode(self.data[start:end])
+      yield token_type(interned.get(value, value), None, javadoc, start, self.lines)
+
+  def tokenize_buffer(self):
+    tokens = BytesTokenBuffer(self.data)
+    append = tokens.append
+
+    for token_type, start, end, javadoc in self.scan():
+      append(token_type, start, end, javadoc)
+
+    tokens.lines = self.lines
+    return tokens
+
+  def error(self, message, char=None):
+    line = self.lines.line(self.i) if self.lines else 1
+    error = LexerError(u'%s at "%s", line %s' % (message, char or '', line))
+    self.errors.append(error)
+
+    if not self.ignore_errors:
+      raise error
+
+BOMS = [
+  (codecs.BOM_UTF32_LE, 'utf_32'),
+  (codecs.BOM_UTF32_BE, 'utf_32'),
+  (codecs.BOM_UTF8, 'utf_8'),
+  (codecs.BOM_UTF16_LE, 'utf_16'),
+  (codecs.BOM_UTF16_BE, 'utf_16'),
+]
+
+ASCII_COMPATIBLE_CODECS = set(['utf_8', 'iso-8859-1'])
+
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+def detect_encoding(sample):
+  """Return (codec, bom_length) for a sample of the start of a file.
+
+  A byte order mark decides the codec; otherwise the sample is tried as
+  UTF-8 (a character cut at the end of the sample is not an error) and
+  ISO-8859-1 is used when that fails.
+  """
+  for bom, codec in BOMS:
+    if sample.startswith(bom):
+      return codec, (len(bom) if codec in ASCII_COMPATIBLE_CODECS else 0)
+
+  try:
+    codecs.getincrementaldecoder('utf_8')().decode(sample, False)
+  except UnicodeDecodeError:
+    return 'iso-8859-1', 0
+
+  return 'utf_8', 0
+
+def tokenize_file(path, ignore_errors=False, javadoc='text', buffer=False):
+  """Tokenize a Java source file through a read-only memory map.
+
+  UTF-8 and ISO-8859-1 files without unicode escapes are scanned in place
+  by BytesJavaTokenizer, so the file is never held as one Python string;
+  the map stays open while tokens that may still compute their position
+  refer to it. Other files are decoded and tokenized as usual.
+
+  With buffer=True the tokens come as a TokenBuffer (see
+  tokenize_buffer()) instead of a generator.
+  """
+  with open(path, 'rb') as source_file:
+    try:
+      data = mmap.mmap(source_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+      data = None
+
+  if data is None:
+    tokenizer = make_tokenizer(u'', ignore_errors, javadoc=javadoc)
+  else:
+    codec, start = detect_encoding(data[:ENCODING_SAMPLE_SIZE])
+
+    if codec in ASCII_COMPATIBLE_CODECS and data.find(b'\\u', start) == -1:
+      tokenizer = BytesJavaTokenizer(data, ignore_errors, codec, start, javadoc=javadoc)
+    else:
+      source = data[start:]
+      data.close()
+
+      if codec not in ASCII_COMPATIBLE_CODECS:
+        source = source.decode(codec)
+
+      tokenizer = make_tokenizer(source, ignore_errors, javadoc=javadoc)
+
+  return tokenizer.tokenize_buffer() if buffer else tokenizer.tokenize()
+
+TOKENIZER_ENGINES = {
+  'scanner': JavaTokenizer,
+  'regex': RegexJavaTokenizer,
+}
+
+def make_tokenizer(code, ignore_errors=False, engine='scanner', trivia=False, javadoc='text'):
+  try:
+    tokenizer_class = TOKENIZER_ENGINES[engine]
+  except KeyError:
+    raise ValueError('Unknown tokenizer engine %r' % (engine,))
+
+  return tokenizer_class(code, ignore_errors, trivia, javadoc)
+
+def tokenize(code, ignore_errors=False, engine='scanner', trivia=False, javadoc='text'):
+  return make_tokenizer(code, ignore_errors, engine, trivia, javadoc).tokenize()
+
+def tokenize_buffer(code, ignore_errors=False, engine='scanner', javadoc='text'):
+  return make_tokenizer(code, ignore_errors, engine, javadoc=javadoc).tokenize_buffer()
+
+def tokenize_stream(code, ignore_errors=False, engine='scanner', javadoc='text'):
+  return StreamingTokenBuffer(make_tokenizer(code, ignore_errors, engine, javadoc=javadoc))
+
+def reformat_tokens(tokens, **options):
+  """Formats tokens as Java source; options are those of
+  printer.CodePrinter. Use printer.print_tokens() to write the text out
+  as it is printed instead of building the whole string."""
+  from .printer import print_tokens
+
+  out = io.StringIO()
+  print_tokens(tokens, out, **options)
 
-  return ''.join(output)
\ No newline at end of file
+  return out.getvalue()
@@ -1,19 +1,144 @@
-from .ast import Node
+from .ast import Node, walk_nodes
+from . import javadoc
+
+# attr_types names the node classes an attribute can hold, alone or in a
+# list; () marks attributes holding plain values. Node.filter uses them to
+# skip subtrees, so they have to cover everything the parser puts there.
+# Attributes left out can hold any node.
 
 class CompilationUnit(Node):
+  # _index holds the UnitIndex built by the index property
+  __slots__ = ("package", "imports", "types", "_index")
   attrs = ("package", "imports", "types")
 
+  @property
+  def index(self):
+    """UnitIndex of the nodes of the unit, built on first use.
+
+    Assigning an attribute of the unit drops it, and it is built again when
+    the imports, the types or the member lists of the types no longer hold
+    the nodes they held then. Changes made further down the tree, such as
+    in a method body or a nested class, have to be followed by
+    invalidate_index().
+    """
+    index = getattr(self, '_index', None)
+
+    if index is None or index.shape != unit_shape(self):
+      index = self._index = UnitIndex(self)
+
+    return index
+
+  def invalidate_index(self):
+    self._index = None
+
+  def __setattr__(self, name, value):
+    if name in self.attrs:
+      super(CompilationUnit, self).__setattr__('_index', None)
+
+    super(CompilationUnit, self).__setattr__(name, value)
+
+  def __getstate__(self):
+    # The index is left out of pickles and rebuilt on demand
+    return None, dict((name, getattr(self, name)) for name in ['_position'] + self.attrs)
+
+def unit_shape(unit):
+  """Ids of the imports, the types and the members of the types of unit,
+  which change when any of those lists is changed in place."""
+  lists = [unit.imports or (), unit.types or ()]
+
+  for type_declaration in unit.types or ():
+    body = getattr(type_declaration, 'body', None)
+
+    if isinstance(body, EnumBody):
+      lists.extend((body.constants or (), body.declarations or ()))
+    elif isinstance(body, list):
+      lists.append(body)
+
+  return tuple(tuple(id(item) for item in items) for items in lists)
+
+class UnitIndex(object):
+  """Nodes of a compilation unit by class and annotated declarations by
+  annotation name, collected in a single walk.
+
+  Both lookups return nodes in the order of walk_tree(); the lists are
+  shared, so callers must not change them.
+  """
+  def __init__(self, unit):
+    self.shape = unit_shape(unit)
+    self.all_nodes = list(walk_nodes(unit))
+    self.by_type = dict()
+    self.by_class = dict()
+    self.by_annotation = dict()
+
+    for node in self.all_nodes:
+      node_type = type(node)
+
+      try:
+        self.by_type[node_type].append(node)
+      except KeyError:
+        self.by_type[node_type] = [node]
+
+    for node in self.nodes(Declaration):
+      for annotation in node.annotations or ():
+        names = set((annotation.name, annotation.name.rpartition('.')[2]))
+
+        for name in names:
+          annotated = self.by_annotation.setdefault(name, [])
+
+          if not annotated or annotated[-1] is not node:
+            annotated.append(node)
+
+  def nodes(self, node_type):
+    """Nodes that are instances of node_type."""
+    try:
+      return self.by_class[node_type]
+    except KeyError:
+      pass
+
+    types = [t for t in self.by_type if issubclass(t, node_type)]
+
+    if len(types) == 1:
+      nodes = self.by_type[types[0]]
+    elif types:
+      nodes = [node for node in self.all_nodes if isinstance(node, node_type)]
+    else:
+      nodes = []
+
+    self.by_class[node_type] = nodes
+
+    return nodes
+
+  def annotated(self, name):
+    """Declarations with an annotation written as name. A simple name also
+    matches annotations written with a qualified name."""
+    return self.by_annotation.get(name, [])
+
 class Import(Node):
   attrs = ("path", "static", "wildcard")
+  attr_types = {"path": (), "static": (), "wildcard": ()}
 
+# Documented and Declaration are combined as bases, so they store nothing
+# themselves; see ast.MetaNode
 class Documented(Node):
+  __slots__ = ()
   attrs = ("documentation",)
+  attr_types = {"documentation": ()}
+
+  @property
+  def doc(self):
+    """javadoc.DocBlock of the documentation, or None. The comment is only
+    scanned when the block is read."""
+    if self.documentation:
+      return javadoc.parse(self.documentation)
 
 class Declaration(Node):
+  __slots__ = ()
   attrs = ("modifiers", "annotations")
+  attr_types = {"modifiers": (), "annotations": ("Annotation",)}
 
 class TypeDeclaration(Declaration, Documented):
   attrs = ("name", "body")
+  attr_types = {"name": ()}
 
   @property
   def fields(self):
@@ -25,12 +150,16 @@ class TypeDeclaration(Declaration, Documented):
 
 class PackageDeclaration(Declaration, Documented):
   attrs = ("name",)
+  attr_types = {"name": ()}
 
 class ClassDeclaration(TypeDeclaration):
-  attrs = ("type_parameters", "extends", "implements")
+  attrs = ("type_parameters", "extends", "implements", "permits")
+  attr_types = {"type_parameters": ("TypeParameter",), "extends": ("Type",), "implements": ("Type",),
+                "permits": ("Type",)}
 
 class EnumDeclaration(TypeDeclaration):
   attrs = ("implements",)
+  attr_types = {"implements": ("Type",)}
 
   @property
   def fields(self):
@@ -38,35 +167,49 @@ class EnumDeclaration(TypeDeclaration):
   
   @property
   def methods(self):
-    return [decl for decl in self.body.declations if isinstance(decl, MethpdDeclaration)]
+    return [decl for decl in self.body.declarations if isinstance(decl, MethodDeclaration)]
 
 class InterfaceDeclaration(TypeDeclaration):
-  attrs = ("type_parameters", "extends",)
+  attrs = ("type_parameters", "extends", "permits")
+  attr_types = {"type_parameters": ("TypeParameter",), "extends": ("Type",), "permits": ("Type",)}
+
+class RecordDeclaration(TypeDeclaration):
+  attrs = ("type_parameters", "components", "implements")
+  attr_types = {"type_parameters": ("TypeParameter",), "components": ("FormalParameter",), "implements": ("Type",)}
 
 class AnnotationDeclaration(TypeDeclaration):
   attrs = ()
 
 
+# dimensions, here and in declarators, hold None per array dimension or
+# the type annotations of the dimension, as in String @NonNull [];
+# annotations are the type annotations in front of the name
 class Type(Node):
-  attrs = ("name", "dimensions",)
+  attrs = ("name", "dimensions", "annotations")
+  attr_types = {"name": (), "dimensions": ("Annotation",), "annotations": ("Annotation",)}
 
 class BasicType(Type):
   attrs = ()
 
 class ReferenceType(Type):
   attrs = ("arguments", "sub_type")
+  attr_types = {"arguments": ("TypeArgument",), "sub_type": ("ReferenceType",)}
 
 class TypeArgument(Node):
   attrs = ("type", "pattern_type")
+  attr_types = {"type": ("Type",), "pattern_type": ()}
 
 class TypeParameter(Node):
   attrs = ("name", "extends")
+  attr_types = {"name": (), "extends": ("Type",)}
 
 class Annotation(Node):
   attrs = ("name", "element")
+  attr_types = {"name": ()}
 
 class ElementValuePair(Node):
   attrs = ("name", "value")
+  attr_types = {"name": ()}
 
 class ElementArrayValue(Node):
   attrs = ("values",)
@@ -76,14 +219,33 @@ class Member(Documented):
 
 class MethodDeclaration(Member, Declaration):
   attrs = ("type_parameters", "return_type", "name", "parameters", "throws", "body")
+  attr_types = {"type_parameters": ("TypeParameter",), "return_type": ("Type",), "name": (),
+                "parameters": ("FormalParameter",), "throws": ()}
 
-class FIeldDeclaration(Member, Declaration):
+class FieldDeclaration(Member, Declaration):
   attrs = ("type", "declarators")
+  attr_types = {"type": ("Type",), "declarators": ("VariableDeclarator",)}
 
 class ConstructorDeclaration(Declaration, Documented):
   attrs = ("type_parameters", "name", "parameters", "throws", "body")
+  attr_types = {"type_parameters": ("TypeParameter",), "name": (), "parameters": ("FormalParameter",),
+                "throws": ()}
+
+class CompactConstructorDeclaration(ConstructorDeclaration):
+  attrs = ()
+
+class SkippedBlock(Node):
+  """Body of a method or constructor left unparsed by a skeleton parse.
+
+  ``start`` and ``end`` delimit its braces as character offsets in the
+  source text (before unicode escapes are replaced, and after decoding
+  for a file), or are None for a body left unread by
+  binary.load(skip_bodies=True).
+  """
+  attrs = ("start", "end")
+  attr_types = {"start": (), "end": ()}
 
-class ConstantDeclaration(FIeldDeclaration):
+class ConstantDeclaration(FieldDeclaration):
   attrs = ()
 
 class ArrayInitializer(Node):
@@ -91,21 +253,26 @@ class ArrayInitializer(Node):
 
 class VariableDeclaration(Declaration):
   attrs = ("type", "declarators")
+  attr_types = {"type": ("Type",), "declarators": ("VariableDeclarator",)}
 
 class LocalVariableDeclaration(VariableDeclaration):
   attrs = ()
 
 class VariableDeclarator(Node):
   attrs = ("name", "dimensions", "initializer")
+  attr_types = {"name": (), "dimensions": ("Annotation",)}
 
 class FormalParameter(Declaration):
-  attrs = ("name", "name", "varargs")
+  attrs = ("type", "name", "varargs")
+  attr_types = {"type": ("Type",), "name": (), "varargs": ()}
 
 class InferredFormalParameter(Node):
   attrs = ('name',)
+  attr_types = {"name": ()}
 
 class Statement(Node):
   attrs = ("label",)
+  attr_types = {"label": ()}
 
 class IfStatement(Statement):
   attrs = ("condition", "then_statement", "else_statement")
@@ -124,15 +291,17 @@ class AssertStatement(Statement):
 
 class BreakStatement(Statement):
   attrs = ("goto",)
+  attr_types = {"goto": ()}
 
 class ContinueStatement(Statement):
   attrs = ("goto",)
+  attr_types = {"goto": ()}
 
 class ReturnStatement(Statement):
   attrs = ("expression",)
 
 class ThrowStatement(Statement):
-  attrs = ("expression")
+  attrs = ("expression",)
 
 class SynchronizedStatement(Statement):
   attrs = ("lock", "block")
@@ -149,17 +318,36 @@ class BlockStatement(Statement):
 class StatementExpression(Statement):
   attrs = ("expression",)
 
+class YieldStatement(Statement):
+  attrs = ("expression",)
+
 class TryResource(Declaration):
   attrs = ("type", "name", "value")
+  attr_types = {"type": ("Type",), "name": ()}
 
 class CatchClause(Statement):
   attrs = ("parameter", "block")
+  attr_types = {"parameter": ("CatchClauseParameter",)}
 
 class CatchClauseParameter(Declaration):
   attrs = ("types", "name")
+  attr_types = {"types": (), "name": ()}
 
 class SwitchStatementCase(Node):
-  attrs = ("case", "statement")
+  attrs = ("case", "guard", "statements")
+
+# 'case ... ->' form; statements holds the single expression statement,
+# block or throw statement on the right of the arrow
+class SwitchRule(SwitchStatementCase):
+  attrs = ()
+
+class TypePattern(Declaration):
+  attrs = ("type", "name")
+  attr_types = {"type": ("Type",), "name": ()}
+
+class RecordPattern(Node):
+  attrs = ("type", "patterns")
+  attr_types = {"type": ("Type",), "patterns": ("TypePattern", "RecordPattern")}
 
 class ForControl(Node):
   attrs = ("init", "condition", "update")
@@ -172,36 +360,50 @@ class Expression(Node):
 
 class Assignment(Expression):
   attrs = ("expressionl", "value", "type")
+  attr_types = {"type": ()}
 
 class TernaryExpression(Expression):
   attrs = ("condition", "if_true", "if_false")
 
 class BinaryOperation(Expression):
-  attrs = ("operator", "opeandl", "operandr")
+  attrs = ("operator", "operandl", "operandr")
+  attr_types = {"operator": ()}
 
 class Cast(Expression):
   attrs = ("type", "expression")
+  attr_types = {"type": ("Type",)}
 
 class MethodReference(Expression):
   attrs = ("expression", "method", "type_arguments")
+  attr_types = {"type_arguments": ("TypeArgument",)}
 
 class LambdaExpression(Expression):
   attrs = ('parameters',  'body')
 
 class Primary(Expression):
-  attrs = ("prefix_operators", "postfix_operators", "qualifier", "selctors")
+  attrs = ("prefix_operators", "postfix_operators", "qualifier", "selectors")
+  attr_types = {"prefix_operators": (), "postfix_operators": (), "qualifier": ()}
+
+class ParenthesizedExpression(Primary):
+  attrs = ("expression",)
+
+class SwitchExpression(Primary):
+  attrs = ("expression", "cases")
 
 class Literal(Primary):
   attrs = ("value",)
+  attr_types = {"value": ()}
 
 class This(Primary):
   attrs = ()
 
 class MemberReference(Primary):
   attrs = ("member",)
+  attr_types = {"member": ()}
 
 class Invocation(Primary):
   attrs = ("type_arguments", "arguments")
+  attr_types = {"type_arguments": ("TypeArgument",)}
 
 class ExplicitConstructorInvocation(Invocation):
   attrs = ()
@@ -211,40 +413,50 @@ class SuperConstructorInvocation(Invocation):
 
 class MethodInvocation(Invocation):
   attrs = ("member",)
+  attr_types = {"member": ()}
 
 class SuperMethodInvocation(Invocation):
   attrs = ("member",) 
+  attr_types = {"member": ()}
 
 class SuperMemberReference(Primary):
   attrs = ("member",)
+  attr_types = {"member": ()}
 
 class ArraySelector(Expression):
   attrs = ("index",)
 
 class ClassReference(Primary):
   attrs = ("type",)
+  attr_types = {"type": ("Type",)}
 
 class VoidClassReference(ClassReference):
   attrs = ()
 
 class Creator(Primary):
   attrs = ("type",)
+  attr_types = {"type": ("Type",)}
 
 class ArrayCreator(Creator):
   attrs = ("dimensions", "initializer")
 
 class ClassCreator(Creator):
   attrs = ("constructor_type_arguments", "arguments", "body")
+  attr_types = {"constructor_type_arguments": ("TypeArgument",)}
 
 class InnerClassCreator(Creator):
   attrs = ("constructor_type_arguments", "arguments", "body")
+  attr_types = {"constructor_type_arguments": ("TypeArgument",)}
 
 class EnumBody(Node):
   attrs = ("constants", "declarations")
+  attr_types = {"constants": ("EnumConstantDeclaration",)}
 
 class EnumConstantDeclaration(Declaration, Documented):
   attrs = ("name", "arguments", "body")
+  attr_types = {"name": ()}
 
-class AnnotationMethod(Declaration):
+class AnnotationMethod(Declaration, Documented):
   attrs = ("name", "return_type", "dimensions", "default")
+  attr_types = {"name": (), "return_type": ("Type",), "dimensions": ("Annotation",)}
 
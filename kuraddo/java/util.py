@@ -1,6 +1,6 @@
 class LookAheadIterator(object):
   def __init__(self, iterable):
-    self.iterable - iter(iterable)
+    self.iterable = iter(iterable)
     self.look_ahead = list()
     self.markers = list()
     self.default = None
@@ -78,7 +78,12 @@ class LookAheadIterator(object):
 
 class LookAheadListIterator(object):
   def __init__(self, iterable):
-    self.list = list(iterable)
+    # Sequences (lists, token buffers) are indexed in place so their items
+    # are only materialized as the iterator reaches them.
+    if hasattr(iterable, '__getitem__') and hasattr(iterable, '__len__'):
+      self.list = iterable
+    else:
+      self.list = list(iterable)
 
     self.marker = 0
     self.saved_markers = []
@@ -142,6 +147,4 @@ class LookAheadListIterator(object):
     saved = self.saved_markers.pop()
 
     if reset:
-      self.marker = saved
-    elif self.saved_markers:
-      self.saved_markers[-1]= saved
\ No newline at end of file
+      self.marker = saved
\ No newline at end of file
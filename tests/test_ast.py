@@ -0,0 +1,102 @@
+import io
+import unittest
+
+from kuraddo.java import ast
+from kuraddo.java import parse
+from kuraddo.java import tree
+
+from tests.test_parser import ENTITY, MODERN, TYPE_ANNOTATIONS
+
+def recursive_walk(root):
+  if isinstance(root, ast.Node):
+    yield (), root
+    children = root.children
+  else:
+    children = root
+
+  for child in children:
+    if isinstance(child, (ast.Node, list, tuple)):
+      for path, node in recursive_walk(child):
+        yield (root,) + path, node
+
+def node_values(value):
+  if isinstance(value, (list, tuple)):
+    return [node for item in value for node in node_values(item)]
+
+  return [value] if isinstance(value, ast.Node) else []
+
+class TestNode(unittest.TestCase):
+  def test_slots(self):
+    for node_type in ast.MetaNode.node_types.values():
+      if node_type in (tree.Documented, tree.Declaration):
+        continue
+
+      node = node_type()
+
+      self.assertFalse(hasattr(node, '__dict__'), node_type.__name__)
+      self.assertEqual(node.children, [None] * len(node_type.attrs))
+      self.assertIsNone(node.position)
+
+  def test_init(self):
+    method = tree.MethodInvocation(None, ['a'], None, [], type_arguments='T', member='b')
+
+    self.assertEqual(method.postfix_operators, ['a'])
+    self.assertEqual(method.children, [None, ['a'], None, [], 'T', None, 'b'])
+    self.assertEqual(tree.Literal(value='1').children, [None, None, None, None, '1'])
+
+    self.assertRaises(ValueError, tree.Literal, values='1')
+    self.assertRaises(TypeError, tree.Literal, None, None, None, None, '1', None)
+    self.assertRaises(AttributeError, setattr, tree.Literal(), 'parent', None)
+
+  def test_dump(self):
+    unit = parse.parse(ENTITY)
+    buffer = io.BytesIO()
+
+    ast.dump(unit, buffer)
+    buffer.seek(0)
+    loaded = ast.load(buffer)
+
+    self.assertEqual(repr(loaded), repr(unit))
+    self.assertEqual([node.position for _, node in loaded], [node.position for _, node in unit])
+
+class TestWalk(unittest.TestCase):
+  def setUp(self):
+    self.units = [parse.parse(ENTITY), parse.parse(MODERN), parse.parse(TYPE_ANNOTATIONS)]
+
+  def test_walk_tree(self):
+    for unit in self.units:
+      expected = list(recursive_walk(unit))
+
+      self.assertEqual(list(ast.walk_tree(unit)), expected)
+      self.assertEqual(list(ast.walk_tree(unit.types)), list(recursive_walk(unit.types)))
+      self.assertEqual(list(ast.walk_nodes(unit)), [node for _, node in expected])
+
+  def test_attr_types(self):
+    for unit in self.units:
+      for node in ast.walk_nodes(unit):
+        for attr, names in type(node).attr_types.items():
+          allowed = tuple(ast.MetaNode.node_types[name] for name in names)
+
+          for value in node_values(getattr(node, attr)):
+            self.assertIsInstance(value, allowed, '%s.%s' % (type(node).__name__, attr))
+
+  def test_filter(self):
+    for unit in self.units:
+      for node_type in ast.MetaNode.node_types.values():
+        expected = [(path, node) for path, node in recursive_walk(unit) if isinstance(node, node_type)]
+
+        self.assertEqual(list(unit.filter(node_type)), expected, node_type.__name__)
+
+    declaration = self.units[0].types[0]
+    self.assertEqual([node for _, node in self.units[0].filter(declaration)], [declaration])
+
+  def test_searched_attrs(self):
+    self.assertEqual(ast.searched_attrs(tree.Import, tree.MethodInvocation), ())
+    self.assertEqual(ast.searched_attrs(tree.BasicType, tree.Annotation), ('dimensions', 'annotations'))
+    self.assertEqual(ast.searched_attrs(tree.Literal, tree.Literal), ('selectors',))
+    self.assertEqual(ast.searched_attrs(tree.FieldDeclaration, tree.Annotation),
+                     ('annotations', 'type', 'declarators'))
+    self.assertIn(tree.FieldDeclaration, ast.reachable_types(tree.LambdaExpression))
+
+if __name__ == "__main__":
+  unittest.main()
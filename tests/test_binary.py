@@ -0,0 +1,93 @@
+import io
+import pickle
+import unittest
+
+from kuraddo.java import ast
+from kuraddo.java import binary
+from kuraddo.java import parse
+from kuraddo.java import tree
+
+from tests.test_parser import ENTITY, MODERN
+
+def positions(value):
+  return [node.position for node in ast.walk_nodes(value)]
+
+class TestBinary(unittest.TestCase):
+  def assertRoundTrip(self, unit):
+    data = binary.dumps(unit)
+    loaded = binary.loads(data)
+
+    self.assertEqual(ast.pack(loaded), ast.pack(unit))
+    self.assertEqual(positions(loaded), positions(unit))
+
+    return data
+
+  def test_round_trip(self):
+    for source in (ENTITY, MODERN):
+      unit = parse.parse(source)
+      data = self.assertRoundTrip(unit)
+
+      self.assertLess(len(data), len(pickle.dumps(unit, pickle.HIGHEST_PROTOCOL)) // 2)
+
+    self.assertRoundTrip(parse.parse(u'class A {}'))
+    self.assertRoundTrip(tree.CompilationUnit(types=[]))
+
+  def test_values(self):
+    strings = [u'name%d' % i for i in range(300)] + [u'été \ud83d', u'x' * 1000]
+    value = [None, True, False, 0, -1, 63, -64, 2 ** 70, -2 ** 70, (1, u'a'), set([u'b', u'a']), strings,
+             tree.Literal(value=u'1'), [[], ()]]
+
+    self.assertEqual(ast.pack(binary.loads(binary.dumps(value))), ast.pack(value))
+    self.assertRaises(TypeError, binary.dumps, [1.5])
+
+  def test_ast_dump(self):
+    unit = parse.parse(ENTITY)
+    buffer = io.BytesIO()
+
+    ast.dump(unit, buffer)
+    buffer.seek(0)
+
+    self.assertEqual(ast.pack(ast.load(buffer)), ast.pack(unit))
+
+  def test_skip_bodies(self):
+    unit = parse.parse(ENTITY)
+    loaded = binary.loads(binary.dumps(unit), skip_bodies=True)
+    methods = loaded.index.nodes(tree.MethodDeclaration) + loaded.index.nodes(tree.ConstructorDeclaration)
+
+    self.assertTrue(methods)
+    self.assertTrue(all(isinstance(method.body, tree.SkippedBlock) for method in methods))
+    self.assertEqual(loaded.index.nodes(tree.Statement), [])
+    self.assertEqual(ast.pack(loaded.types[0].fields), ast.pack(unit.types[0].fields))
+    self.assertEqual(ast.pack(loaded.imports), ast.pack(unit.imports))
+
+  def test_iter_type_declarations(self):
+    unit = parse.parse(MODERN)
+    data = binary.dumps(unit)
+    declarations = list(binary.iter_type_declarations(io.BytesIO(data)))
+
+    self.assertEqual(ast.pack(declarations), ast.pack(unit.types))
+
+    buffer = io.BytesIO(data)
+    first = next(binary.iter_type_declarations(buffer))
+
+    self.assertEqual(first.name, unit.types[0].name)
+    self.assertLess(buffer.tell(), len(data))
+
+  def test_corrupt(self):
+    data = binary.dumps(parse.parse(ENTITY))
+
+    for broken in (b'', b'\x80\x04broken', data[:len(data) // 2], data[:-1], data[:6] + b'\x05\x00\x00\x09\x00\x00'):
+      self.assertRaises(binary.BinaryFormatError, binary.loads, broken)
+
+    self.assertRaises(binary.BinaryFormatError, binary.loads, data[:4] + b'\x09' + data[5:])
+    self.assertRaises(binary.BinaryFormatError, next, binary.iter_type_declarations(io.BytesIO(binary.dumps([]))))
+
+  def test_truncated_record(self):
+    # A set claiming three items in a record that holds two
+    data = binary.dumps(set([u'a', u'b']))
+
+    self.assertEqual(binary.loads(data), set([u'a', u'b']))
+    self.assertRaises(binary.BinaryFormatError, binary.loads, data.replace(b'\x07\x02', b'\x07\x03'))
+
+if __name__ == "__main__":
+  unittest.main()
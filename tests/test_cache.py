@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from kuraddo.java import cache
+from kuraddo.java import parse
+from kuraddo.java import tree
+
+from tests.test_parser import ENTITY
+
+class TestParseCache(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.cache_directory = os.path.join(self.directory, '.kuraddo', 'cache')
+    self.path = os.path.join(self.directory, 'Customer.java')
+    self.write(ENTITY)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def write(self, code, path=None):
+    with open(path or self.path, 'w') as source_file:
+      source_file.write(code)
+
+  def test_hit(self):
+    parse_cache = cache.ParseCache(self.cache_directory)
+    unit = parse_cache.parse_file(self.path)
+    cached = cache.ParseCache(self.cache_directory).parse_file(self.path)
+
+    self.assertEqual(repr(cached), repr(unit))
+    self.assertEqual(parse_cache.misses, 1)
+    self.assertEqual(os.listdir(self.cache_directory), [parse_cache.file_key(self.path) + cache.ENTRY_SUFFIX])
+
+  def test_key(self):
+    parse_cache = cache.ParseCache(self.cache_directory)
+    key = parse_cache.file_key(self.path)
+
+    self.assertNotEqual(key, cache.ParseCache(self.cache_directory, version='next').file_key(self.path))
+    self.write(ENTITY.replace('Long id', 'Integer id'))
+    self.assertNotEqual(key, parse_cache.file_key(self.path))
+
+    unit = parse_cache.parse_file(self.path)
+    self.assertEqual(unit.types[0].fields[0].type.name, 'Integer')
+    self.assertEqual(parse_cache.hits, 0)
+
+  def test_eviction(self):
+    parse_cache = cache.ParseCache(self.cache_directory)
+    paths = []
+
+    for i in range(3):
+      paths.append(os.path.join(self.directory, 'Entity%d.java' % i))
+      self.write(u'class Entity%d { int x; }' % i, paths[-1])
+      parse_cache.parse_file(paths[-1])
+      os.utime(parse_cache.entry_path(parse_cache.file_key(paths[-1])), (i, i))
+
+    size = os.path.getsize(parse_cache.entry_path(parse_cache.file_key(paths[0])))
+    parse_cache.max_size = 2 * size
+    parse_cache.get(parse_cache.file_key(paths[0]))
+    parse_cache.evict()
+
+    self.assertEqual(parse_cache.get(parse_cache.file_key(paths[1])), None)
+    self.assertNotEqual(parse_cache.get(parse_cache.file_key(paths[0])), None)
+    self.assertNotEqual(parse_cache.get(parse_cache.file_key(paths[2])), None)
+
+  def test_corrupt_entry(self):
+    parse_cache = cache.ParseCache(self.cache_directory)
+    key = parse_cache.file_key(self.path)
+
+    with open(parse_cache.entry_path(key), 'wb') as entry_file:
+      entry_file.write(b'\x80\x04broken')
+
+    self.assertEqual(parse_cache.get(key), None)
+    self.assertFalse(os.path.exists(parse_cache.entry_path(key)))
+
+  def test_parse_many(self):
+    paths = [self.path]
+
+    for i in range(2):
+      paths.append(os.path.join(self.directory, 'Entity%d.java' % i))
+      self.write(u'class Entity%d { int x; }' % i, paths[-1])
+
+    first = cache.ParseCache(self.cache_directory)
+    results = list(parse.parse_many(paths, workers=2, cache=first))
+    second = cache.ParseCache(self.cache_directory)
+    cached = list(parse.parse_many(paths, workers=2, cache=second))
+
+    self.assertEqual(first.misses, 3)
+    self.assertEqual(second.hits, 3)
+    self.assertEqual(sorted(repr(r) for r in cached), sorted(repr(r) for r in results))
+    self.assertFalse([name for name in os.listdir(self.cache_directory) if name.endswith('.tmp')])
+
+  def test_skip_bodies(self):
+    parse_cache = cache.ParseCache(self.cache_directory)
+    unit = parse_cache.parse_file(self.path)
+    result, = parse.parse_many([self.path], cache=parse_cache, skip_bodies=True)
+    methods = result.unit.index.nodes(tree.MethodDeclaration)
+
+    self.assertEqual(parse_cache.hits, 1)
+    self.assertTrue(methods)
+    self.assertTrue(all(isinstance(method.body, tree.SkippedBlock) for method in methods))
+    self.assertEqual(repr(result.unit.types[0].fields), repr(unit.types[0].fields))
+
+if __name__ == "__main__":
+  unittest.main()
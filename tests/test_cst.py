@@ -0,0 +1,187 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from kuraddo.java import ast
+from kuraddo.java import cst
+from kuraddo.java import parse
+from kuraddo.java import tree
+
+from tests.test_parser import ENTITY, MODERN
+
+GETTER = '''
+    /** The name. */
+    public String getName() {
+        return name;
+    }
+'''
+
+def shape(unit):
+  # New members have no positions
+  for node in ast.walk_nodes(unit):
+    node._position = None
+
+  return ast.pack(unit)
+
+def method(unit, name):
+  return [node for node in unit.index.nodes(tree.MethodDeclaration) if node.name == name][0]
+
+class TestSourceFile(unittest.TestCase):
+  def assertParsesAs(self, source_file):
+    self.assertEqual(shape(parse.parse(source_file.text())), shape(source_file.unit))
+
+  def test_unchanged(self):
+    for source in (ENTITY, MODERN):
+      source_file = cst.SourceFile(source)
+
+      self.assertEqual(source_file.changes(), [])
+      self.assertEqual(source_file.text(), source)
+      self.assertEqual(ast.pack(source_file.unit), ast.pack(parse.parse(source)))
+
+  def test_insert_member(self):
+    source_file = cst.SourceFile(ENTITY)
+    customer = source_file.unit.types[0]
+
+    getter = source_file.insert_member(customer, GETTER)
+    source_file.insert_member(customer, 'private int version;', 0)
+
+    self.assertIs(customer.body[-1], getter)
+    self.assertEqual(getter.position, None)
+    self.assertIn(u'\n\n  /** The name. */\n  public String getName() {\n      return name;\n  }\n}', source_file.text())
+    self.assertIn(u'{\n  private int version;\n\n  @Id', source_file.text())
+    self.assertParsesAs(source_file)
+
+    # Everything outside the edits is left as it was
+    changes = source_file.changes()
+    self.assertEqual([(start, end) for start, end, _ in changes], [(changes[0].start,) * 2, (changes[1].start,) * 2])
+    self.assertTrue(source_file.text().startswith(ENTITY[:changes[0].start]))
+    self.assertTrue(source_file.text().endswith(ENTITY[changes[1].start:]))
+
+  def test_skeleton(self):
+    source_file = cst.SourceFile(ENTITY, skeleton=True)
+    customer = source_file.unit.types[0]
+    constructor = customer.body[3]
+
+    self.assertTrue(isinstance(constructor.body, tree.SkippedBlock))
+
+    source_file.replace_member(constructor, 'public Customer() {\n  this.name = "";\n}')
+    source_file.insert_member(customer, GETTER)
+
+    self.assertEqual(source_file.text(), self.edited(cst.SourceFile(ENTITY)).text())
+
+  def edited(self, source_file):
+    customer = source_file.unit.types[0]
+
+    source_file.replace_member(customer.body[3], 'public Customer() {\n  this.name = "";\n}')
+    source_file.insert_member(customer, GETTER)
+
+    return source_file
+
+  def test_empty_bodies(self):
+    source_file = cst.SourceFile(u'class A {}\ninterface B {\n}\n')
+
+    source_file.insert_member(source_file.unit.types[0], 'int a;')
+    source_file.insert_member(source_file.unit.types[1], 'void f();')
+
+    self.assertEqual(source_file.text(), u'class A {\n    int a;\n}\ninterface B {\n    void f();\n}\n')
+    self.assertParsesAs(source_file)
+
+  def test_replace_and_remove(self):
+    source_file = cst.SourceFile(ENTITY)
+    customer = source_file.unit.types[0]
+
+    source_file.replace_member(method(source_file.unit, 'getId'), 'public Long getId() { return this.id; }')
+    source_file.remove_member(method(source_file.unit, 'total'))
+
+    text = source_file.text()
+
+    self.assertIn(u'\n\n  public Long getId() { return this.id; }\n\n  public void setName', text)
+    self.assertNotIn(u'total', text)
+    self.assertEqual([node.name for node in customer.body if isinstance(node, tree.MethodDeclaration)],
+                     ['getId', 'setName'])
+    self.assertParsesAs(source_file)
+
+  def test_replace_first_member(self):
+    for source, expected in [(u'class A {\n    int a;\n\n    int b;\n}\n', u'class A {\n    long a;\n\n    int b;\n}\n'),
+                             (u'class A {\n    int a;\n    int b;\n}\n', u'class A {\n    long a;\n    int b;\n}\n'),
+                             (u'class A { int a; }', u'class A { long a; }')]:
+      source_file = cst.SourceFile(source)
+      source_file.replace_member(source_file.unit.types[0].body[0], 'long a;')
+
+      self.assertEqual(source_file.text(), expected)
+      self.assertEqual(len(source_file.changes()), 1)
+
+  def test_remove_first_member(self):
+    for source, expected in [(u'class A {\n    int a;\n\n    int b;\n}\n', u'class A {\n    int b;\n}\n'),
+                             (u'class A {\n    int a;\n    int b;\n}\n', u'class A {\n    int b;\n}\n'),
+                             (u'class A {\n  int a;\n\n  // b\n  int b;\n}\n', u'class A {\n  // b\n  int b;\n}\n'),
+                             (u'class A { int a; int b; }', u'class A { int b; }'),
+                             (u'class A {\n  int a;\n}\n', u'class A {\n}\n')]:
+      source_file = cst.SourceFile(source)
+      source_file.remove_member(source_file.unit.types[0].body[0])
+
+      self.assertEqual(source_file.text(), expected)
+
+  def test_nested_and_crlf(self):
+    source = ENTITY.replace(u'\n', u'\r\n') + u'class Outer {\r\n  class Inner {\r\n    int depth;\r\n  }\r\n}\r\n'
+    source_file = cst.SourceFile(source)
+    status = source_file.unit.types[0].body[-1]
+    inner = source_file.unit.types[1].body[0]
+
+    self.assertRaises(ValueError, source_file.insert_member, status, 'int code;')
+
+    added = source_file.insert_member(inner, 'int b() {\n  return depth;\n}')
+    text = source_file.text()
+
+    self.assertIn(u'    int depth;\r\n\r\n    int b() {\r\n      return depth;\r\n    }\r\n  }', text)
+    self.assertNotIn(u'\n', text.replace(u'\r\n', u''))
+    self.assertParsesAs(source_file)
+
+    # Members added by an edit are not editable bodies
+    new_class = source_file.insert_member(source_file.unit.types[0], 'static class Added {}')
+    self.assertRaises(ValueError, source_file.insert_member, new_class, 'int a;')
+
+    source_file.remove_member(new_class)
+    source_file.remove_member(added)
+    self.assertEqual(source_file.text(), source)
+
+  def test_invalid_member(self):
+    source_file = cst.SourceFile(ENTITY)
+    customer = source_file.unit.types[0]
+
+    self.assertRaises(ValueError, source_file.insert_member, customer, 'int a; int b;')
+    self.assertRaises(ValueError, source_file.insert_member, customer, '')
+    self.assertRaises(ValueError, source_file.remove_member, tree.FieldDeclaration())
+
+class TestWrite(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'Customer.java')
+
+    with io.open(self.path, 'w', encoding='utf-8', newline='') as java_file:
+      java_file.write(ENTITY)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def test_write(self):
+    source_file = cst.SourceFile.read(self.path)
+    source_file.insert_member(source_file.unit.types[0], 'private int version;')
+
+    # The newline after the last member was already there
+    self.assertEqual(source_file.write(), len(u'\n  private int version;\n}\n'))
+    self.assertEqual(source_file.write(), 0)
+
+    with io.open(self.path, encoding='utf-8', newline='') as java_file:
+      self.assertEqual(java_file.read(), source_file.text())
+
+  def test_write_new_file(self):
+    source_file = cst.SourceFile(u'class A {}')
+    path = os.path.join(self.directory, 'A.java')
+
+    self.assertEqual(source_file.write(path), len(u'class A {}'))
+
+if __name__ == "__main__":
+  unittest.main()
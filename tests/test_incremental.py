@@ -0,0 +1,99 @@
+import unittest
+
+from kuraddo.java import incremental
+from kuraddo.java import parse
+from kuraddo.java import tree
+from kuraddo.java.parser import JavaSyntaxError
+from kuraddo.java.tokenizer import LexerError
+
+from tests.test_parser import ENTITY
+
+SOURCE = ENTITY + u'''
+interface Repository {
+  Customer find(Long id);
+
+  void save(Customer customer);
+}
+'''
+
+def positions(unit):
+  return [(type(node).__name__, node.position) for _, node in unit]
+
+class TestIncrementalParser(unittest.TestCase):
+  def setUp(self):
+    self.parser = incremental.IncrementalParser(SOURCE)
+
+  def assertUpdate(self, source, reparsed):
+    unit = self.parser.update(source)
+    expected = parse.parse(source)
+
+    self.assertIs(unit, self.parser.unit)
+    self.assertEqual(repr(unit), repr(expected))
+    self.assertEqual(positions(unit), positions(expected))
+    self.assertEqual(self.parser.reparsed, reparsed)
+
+    return source
+
+  def test_diff(self):
+    self.assertEqual(incremental.diff(u'int x;', u'int yy;'), incremental.Edit(4, 5, u'yy'))
+    self.assertEqual(incremental.diff(u'aaa', u'aaaa'), incremental.Edit(3, 3, u'a'))
+    self.assertEqual(incremental.diff(u'abc', u'abc'), incremental.Edit(3, 3, u''))
+
+  def test_member_edit(self):
+    body = self.parser.unit.types[0].body
+    members = list(body)
+
+    self.assertUpdate(SOURCE.replace('private String name;', 'private String fullName;'), 1)
+    self.assertEqual(body[1].declarators[0].name, 'fullName')
+    self.assertTrue(all(a is b for a, b in zip(body, members) if a is not body[1]))
+
+  def test_index(self):
+    fields = self.parser.unit.index.nodes(tree.FieldDeclaration)
+
+    self.assertUpdate(SOURCE.replace('private String name;', 'private String fullName;'), 1)
+    self.assertIsNot(self.parser.unit.index.nodes(tree.FieldDeclaration)[1], fields[1])
+    self.assertEqual(self.parser.unit.index.nodes(tree.FieldDeclaration)[1].declarators[0].name, 'fullName')
+
+  def test_insert_lines(self):
+    source = self.assertUpdate(SOURCE.replace('  public Long getId()', '  /** The id. */\n  public Long getId()'), 1)
+    self.assertEqual(self.parser.unit.types[0].body[4].documentation, '/** The id. */')
+
+    source = self.assertUpdate(source.replace('    return sum;', '    sum++;\n\n    return sum;'), 1)
+    self.assertUpdate(source.replace('  void save(Customer customer);\n', ''), 0)
+
+  def test_shared_line_shifts(self):
+    later = [node for _, node in self.parser.unit.types[1]] + [node for _, node in self.parser.unit.types[0].body[-1]]
+    later = [node for node in later if node.position]
+    before = [(node._position, node.position) for node in later]
+
+    self.assertUpdate(SOURCE.replace('  private Long id;', '  private Long id;\n\n  private Long version;'), 2)
+
+    # The later nodes keep their position values; only the shared deltas moved
+    for node, (value, position) in zip(later, before):
+      self.assertIs(node._position, value)
+      self.assertEqual(node.position, (position.line + 2, position.column))
+
+  def test_same_line_members(self):
+    source = self.assertUpdate(SOURCE.replace('  private Long id;', '  private Long id; int a; int b;'), 4)
+    source = self.assertUpdate(source.replace('private Long id;', 'private\n    Long id;'), 1)
+    source = self.assertUpdate(source.replace('int a;', 'long aa;'), 1)
+    self.assertUpdate(source.replace('int b;', 'int b; }  class C { int c;'), None)
+
+    source = SOURCE.replace('{} }\n}\n\ninterface', '{} } int last; } interface')
+    self.parser.parse(source)
+    self.assertUpdate(source.replace('int last;', 'long last;'), 1)
+
+  def test_new_member(self):
+    source = self.assertUpdate(SOURCE.replace('  public Customer() {', '  private int age;\n\n  public Customer() {'), 2)
+    self.assertUpdate(source.replace('  public enum Status', '  int a; int b;\n  public enum Status'), 3)
+
+  def test_full_parse(self):
+    self.assertUpdate(SOURCE.replace('extends BaseEntity', 'extends Base'), None)
+    self.parser.parse(SOURCE)
+
+    self.assertRaises(JavaSyntaxError, self.parser.update, SOURCE.replace('private Long id;', 'private Long id; }'))
+    self.assertRaises(LexerError, self.parser.update, SOURCE.replace('private Long id;', 'private Long id; /* open'))
+    self.assertEqual(self.parser.source, SOURCE)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from kuraddo.java import javadoc
+from kuraddo.java import parse
+
+from tests.test_parser import ENTITY
+
+COMMENT = u'''/**
+   * Finds a customer.
+   *
+   *   Indented line.
+   * @param id  the id
+   *   of the customer
+   * @return the customer
+   * @throws NotFoundException when missing
+   * @author kuraddo
+   * @deprecated
+   */'''
+
+class TestDocBlock(unittest.TestCase):
+  def test_parse(self):
+    block = javadoc.parse(COMMENT)
+
+    self.assertEqual(block.description, u'Finds a customer.\n\n  Indented line.')
+    self.assertEqual(block.params, [(u'id', u'the id of the customer')])
+    self.assertEqual(block.return_doc, u'the customer')
+    self.assertEqual(block.throws, {u'NotFoundException': u'when missing'})
+    self.assertIs(block.exceptions, block.throws)
+    self.assertEqual(block.authors, [u'kuraddo'])
+    self.assertTrue(block.deprecated)
+    self.assertEqual(sorted(block.tags), [u'author', u'deprecated', u'param', u'return', u'throws'])
+
+    self.assertEqual(javadoc.parse(u'/** @return x */').description, u'')
+    self.assertEqual(javadoc.parse(u'/***/').tags, {})
+    self.assertRaises(ValueError, javadoc.parse, u'/* not javadoc */')
+
+  def test_lazy(self):
+    javadoc.scan.cache_clear()
+    block = javadoc.parse(COMMENT)
+
+    self.assertNotIn('description', block.__dict__)
+    self.assertEqual(javadoc.scan.cache_info().misses, 0)
+
+    self.assertEqual(block.authors, [u'kuraddo'])
+    self.assertIn('description', block.__dict__)
+    self.assertRaises(AttributeError, getattr, block, 'summary')
+
+    # The same text is scanned once, each block still has its own values
+    other = javadoc.parse(COMMENT)
+    other.add_block(u'author', u'someone')
+
+    self.assertEqual(block.authors, [u'kuraddo'])
+    self.assertEqual(other.authors, [u'kuraddo', u'someone'])
+    self.assertEqual(javadoc.scan.cache_info().misses, 1)
+
+  def test_empty(self):
+    block = javadoc.DocBlock()
+    block.add_block(u'param', u'name  the name')
+
+    self.assertEqual(block.description, u'')
+    self.assertEqual(block.params, [(u'name', u'the name')])
+
+  def test_documented(self):
+    unit = parse.parse(ENTITY)
+
+    self.assertEqual(unit.types[0].doc.description, u'A customer.')
+    self.assertEqual(unit.types[0].fields[0].doc, None)
+
+if __name__ == "__main__":
+  unittest.main()
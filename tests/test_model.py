@@ -0,0 +1,164 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from kuraddo.java import model
+from kuraddo.java import parse
+from kuraddo.java.cache import ParseCache
+
+from tests.test_parser import ENTITY
+
+ORDER = u'''package com.example.demo.entity;
+
+@Entity(name = "Purchase")
+public class Order {
+  @EmbeddedId
+  private OrderKey key;
+
+  @ManyToOne(fetch = FetchType.LAZY, targetEntity = Customer.class)
+  @JoinColumn(name = "customer_id")
+  private Object customer;
+
+  @Column(name = "qty", unique = true)
+  private int quantity, returned;
+
+  @Transient
+  private String label;
+
+  private transient int hash;
+
+  private static final long serialVersionUID = -1L;
+
+  @ManyToMany
+  private Map<String, Tag> tags;
+
+  private String[] notes;
+
+  public void total() {
+    @Entity class Local { @Id Long id; }
+  }
+
+  @Entity
+  public static class Line {
+    @Id
+    @GeneratedValue
+    private long id;
+  }
+}
+
+class Helper {
+}
+'''
+
+class TestExtract(unittest.TestCase):
+  def test_entity(self):
+    entities = model.extract(parse.parse(ENTITY))
+
+    self.assertEqual(len(entities), 1)
+
+    customer = entities[0]
+    id_column = model.Column('id', 'Long', 'id', False, False, None, 'IDENTITY')
+
+    self.assertEqual(customer.name, 'Customer')
+    self.assertEqual(customer.package, 'com.example.demo.entity')
+    self.assertEqual(customer.table, 'customers')
+    self.assertEqual(customer.extends, 'BaseEntity')
+    self.assertEqual(customer.id, id_column)
+    self.assertEqual(customer.columns, (id_column, model.Column('name', 'String', 'name', False, False, 80, None)))
+    self.assertEqual(customer.relations, (model.Relation('orders', 'OneToMany', 'Order', 'customer', None, True),))
+
+  def test_fields(self):
+    order, line = model.extract(parse.parse(ORDER))
+
+    self.assertEqual(order.table, 'Purchase')
+    self.assertEqual(order.extends, None)
+    self.assertEqual(order.id, model.Column('key', 'OrderKey', 'key', False, False, None, None))
+    self.assertEqual([column.field for column in order.columns], ['key', 'quantity', 'returned', 'notes'])
+    self.assertEqual(order.columns[1], model.Column('quantity', 'int', 'qty', True, True, None, None))
+    self.assertEqual(order.columns[2].name, 'returned')
+    self.assertEqual(order.columns[3].type, 'String[]')
+    self.assertEqual(order.relations, (
+      model.Relation('customer', 'ManyToOne', 'Customer', None, 'customer_id', False),
+      model.Relation('tags', 'ManyToMany', 'Tag', None, None, True),
+    ))
+
+    self.assertEqual(line.name, 'Line')
+    self.assertEqual(line.table, 'Line')
+    self.assertEqual(line.id.generated, 'AUTO')
+
+  def test_skeleton(self):
+    for code in (ENTITY, ORDER):
+      self.assertEqual(model.extract(parse.parse(code, skeleton=True)), model.extract(parse.parse(code)))
+
+  def test_no_entities(self):
+    self.assertEqual(model.extract(parse.parse(u'class Plain { @Id int id; }')), [])
+
+class TestElementValue(unittest.TestCase):
+  def values(self, element):
+    unit = parse.parse(u'@A(%s) class C {}' % (element,))
+
+    return model.annotation_values(unit.types[0].annotations[0])
+
+  def test_values(self):
+    self.assertEqual(self.values(u'"name"'), {'value': 'name'})
+    self.assertEqual(self.values(u'length = 10, scale = -2'), {'length': 10, 'scale': -2})
+    self.assertEqual(self.values(u'big = 7L, flag = true'), {'big': 7, 'flag': True})
+    self.assertEqual(self.values(u'type = Type.EAGER'), {'type': 'EAGER'})
+    self.assertEqual(self.values(u'value = java.util.List.class'), {'value': 'java.util.List'})
+    self.assertEqual(self.values(u'{"a", "b"}'), {'value': ('a', 'b')})
+    self.assertEqual(self.values(u'ratio = 0.5'), {'ratio': '0.5'})
+    self.assertEqual(self.values(u'size = 1 + 2'), {'size': None})
+
+class TestExtractMany(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.paths = []
+
+    for i in range(3):
+      self.paths.append(self.write(os.path.join('entity', 'Customer%d.java' % i),
+                                   ENTITY.replace('class Customer ', 'class Customer%d ' % i)))
+
+    self.broken = self.write('Broken.java', u'class Broken {\n  int x = ;\n}\n')
+    self.write(os.path.join('.git', 'Hidden.java'), ENTITY)
+    self.write('README.txt', u'')
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def write(self, name, code):
+    path = os.path.join(self.directory, name)
+
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+
+    with open(path, 'w') as source_file:
+      source_file.write(code)
+
+    return path
+
+  def assertResults(self, results):
+    results = dict((result.path, result) for result in results)
+
+    self.assertEqual(sorted(results), sorted(self.paths + [self.broken]))
+
+    for i, path in enumerate(self.paths):
+      self.assertEqual(results[path].error, None)
+      self.assertEqual([entity.name for entity in results[path].entities], ['Customer%d' % i])
+
+    self.assertEqual(results[self.broken].entities, [])
+    self.assertEqual(results[self.broken].error.type, 'JavaSyntaxError')
+
+  def test_java_files(self):
+    self.assertEqual(list(model.java_files(self.directory)), [self.broken] + self.paths)
+
+  def test_workers(self):
+    for workers in (1, 2):
+      self.assertResults(model.extract_many(model.java_files(self.directory), workers=workers))
+
+  def test_cache(self):
+    cache = ParseCache(os.path.join(self.directory, '.cache'))
+
+    self.assertResults(model.extract_many(model.java_files(self.directory), workers=1, cache=cache))
+    self.assertResults(model.extract_many(model.java_files(self.directory), workers=1, cache=cache))
+    self.assertEqual(cache.hits, len(self.paths))
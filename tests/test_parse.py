@@ -0,0 +1,224 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from kuraddo.java import ast
+from kuraddo.java import parse
+from kuraddo.java import tree
+from kuraddo.java.parser import JavaSyntaxError, Parser
+from kuraddo.java.tokenizer import tokenize
+
+from tests.test_parser import ENTITY
+
+def crash_packed(path, recover=False):
+  # Stands in for parse.parse_packed in the workers
+  if path.endswith('Crash.java'):
+    os._exit(1)
+
+  time.sleep(0.05)
+
+  return PARSE_PACKED(path, recover)
+
+PARSE_PACKED = parse.parse_packed
+
+class TestParseMany(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.paths = []
+
+    for i in range(4):
+      self.paths.append(self.write('Customer%d.java' % i, ENTITY.replace('class Customer ', 'class Customer%d ' % i)))
+
+    self.broken = self.write('Broken.java', u'class Broken {\n  int x = ;\n}\n')
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def write(self, name, code):
+    path = os.path.join(self.directory, name)
+
+    with open(path, 'w') as source_file:
+      source_file.write(code)
+
+    return path
+
+  def assertResults(self, results):
+    results = dict((result.path, result) for result in results)
+
+    self.assertEqual(sorted(results), sorted(self.paths + [self.broken]))
+
+    for i, path in enumerate(self.paths):
+      self.assertEqual(results[path].error, None)
+      self.assertEqual(repr(results[path].unit), repr(parse.parse_file(path)))
+      self.assertEqual(results[path].unit.types[0].name, 'Customer%d' % i)
+      self.assertEqual(results[path].unit.types[0].position, (11, 8))
+
+    error = results[self.broken].error
+    self.assertEqual(results[self.broken].unit, None)
+    self.assertEqual(error.type, 'JavaSyntaxError')
+    self.assertEqual(error.position, (2, 11))
+
+  def test_workers(self):
+    self.assertResults(parse.parse_many(self.paths + [self.broken], workers=2))
+
+  def test_serial(self):
+    self.assertResults(parse.parse_many(self.paths + [self.broken], workers=1))
+
+  def test_recover(self):
+    for workers in (1, 2):
+      results = dict((r.path, r) for r in parse.parse_many(self.paths + [self.broken], workers=workers, recover=True))
+      broken = results[self.broken]
+
+      self.assertEqual(broken.error, None)
+      self.assertEqual(broken.unit.types[0].body, [])
+      self.assertEqual(broken.errors, [parse.ParseError('JavaSyntaxError', 'Expected expression', (2, 11))])
+      self.assertEqual(results[self.paths[0]].errors, [])
+
+  def test_crashed_worker(self):
+    crash = self.write('Crash.java', u'class Crash {}')
+
+    with patch.object(parse, 'parse_packed', crash_packed):
+      results = list(parse.parse_many([crash] + self.paths, workers=2))
+
+    results = dict((result.path, result) for result in results)
+
+    self.assertEqual(sorted(results), sorted([crash] + self.paths))
+    self.assertEqual(results[crash].unit, None)
+    self.assertEqual(results[crash].error.type, 'BrokenProcessPool')
+
+  def test_close_early(self):
+    paths = self.paths * 10
+
+    with patch.object(parse, 'parse_packed', crash_packed):
+      results = parse.parse_many(paths, workers=2)
+      next(results)
+
+      started = time.time()
+      results.close()
+
+    # Without cancelling, closing waits for the 40 files, a second of sleep
+    self.assertLess(time.time() - started, 0.5)
+
+  def test_missing_file(self):
+    results = list(parse.parse_many([os.path.join(self.directory, 'Missing.java')]))
+
+    self.assertEqual(results[0].unit, None)
+    self.assertEqual(results[0].error.type, 'FileNotFoundError')
+
+class TestPack(unittest.TestCase):
+  def test_round_trip(self):
+    unit = parse.parse(ENTITY)
+    packed = ast.pack(unit)
+
+    self.assertIsInstance(packed, tuple)
+    self.assertEqual(repr(ast.unpack(packed)), repr(unit))
+    self.assertEqual(ast.unpack(packed).types[0].fields[0].position, unit.types[0].fields[0].position)
+
+class TestIterTypeDeclarations(unittest.TestCase):
+  SOURCE = ENTITY + u'''
+interface Repository {
+  Customer find(Long id);
+}
+
+@interface Audited { }
+'''
+
+  def test_same_declarations(self):
+    declarations = list(parse.iter_type_declarations(self.SOURCE))
+
+    self.assertEqual(repr(declarations), repr(parse.parse(self.SOURCE).types))
+    self.assertEqual([d.position for d in declarations], [t.position for t in parse.parse(self.SOURCE).types])
+
+  def test_stop_early(self):
+    declarations = parse.iter_type_declarations(self.SOURCE + u'class Broken { int x = ; }')
+
+    self.assertEqual(next(declarations).name, 'Customer')
+    self.assertEqual(next(declarations).name, 'Repository')
+    self.assertEqual(next(declarations).name, 'Audited')
+    self.assertRaises(JavaSyntaxError, next, declarations)
+
+class TestSkeleton(unittest.TestCase):
+  def test_declarations(self):
+    unit = parse.parse(ENTITY, skeleton=True)
+    full = parse.parse(ENTITY)
+
+    for node_type in (tree.FieldDeclaration, tree.Annotation, tree.Import, tree.FormalParameter):
+      self.assertEqual(repr([node for _, node in unit.filter(node_type)]),
+                       repr([node for _, node in full.filter(node_type)]))
+
+    self.assertFalse(list(unit.filter(tree.Statement)))
+
+  def test_spans(self):
+    unit = parse.parse(ENTITY, skeleton=True)
+    _, method = next(unit.filter(tree.MethodDeclaration))
+
+    self.assertIsInstance(method.body, tree.SkippedBlock)
+    self.assertEqual(ENTITY[method.body.start:method.body.end], u'{\n    return id;\n  }')
+    self.assertEqual(method.body.position, (26, 23))
+
+    # Offsets are in the source, not in the text with escapes replaced
+    source = ENTITY.replace(u'private Long id;', u'private Long \\u0069d;')
+    _, method = next(parse.parse(source, skeleton=True).filter(tree.MethodDeclaration))
+
+    self.assertEqual(source[method.body.start:method.body.end], u'{\n    return id;\n  }')
+
+  def test_token_list(self):
+    source = u'class A { void f() { g(\'}\', "{"); { } } int x; }'
+    unit = Parser(tokenize(source), skeleton=True).parse()
+    body = unit.types[0].body
+
+    self.assertEqual(source[body[0].body.start:body[0].body.end], u'{ g(\'}\', "{"); { } }')
+    self.assertEqual(body[1].declarators[0].name, 'x')
+
+  def test_unclosed_body(self):
+    self.assertRaises(JavaSyntaxError, parse.parse, u'class A { void f() { {', skeleton=True)
+
+  def test_parse_file(self):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'Customer.java')
+    source = ENTITY.replace('A customer.', u'Un client à Zürich.')
+
+    try:
+      with open(path, 'wb') as java_file:
+        java_file.write(source.encode('utf-8'))
+
+      unit = parse.parse_file(path, skeleton=True)
+      _, method = next(unit.filter(tree.MethodDeclaration))
+      body = source[method.body.start:method.body.end]
+
+      self.assertEqual(repr(unit.types[0].fields), repr(parse.parse(source).types[0].fields))
+      self.assertEqual(unit.types[0].documentation, u'/**\n * Un client à Zürich.\n */')
+      self.assertEqual(body, u'{\n    return id;\n  }')
+
+      _, parsed = next(parse.parse(source, skeleton=True).filter(tree.MethodDeclaration))
+      self.assertEqual((method.body.start, method.body.end), (parsed.body.start, parsed.body.end))
+    finally:
+      shutil.rmtree(directory)
+
+class TestJavadoc(unittest.TestCase):
+  def test_skip(self):
+    for skeleton in (False, True):
+      documented = [node.documentation for _, node in parse.parse(ENTITY, skeleton).filter(tree.Documented)]
+      skipped = [node.documentation for _, node in parse.parse(ENTITY, skeleton, javadoc=False).filter(tree.Documented)]
+
+      self.assertIn(u'/**\n * A customer.\n */', documented)
+      self.assertEqual(set(skipped), set([None]))
+
+  def test_parse_file(self):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'Customer.java')
+
+    try:
+      with open(path, 'wb') as java_file:
+        java_file.write(ENTITY.encode('utf-8'))
+
+      self.assertEqual(parse.parse_file(path).types[0].documentation, u'/**\n * A customer.\n */')
+      self.assertEqual(parse.parse_file(path, javadoc=False).types[0].documentation, None)
+    finally:
+      shutil.rmtree(directory)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,419 @@
+import unittest
+
+from kuraddo.java import parse
+from kuraddo.java import tree
+from kuraddo.java import tokenizer
+from kuraddo.java.parser import JavaSyntaxError, Parser
+
+ENTITY = u'''package com.example.demo.entity;
+
+import java.util.List;
+import javax.persistence.*;
+
+/**
+ * A customer.
+ */
+@Entity
+@Table(name = "customers")
+public class Customer extends BaseEntity implements Serializable {
+  @Id
+  @GeneratedValue(strategy = GenerationType.IDENTITY)
+  private Long id;
+
+  @Column(nullable = false, length = 80)
+  private String name;
+
+  @OneToMany(mappedBy = "customer", cascade = {CascadeType.ALL})
+  private List<Order> orders = new ArrayList<>();
+
+  public Customer() {
+    super();
+  }
+
+  public Long getId() {
+    return id;
+  }
+
+  public void setName(final String name) {
+    if (name == null || name.isEmpty()) {
+      throw new IllegalArgumentException("name");
+    }
+    this.name = name.trim();
+  }
+
+  public int total(int... values) {
+    int sum = 0;
+    for (int value : values) sum += value;
+    for (int i = 0; i < orders.size(); i++) {
+      switch (orders.get(i).getStatus()) {
+        case OPEN: continue;
+        default: sum -= (int) orders.get(i).getTotal();
+      }
+    }
+    try (Stream<Order> stream = orders.stream()) {
+      stream.filter(o -> o.getTotal() > 0).map(Order::getId).count();
+    } catch (IllegalStateException | NullPointerException e) {
+      return -1;
+    }
+    return sum;
+  }
+
+  public enum Status { OPEN, CLOSED(1) { }; Status() {} Status(int code) {} }
+}
+'''
+
+TYPE_ANNOTATIONS = u'''public class OrderForm {
+  private List<@Valid Item> items;
+
+  private Map<String, @NotBlank String> labels;
+
+  private String @NonNull [] tags;
+
+  private java.util.@Nullable String note;
+
+  private Set<@Min(1) int @Size(max = 3) []> codes;
+
+  public <T extends @Valid Comparable<T>> void check(@Valid List<? extends @NotNull T> values)
+      throws @Critical IllegalStateException, java.io.IOException {
+    Object form = new @Valid OrderForm();
+  }
+}
+'''
+
+class TestParser(unittest.TestCase):
+  def test_compilation_unit(self):
+    unit = parse.parse(ENTITY)
+    customer = unit.types[0]
+
+    self.assertEqual(unit.package.name, 'com.example.demo.entity')
+    self.assertEqual([i.path for i in unit.imports], ['java.util.List', 'javax.persistence'])
+    self.assertEqual(customer.name, 'Customer')
+    self.assertEqual(customer.documentation, '/**\n * A customer.\n */')
+    self.assertEqual([a.name for a in customer.annotations], ['Entity', 'Table'])
+    self.assertEqual([f.declarators[0].name for f in customer.fields], ['id', 'name', 'orders'])
+    self.assertEqual(customer.fields[2].type.arguments[0].type.name, 'Order')
+    self.assertEqual(len(customer.constructor), 1)
+    self.assertEqual(customer.position, (11, 8))
+
+  def test_statements(self):
+    unit = parse.parse(ENTITY)
+    total = [m for m in unit.types[0].body if getattr(m, 'name', None) == 'total'][0]
+
+    self.assertTrue(total.parameters[0].varargs)
+    self.assertEqual([type(s) for s in total.body], [tree.LocalVariableDeclaration, tree.ForStatement,
+                                                     tree.ForStatement, tree.TryStatement, tree.ReturnStatement])
+    self.assertIsInstance(total.body[1].control, tree.EnhancedForControl)
+    self.assertEqual(total.body[3].catches[0].parameter.types, ['IllegalStateException', 'NullPointerException'])
+
+    references = [node for _, node in unit.filter(tree.MethodReference)]
+    self.assertEqual(references[0].method.member, 'getId')
+
+    lambdas = [node for _, node in unit.filter(tree.LambdaExpression)]
+    self.assertEqual(lambdas[0].parameters[0].name, 'o')
+
+  def test_expressions(self):
+    expression = parse.parse_expression('a + b * c')
+
+    self.assertEqual(expression.operator, '+')
+    self.assertEqual(expression.operandr.operator, '*')
+
+    expression = parse.parse_expression('x >>>= -(int) y')
+
+    self.assertEqual(expression.type, '>>>=')
+    self.assertEqual(expression.value.prefix_operators, ['-'])
+    self.assertIsInstance(expression.value.expression, tree.Cast)
+
+    expression = parse.parse_expression('(a) + b')
+
+    self.assertIsInstance(expression, tree.BinaryOperation)
+    self.assertIsInstance(expression.operandl, tree.ParenthesizedExpression)
+
+  def test_method_reference_types(self):
+    invocation = parse.parse_expression('items.toArray(String[]::new)')
+    reference = invocation.arguments[0]
+
+    self.assertIsInstance(reference, tree.MethodReference)
+    self.assertEqual((reference.expression.name, reference.expression.dimensions), ('String', [None]))
+    self.assertEqual(reference.method.member, 'new')
+
+    reference = parse.parse_expression('int[][]::new')
+    self.assertIsInstance(reference.expression, tree.BasicType)
+    self.assertEqual(len(reference.expression.dimensions), 2)
+
+    reference = parse.parse_expression('java.util.List<String>::size')
+    self.assertEqual(reference.expression.sub_type.sub_type.arguments[0].type.name, 'String')
+    self.assertEqual(reference.method.member, 'size')
+
+    self.assertIsInstance(parse.parse_expression('String::valueOf').expression, tree.MemberReference)
+    self.assertIsInstance(parse.parse_expression('int[].class'), tree.ClassReference)
+    self.assertEqual(parse.parse_expression('f(a < b, c > d)').arguments[1].operator, '>')
+
+  def test_precedence(self):
+    def sexp(node):
+      if isinstance(node, tree.BinaryOperation):
+        return '(%s %s %s)' % (node.operator, sexp(node.operandl), sexp(node.operandr))
+      return getattr(node, 'member', None) or getattr(node, 'name', None)
+
+    expression = parse.parse_expression('a || b && c | d ^ e & f == g < h << i + j * k - l / m || n')
+    self.assertEqual(sexp(expression), '(|| (|| a (&& b (| c (^ d (& e (== f (< g (<< h (- (+ i (* j k)) (/ l m)))))))))) n)')
+
+    expression = parse.parse_expression('a - b - c * d % e instanceof F == g')
+    self.assertEqual(sexp(expression), '(== (instanceof (- (- a b) (% (* c d) e)) F) g)')
+
+  def test_enum(self):
+    unit = parse.parse(ENTITY)
+    status = unit.types[0].body[-1]
+
+    self.assertEqual([c.name for c in status.body.constants], ['OPEN', 'CLOSED'])
+    self.assertEqual(len(status.body.declarations), 2)
+
+  def test_type_annotations(self):
+    declaration = parse.parse(TYPE_ANNOTATIONS).types[0]
+    items, labels, tags, note, codes = [field.type for field in declaration.fields]
+    check = declaration.body[-1]
+
+    def names(annotations):
+      return [annotation.name for annotation in annotations]
+
+    self.assertEqual(items.annotations, None)
+    self.assertEqual(names(items.arguments[0].type.annotations), ['Valid'])
+    self.assertEqual(names(labels.arguments[1].type.annotations), ['NotBlank'])
+    self.assertEqual(labels.arguments[0].type.annotations, None)
+    self.assertEqual([names(dimension) for dimension in tags.dimensions], [['NonNull']])
+    self.assertEqual(names(note.sub_type.sub_type.annotations), ['Nullable'])
+
+    code = codes.arguments[0].type
+    self.assertEqual((code.name, names(code.annotations)), ('int', ['Min']))
+    self.assertEqual(code.dimensions[0][0].element[0].name, 'max')
+
+    self.assertEqual(names(check.type_parameters[0].extends[0].annotations), ['Valid'])
+    self.assertEqual(names(check.parameters[0].annotations), ['Valid'])
+    self.assertEqual(names(check.parameters[0].type.arguments[0].type.annotations), ['NotNull'])
+    self.assertEqual(check.throws, ['IllegalStateException', 'java.io.IOException'])
+
+    creator, = [node for _, node in declaration.filter(tree.ClassCreator)]
+    self.assertEqual(names(creator.type.annotations), ['Valid'])
+
+  def test_syntax_error(self):
+    self.assertRaises(JavaSyntaxError, parse.parse, 'class A { void f() { int x = ; } }')
+    self.assertRaises(JavaSyntaxError, parse.parse, 'class A { void f() {')
+
+MODERN = u'''public sealed interface Shape permits Circle, Square {
+  double area();
+}
+
+public record Circle(double radius) implements Shape {
+  public Circle {
+    if (radius < 0) {
+      throw new IllegalArgumentException();
+    }
+  }
+
+  public double area() {
+    return Math.PI * radius * radius;
+  }
+}
+
+non-sealed class Square implements Shape {
+  int yield;
+
+  String describe(Object o) {
+    var record = yield;
+
+    if (o instanceof Circle c && c.radius() > 0) {
+      record++;
+    }
+
+    String query = """
+        SELECT * FROM "shape"
+        """;
+
+    int size = switch (o) {
+      case null, default -> 0;
+      case String s when s.isEmpty() -> 1;
+      case Circle(var radius) -> 2;
+      case Integer i -> {
+        yield i * 2;
+      }
+    };
+
+    switch (size) {
+      case 1, 2 -> record = 0;
+      case 3 -> throw new IllegalStateException();
+      default:
+        yield = 1;
+    }
+
+    return query;
+  }
+}
+'''
+
+class TestModernSyntax(unittest.TestCase):
+  def setUp(self):
+    self.unit = parse.parse(MODERN)
+
+  def nodes(self, node_type):
+    return [node for _, node in self.unit.filter(node_type)]
+
+  def test_declarations(self):
+    shape, circle, square = self.unit.types
+
+    self.assertEqual(shape.modifiers, set(['public', 'sealed']))
+    self.assertEqual([t.name for t in shape.permits], ['Circle', 'Square'])
+    self.assertIsInstance(circle, tree.RecordDeclaration)
+    self.assertEqual([(c.type.name, c.name) for c in circle.components], [('double', 'radius')])
+    self.assertEqual(circle.implements[0].name, 'Shape')
+    self.assertIsInstance(circle.body[0], tree.CompactConstructorDeclaration)
+    self.assertEqual(circle.body[0].position, (6, 10))
+    self.assertEqual(square.modifiers, set(['non-sealed']))
+
+  def test_switch(self):
+    expression, = self.nodes(tree.SwitchExpression)
+    rules = expression.cases
+
+    self.assertEqual([type(rule) for rule in rules], [tree.SwitchRule] * 4)
+    self.assertEqual(rules[0].case[1], 'default')
+    self.assertIsInstance(rules[1].case[0], tree.TypePattern)
+    self.assertIsInstance(rules[1].guard, tree.MethodInvocation)
+    self.assertIsInstance(rules[2].case[0], tree.RecordPattern)
+    self.assertIsInstance(rules[3].statements[0], tree.BlockStatement)
+    self.assertEqual(len(self.nodes(tree.YieldStatement)), 1)
+
+    statement, = self.nodes(tree.SwitchStatement)
+    self.assertEqual([len(case.case) for case in statement.cases], [2, 1, 1])
+    self.assertIsInstance(statement.cases[1].statements[0], tree.ThrowStatement)
+    self.assertEqual(type(statement.cases[2]), tree.SwitchStatementCase)
+
+  def test_patterns_and_names(self):
+    pattern = [node for node in self.nodes(tree.BinaryOperation) if node.operator == 'instanceof'][0].operandr
+
+    self.assertEqual((pattern.type.name, pattern.name), ('Circle', 'c'))
+    self.assertEqual([d.name for d in self.nodes(tree.VariableDeclarator)][:2], ['yield', 'record'])
+    self.assertTrue(any(l.value.startswith(u'"""') for l in self.nodes(tree.Literal)))
+
+class TestAccept(unittest.TestCase):
+  def test_token_classes(self):
+    parser = Parser(tokenizer.tokenize('public int x = 0x1F;'))
+
+    self.assertTrue(parser.would_accept(tokenizer.Keyword, tokenizer.BasicType, tokenizer.Identifier))
+    self.assertFalse(parser.would_accept(tokenizer.Identifier))
+    self.assertTrue(parser.try_accept(tokenizer.Modifier, 'int'))
+    self.assertEqual(parser.tokens.marker, 2)
+    self.assertEqual(parser.accept(tokenizer.Identifier, '='), '=')
+    self.assertTrue(parser.would_accept(tokenizer.Literal, ';'))
+    self.assertFalse(parser.would_accept(tokenizer.Literal, ';', ';'))
+
+  def test_errors(self):
+    for accepts, description in (((tokenizer.BasicType,), 'Expected BasicType'),
+                                 ((';',), "Expected ';'"),
+                                 ((tokenizer.Identifier, ';'), 'Unexpected end of input')):
+      parser = Parser(tokenizer.tokenize('x'))
+
+      with self.assertRaises(JavaSyntaxError) as context:
+        parser.accept(*accepts)
+
+      self.assertEqual(context.exception.description, description)
+
+BROKEN = u'''package com.example;
+
+import java.util.List;
+import static;
+
+public class Broken {
+  private Long id;
+
+  private int count = ;
+
+  public void save() {
+    if (id != null) {
+      store(id;
+    }
+  }
+
+  private String name;
+}
+
+public enum ;
+
+interface Repository {
+  void save(Broken broken);
+  int count(;
+}
+
+class Unclosed {
+  int x;
+'''
+
+class TestRecover(unittest.TestCase):
+  def test_partial_unit(self):
+    unit, errors = parse.parse_partial(BROKEN)
+
+    self.assertEqual([i.path for i in unit.imports], ['java.util.List'])
+    self.assertEqual([t.name for t in unit.types], ['Broken', 'Repository', 'Unclosed'])
+    self.assertEqual([d.declarators[0].name for d in unit.types[0].fields], ['id', 'name'])
+    self.assertEqual([type(d) for d in unit.types[0].body], [tree.FieldDeclaration, tree.FieldDeclaration])
+    self.assertEqual([m.name for m in unit.types[1].body], ['save'])
+    self.assertEqual(unit.types[2].fields[0].declarators[0].name, 'x')
+
+    self.assertEqual([(e.description, e.at.position) for e in errors], [
+      ('Expected Identifier', (4, 14)),
+      ('Expected expression', (9, 23)),
+      ("Expected ')'", (13, 15)),
+      ('Expected Identifier', (20, 13)),
+      ('Expected type', (24, 13)),
+      ('Unexpected end of input', (28, 8)),
+    ])
+
+  def test_unbalanced_brace_in_parentheses(self):
+    unit, errors = parse.parse_partial(u'''class A {
+  @Ann({1, 2) int z;
+  int y;
+}
+
+class B {
+  void f(int x) { g({x); }
+}
+
+class C {
+}
+''')
+
+    self.assertEqual([t.name for t in unit.types], ['A', 'B', 'C'])
+    self.assertEqual([d.declarators[0].name for d in unit.types[0].body], ['y'])
+    self.assertEqual(unit.types[1].body, [])
+    self.assertEqual([e.at.position for e in errors], [(2, 13), (7, 21)])
+
+  def test_no_errors(self):
+    unit, errors = parse.parse_partial(ENTITY)
+
+    self.assertEqual(errors, [])
+    self.assertEqual(repr(unit), repr(parse.parse(ENTITY)))
+
+  def test_raises_without_recover(self):
+    self.assertRaises(JavaSyntaxError, parse.parse, BROKEN)
+
+class TestMemo(unittest.TestCase):
+  def test_same_tree(self):
+    parser = Parser(tokenizer.tokenize(ENTITY), memoize=True)
+
+    self.assertEqual(repr(parser.parse()), repr(parse.parse(ENTITY)))
+    self.assertTrue(parser.memo_misses > 0)
+    self.assertEqual(parser.memo_hits, 0)
+
+  def test_counters(self):
+    parser = Parser(tokenizer.tokenize('(int) x'), memoize=True)
+
+    self.assertEqual(parser.speculate('parse_lambda_expression'), None)
+    self.assertEqual(parser.speculate('parse_lambda_expression'), None)
+    self.assertEqual(parser.tokens.marker, 0)
+
+    cast = parser.speculate('parse_cast')
+    parser.tokens.marker = 0
+
+    self.assertIs(parser.speculate('parse_cast'), cast)
+    self.assertEqual(parser.tokens.marker, 4)
+    self.assertEqual((parser.memo_hits, parser.memo_misses), (2, 2))
+
+if __name__ == "__main__":
+  unittest.main()
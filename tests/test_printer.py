@@ -0,0 +1,95 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from kuraddo.java import ast
+from kuraddo.java import parse
+from kuraddo.java import printer
+from kuraddo.java import tokenizer
+
+from tests.test_parser import ENTITY, MODERN
+
+def shape(unit):
+  for node in ast.walk_nodes(unit):
+    node._position = None
+
+  return ast.pack(unit)
+
+class Sink(object):
+  def __init__(self):
+    self.chunks = list()
+
+  def write(self, text):
+    self.chunks.append(text)
+
+class TestCodePrinter(unittest.TestCase):
+  def test_reformat_tokens(self):
+    for source in (ENTITY, MODERN):
+      for options in ({}, {'indent': '\t', 'brace_style': 'break'}, {'width': 40}):
+        text = tokenizer.reformat_tokens(tokenizer.tokenize(source), **options)
+
+        self.assertEqual(shape(parse.parse(text)), shape(parse.parse(source)))
+        self.assertFalse([line for line in text.splitlines() if line.endswith(' ')])
+
+  def test_layout(self):
+    code = u'/** Docs.\n  * More. */ class A { int f(int a) { for (;;) { g(a, 1); } } }'
+
+    self.assertEqual(tokenizer.reformat_tokens(tokenizer.tokenize(code), indent='  '),
+                     u'/** Docs.\n * More. */\nclass A {\n  int f(int a) {\n    for(; ; ) {\n      g(a, 1);\n    }\n  }\n}\n')
+    self.assertEqual(tokenizer.reformat_tokens(tokenizer.tokenize(code), brace_style='break', javadoc=False),
+                     u'class A\n{\n    int f(int a)\n    {\n        for(; ; )\n        {\n            g(a, 1);\n'
+                     u'        }\n    }\n}\n')
+    self.assertRaises(ValueError, printer.CodePrinter, brace_style='gnu')
+
+  def test_width(self):
+    text = tokenizer.reformat_tokens(tokenizer.tokenize(ENTITY), width=50)
+    lines = text.splitlines()
+
+    self.assertIn(u'        Customer extends BaseEntity implements', lines)
+    self.assertIn(u'                default : sum -= (int) orders.get(i)', lines)
+    self.assertIn(u'                        .getTotal();', lines)
+    self.assertLess(max(len(line) for line in lines), 60)
+
+  def test_chunks(self):
+    tokens = list(tokenizer.tokenize(ENTITY))
+    sink = Sink()
+
+    written = printer.print_tokens(iter(tokens), sink, chunk_size=64)
+    text = u''.join(sink.chunks)
+
+    self.assertEqual(text, tokenizer.reformat_tokens(tokens))
+    self.assertEqual(written, len(text))
+    self.assertGreater(len(sink.chunks), 10)
+    self.assertTrue(all(64 <= len(chunk) < 128 for chunk in sink.chunks[:-1]))
+
+  def test_chunk_sizes(self):
+    for source in (ENTITY, MODERN):
+      tokens = list(tokenizer.tokenize(source))
+
+      for options in ({}, {'indent': '\t', 'brace_style': 'break'}, {'width': 40}):
+        expected = tokenizer.reformat_tokens(tokens, **options)
+
+        for chunk_size in range(1, 21):
+          sink = Sink()
+          printer.print_tokens(tokens, sink, chunk_size=chunk_size, **options)
+
+          self.assertEqual(u''.join(sink.chunks), expected, (options, chunk_size))
+
+  def test_write_files(self):
+    directory = tempfile.mkdtemp()
+
+    try:
+      paths = [os.path.join(directory, 'A%d.java' % (i,)) for i in range(3)]
+      files = ((path, tokenizer.tokenize(u'class A%d { int x%d; }' % (i, i))) for i, path in enumerate(paths))
+
+      self.assertEqual(printer.write_files(files, indent='  ', newline='\r\n'), 3)
+
+      with io.open(paths[2], encoding='utf-8', newline='') as java_file:
+        self.assertEqual(java_file.read(), u'class A2 {\r\n  int x2;\r\n}\r\n')
+    finally:
+      shutil.rmtree(directory)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,277 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from kuraddo.java import tokenizer
+from kuraddo.java.parser import Parser
+
+SOURCE = u'''package com.example.demo;
+
+import java.util.*;
+import static java.lang.Math.max;
+
+/**
+ * A user entity.
+ * @author kuraddo
+ */
+@Entity(name = "users")
+public class User<T extends Comparable<T>> implements Serializable {
+  // line comment
+  private static final long serialVersionUID = 1L;
+  @Id @GeneratedValue private Long id;
+  private String descrição = "a\\"b\\\\c\\u0041";
+  private char c = '\\'';
+  int hex = 0xFF_FF, bin = 0b1010, oct = 0755, dec = 1_000, zero = 0;
+  double d = 1.5e-3d, e = .5f, f = 1., g = 0x1.8p1, h = 1e10, i = 2f;
+  /* block
+     comment */
+  public List<Map<String, T>> get(int... xs) {
+    x >>>= 2; y >>= 1; z = a >> b >>> c;
+    Runnable r = () -> System.out.println(this::toString);
+    return a != b && c <= d || !e ? f++ : --g;
+  }
+}
+'''
+
+def describe(tokens):
+  return [(type(token), token.value, token.position, token.javadoc) for token in tokens]
+
+class TestTokenizer(unittest.TestCase):
+  def test_tokens(self):
+    tokens = list(tokenizer.tokenize('int x = 0x1F;'))
+
+    self.assertEqual([type(t) for t in tokens], [tokenizer.BasicType, tokenizer.Identifier, tokenizer.Operator,
+                                                 tokenizer.HexInteger, tokenizer.Separator])
+    self.assertEqual([t.value for t in tokens], ['int', 'x', '=', '0x1F', ';'])
+    self.assertEqual(tokens[3].position, tokenizer.Position(1, 9))
+
+  def test_javadoc(self):
+    tokens = list(tokenizer.tokenize('/** Docs */ class A {}'))
+
+    self.assertEqual(tokens[0].javadoc, '/** Docs */')
+    self.assertEqual(tokens[1].javadoc, None)
+
+  def test_javadoc_modes(self):
+    code = u'/** Docs */ class A { /** ção */ int f; }'
+
+    for mode in tokenizer.JAVADOC_MODES:
+      streams = [tokenizer.tokenize(code, engine=engine, javadoc=mode) for engine in tokenizer.TOKENIZER_ENGINES]
+      streams.append(tokenizer.tokenize_buffer(code, javadoc=mode))
+      streams.append(tokenizer.BytesJavaTokenizer(code.encode('utf_8'), javadoc=mode).tokenize())
+
+      for tokens in streams:
+        tokens = list(tokens)
+
+        if mode == 'span':
+          self.assertEqual(tokens[0]._javadoc, (0, 11))
+
+        if mode == 'skip':
+          self.assertEqual([token.javadoc for token in tokens if token.javadoc], [])
+        else:
+          self.assertEqual(tokens[0].javadoc, u'/** Docs */')
+          self.assertEqual(tokens[0]._javadoc, u'/** Docs */')
+          self.assertEqual(tokens[3].javadoc, u'/** ção */')
+          self.assertEqual(tokens[4].javadoc, None)
+
+    self.assertRaises(ValueError, tokenizer.tokenize, code, javadoc='lazy')
+
+  def test_javadoc_span_with_escapes(self):
+    code = u'class A { String s = "\\u00e9\\u00e9\\u00e9"; /** Field \\u0064oc */ int x; }'
+    expected = [tokenizer.tokenize(code, engine=engine) for engine in tokenizer.TOKENIZER_ENGINES]
+    streams = [tokenizer.tokenize(code, engine=engine, javadoc='span') for engine in tokenizer.TOKENIZER_ENGINES]
+    streams.append(tokenizer.tokenize_buffer(code, javadoc='span'))
+
+    for tokens in expected + streams:
+      self.assertEqual([token.javadoc for token in tokens if token.javadoc], [u'/** Field doc */'])
+
+  def test_text_block(self):
+    code = u'String q = """\n  SELECT "name" FROM t\n  WHERE x = \\"""\n  """;'
+
+    for engine in tokenizer.TOKENIZER_ENGINES:
+      tokens = list(tokenizer.tokenize(code, engine=engine))
+
+      self.assertEqual(type(tokens[3]), tokenizer.String)
+      self.assertEqual(tokens[3].value, code[11:-1])
+      self.assertEqual(tokens[4].position, tokenizer.Position(4, 6))
+
+      self.assertRaises(tokenizer.LexerError, list, tokenizer.tokenize(u'String q = """abc""";', engine=engine))
+      self.assertRaises(tokenizer.LexerError, list, tokenizer.tokenize(u'String q = """\nabc', engine=engine))
+
+  def test_trivia(self):
+    code = SOURCE.replace(u'\\u0041', u'A') + u'\r\n  // last\t\n/* open'
+
+    java_tokenizers = [tokenizer.make_tokenizer(code, True, engine, trivia=True) for engine in tokenizer.TOKENIZER_ENGINES]
+    java_tokenizers.append(tokenizer.BytesJavaTokenizer(code.encode('utf_8'), True, trivia=True))
+    expected = describe(tokenizer.tokenize(code, ignore_errors=True))
+
+    for java_tokenizer in java_tokenizers:
+      tokens = list(java_tokenizer.tokenize())
+      trivia = [token for token in tokens if isinstance(token, tokenizer.Trivia)]
+      significant = [token for token in tokens if not isinstance(token, tokenizer.Trivia)]
+
+      self.assertEqual(u''.join(token.value for token in tokens), code)
+      self.assertEqual(describe(significant), expected)
+      self.assertEqual(trivia[-1].value, u'/* open')
+      self.assertTrue(isinstance(trivia[-1], tokenizer.Comment))
+
+  def test_unknown_engine(self):
+    self.assertRaises(ValueError, tokenizer.tokenize, 'class A {}', engine='lex')
+
+class TestLineMap(unittest.TestCase):
+  def test_position(self):
+    lines = tokenizer.LineMap(u'ab\ncd\n\nef')
+
+    self.assertEqual(lines.position(0), tokenizer.Position(1, 1))
+    self.assertEqual(lines.position(2), tokenizer.Position(1, 3))
+    self.assertEqual(lines.position(3), tokenizer.Position(2, 1))
+    self.assertEqual(lines.position(6), tokenizer.Position(3, 1))
+    self.assertEqual(lines.position(8), tokenizer.Position(4, 2))
+
+  def test_lazy_position(self):
+    tokens = list(tokenizer.tokenize('/* one\n two */\n  int x;'))
+
+    self.assertEqual(tokens[0]._position, None)
+    self.assertEqual(tokens[0].start, 17)
+    self.assertEqual(tokens[0].position, tokenizer.Position(3, 3))
+    self.assertEqual(tokens[2].position, tokenizer.Position(3, 8))
+
+class TestUnicodeEscapes(unittest.TestCase):
+  def test_no_escapes(self):
+    source = u'class A { String s = "\\n"; }'
+    java_tokenizer = tokenizer.JavaTokenizer(source)
+    list(java_tokenizer.tokenize())
+
+    self.assertIs(java_tokenizer.data, source)
+
+  def test_escapes(self):
+    source = u'String s = "A\\uuu0042";\n  \\u0069nt x;'
+    tokens = list(tokenizer.tokenize(source))
+
+    self.assertEqual(tokens[3].value, '"AB"')
+    self.assertEqual(tokens[4].position, tokenizer.Position(1, 23))
+    self.assertEqual(tokens[5].value, 'int')
+    self.assertEqual(tokens[5].position, tokenizer.Position(2, 3))
+    self.assertEqual(tokens[6].position, tokenizer.Position(2, 12))
+
+class TestTokenizeFile(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, 'User.java')
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def assertSameTokens(self, code, encoding, bom=b''):
+    with open(self.path, 'wb') as source_file:
+      source_file.write(bom + code.encode(encoding))
+
+    self.assertEqual(describe(tokenizer.tokenize_file(self.path)), describe(tokenizer.tokenize(code)))
+    self.assertEqual(describe(tokenizer.tokenize_file(self.path, buffer=True)), describe(tokenizer.tokenize(code)))
+
+  def test_encodings(self):
+    code = SOURCE.replace('\\u0041', 'A') + u' /** ção */ int ção_x = 1, $_ = 2;'
+
+    self.assertSameTokens(code, 'utf_8')
+    self.assertSameTokens(code, 'utf_8', b'\xef\xbb\xbf')
+    self.assertSameTokens(code, 'iso-8859-1')
+    self.assertSameTokens(code, 'utf_16')
+
+  def test_unicode_escapes(self):
+    self.assertSameTokens(SOURCE, 'utf_8')
+
+  def test_empty_file(self):
+    self.assertSameTokens(u'', 'utf_8')
+
+  def test_bytes_buffer(self):
+    code = u'class A { String s = "{é}"; void f() { g(\'}\'); { } } }'
+
+    with open(self.path, 'wb') as source_file:
+      source_file.write(code.encode('utf_8'))
+
+    tokens = tokenizer.tokenize_file(self.path, buffer=True)
+    values = [token.value for token in tokens]
+
+    self.assertEqual(values[12], '{')
+
+    self.assertIsInstance(tokens, tokenizer.BytesTokenBuffer)
+    self.assertEqual(tokens.value(6), u'"{é}"')
+    self.assertEqual(tokens.matching_brace(2), len(values) - 1)
+    self.assertEqual(tokens.matching_brace(12), len(values) - 2)
+
+  def test_detect_encoding(self):
+    self.assertEqual(tokenizer.detect_encoding(b'\xef\xbb\xbfclass'), ('utf_8', 3))
+    self.assertEqual(tokenizer.detect_encoding(u'ç'.encode('utf_8')[:1]), ('utf_8', 0))
+    self.assertEqual(tokenizer.detect_encoding(u'ção'.encode('iso-8859-1')), ('iso-8859-1', 0))
+
+class TestRegexTokenizer(unittest.TestCase):
+  def assertSameTokens(self, code):
+    expected = describe(tokenizer.tokenize(code))
+    actual = describe(tokenizer.tokenize(code, engine='regex'))
+
+    self.assertEqual(actual, expected)
+
+  def test_equivalence(self):
+    self.assertSameTokens(SOURCE)
+
+  def test_equivalence_unicode_identifiers(self):
+    self.assertSameTokens(u'int π = 3; String añoño = null; boolean été = true;')
+
+  def test_equivalence_operators(self):
+    self.assertSameTokens('a..b ... c->d::e >>>= f >>= g <<= h %= i ^ j | k & l ~m')
+
+  def test_errors(self):
+    tokens = tokenizer.tokenize('int # = 1;', engine='regex')
+    self.assertRaises(tokenizer.LexerError, list, tokens)
+
+    java_tokenizer = tokenizer.RegexJavaTokenizer('int # = 1; /* open', ignore_errors=True)
+    values = [token.value for token in java_tokenizer.tokenize()]
+
+    self.assertEqual(values, ['int', '=', '1', ';'])
+    self.assertEqual(len(java_tokenizer.errors), 2)
+
+class TestTokenBuffer(unittest.TestCase):
+  def test_same_tokens(self):
+    for engine in tokenizer.TOKENIZER_ENGINES:
+      tokens = tokenizer.tokenize_buffer(SOURCE, engine=engine)
+
+      self.assertEqual(describe(tokens), describe(tokenizer.tokenize(SOURCE)))
+
+  def test_lazy_tokens(self):
+    tokens = tokenizer.tokenize_buffer('List<String> names = new ArrayList<>();')
+
+    self.assertEqual(len(tokens), 13)
+    self.assertEqual(tokens.value(3), '>')
+    self.assertIs(tokens.token_type(2), tokenizer.Identifier)
+    self.assertEqual(tokens.tokens, {})
+
+    java_type = Parser(tokens).parse_type()
+
+    self.assertEqual(java_type.name, 'List')
+    self.assertEqual(java_type.arguments[0].type.name, 'String')
+    self.assertTrue(len(tokens.tokens) < len(tokens))
+    self.assertIs(tokens[0], tokens[0])
+
+  def test_streaming(self):
+    tokens = tokenizer.tokenize_stream(SOURCE)
+
+    self.assertEqual(len(tokens.kinds), 1)
+    self.assertEqual(tokens[4].value, describe(tokenizer.tokenize(SOURCE))[4][1])
+    self.assertEqual(len(tokens.kinds), 5)
+
+    tokens.release(4)
+    self.assertEqual(list(tokens.tokens), [4])
+    self.assertEqual(describe(tokens), describe(tokenizer.tokenize(SOURCE)))
+    self.assertRaises(IndexError, tokens.__getitem__, len(tokens))
+
+  def test_compact_tokens(self):
+    tokens = list(tokenizer.tokenize('public class Entity { private int id; }'))
+
+    self.assertFalse(hasattr(tokens[0], '__dict__'))
+    self.assertIs(tokens[0].value, sys.intern('public'))
+    self.assertIs(tokens[4].value, sys.intern('private'))
+    self.assertEqual(tokens[1].kind, tokenizer.Keyword.kind)
+
+if __name__ == "__main__":
+  unittest.main()
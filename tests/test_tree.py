@@ -0,0 +1,96 @@
+import io
+import unittest
+
+from kuraddo.java import ast
+from kuraddo.java import parse
+from kuraddo.java import tree
+
+from tests.test_parser import ENTITY
+
+def names(declarations):
+  return [declaration.name for declaration in declarations]
+
+class TestUnitIndex(unittest.TestCase):
+  def setUp(self):
+    self.unit = parse.parse(ENTITY)
+
+  def test_nodes(self):
+    index = self.unit.index
+
+    self.assertIs(self.unit.index, index)
+
+    for node_type in (tree.FieldDeclaration, tree.MethodDeclaration, tree.Declaration, tree.Primary, tree.Annotation,
+                      tree.AssertStatement):
+      expected = [node for _, node in self.unit.filter(node_type)]
+
+      self.assertEqual(index.nodes(node_type), expected, node_type.__name__)
+      self.assertIs(index.nodes(node_type), index.nodes(node_type))
+
+  def test_annotated(self):
+    index = self.unit.index
+
+    self.assertEqual(names(index.annotated('Entity')), ['Customer'])
+    self.assertEqual(index.annotated('Id'), [self.unit.types[0].fields[0]])
+    self.assertEqual(index.annotated('Column'), [self.unit.types[0].fields[1]])
+    self.assertEqual(index.annotated('javax.persistence.Column'), [])
+    self.assertEqual(index.annotated('Missing'), [])
+
+  def test_qualified_annotation(self):
+    unit = parse.parse(u'class A { @javax.persistence.Id Long id; @Id Long key; }')
+    fields = unit.types[0].fields
+
+    self.assertEqual(unit.index.annotated('javax.persistence.Id'), fields[:1])
+    self.assertEqual(unit.index.annotated('Id'), fields)
+
+  def test_invalidate(self):
+    index = self.unit.index
+
+    self.unit.types = self.unit.types[:1]
+    self.assertIsNot(self.unit.index, index)
+
+    index = self.unit.index
+    self.unit.types[0].body[0].annotations.pop()
+    self.assertIs(self.unit.index, index)
+
+    self.unit.invalidate_index()
+    self.assertEqual(self.unit.index.nodes(tree.TypeDeclaration), [self.unit.types[0]] + [
+      node for node in self.unit.types[0].body if isinstance(node, tree.TypeDeclaration)])
+
+  def test_changed_lists(self):
+    index = self.unit.index
+    added = parse.parse(u'@Entity class Added { @Id long id; }').types[0]
+
+    self.unit.types.append(added)
+    self.assertIsNot(self.unit.index, index)
+    self.assertEqual(self.unit.index.nodes(tree.ClassDeclaration)[-1], added)
+    self.assertEqual(self.unit.index.annotated('Entity')[-1], added)
+
+    field = self.unit.types[0].body[0]
+    del self.unit.types[0].body[0]
+    self.assertNotIn(field, self.unit.index.nodes(tree.FieldDeclaration))
+
+    self.unit.types[0].body.insert(0, field)
+    self.assertIs(self.unit.index.nodes(tree.FieldDeclaration)[0], field)
+
+    index = self.unit.index
+    self.unit.types[0].body[0] = self.unit.types[0].body[1]
+    self.assertIsNot(self.unit.index, index)
+
+    index = self.unit.index
+    self.assertIs(self.unit.index, index)
+
+  def test_dump(self):
+    self.unit.index.nodes(tree.Literal)
+    buffer = io.BytesIO()
+
+    ast.dump(self.unit, buffer)
+    buffer.seek(0)
+    loaded = ast.load(buffer)
+
+    self.assertIsNone(getattr(loaded, '_index', None))
+    self.assertEqual(repr(loaded), repr(self.unit))
+    self.assertEqual(loaded.position, self.unit.position)
+    self.assertEqual(len(loaded.index.nodes(tree.Literal)), len(self.unit.index.nodes(tree.Literal)))
+
+if __name__ == "__main__":
+  unittest.main()
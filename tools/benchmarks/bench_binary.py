@@ -0,0 +1,61 @@
+"""Size and speed of the binary tree format against pickle.
+
+  python -m tools.benchmarks.bench_binary [classes ...]
+
+Writes the tree of a generated file as a pickle of the nodes (what
+ast.dump did), as a pickle of ast.pack() (what the parse cache stored) and
+in the binary format, then loads each back. 'skip bodies' loads the binary
+form without method and constructor bodies, 'first type' reads only the
+first type declaration with binary.iter_type_declarations().
+"""
+import io
+import pickle
+import sys
+
+from kuraddo.java import ast
+from kuraddo.java import binary
+from kuraddo.java import parse
+from tools.benchmarks.common import best_of, generate_java_source
+
+def pickle_nodes(unit):
+  return pickle.dumps(unit, pickle.HIGHEST_PROTOCOL)
+
+def pickle_packed(unit):
+  return pickle.dumps(ast.pack(unit), pickle.HIGHEST_PROTOCOL)
+
+def unpickle_packed(data):
+  return ast.unpack(pickle.loads(data))
+
+FORMATS = [
+  ('pickle', pickle_nodes, pickle.loads),
+  ('pickle packed', pickle_packed, unpickle_packed),
+  ('binary', binary.dumps, binary.loads),
+]
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+
+  print('%8s %-14s %10s %10s %10s %12s %12s' % ('classes', 'format', 'bytes', 'dump', 'load', 'skip bodies',
+                                                'first type'))
+
+  for classes in sizes:
+    unit = parse.parse(generate_java_source(classes))
+
+    for name, dumps, loads in FORMATS:
+      data = dumps(unit)
+
+      assert ast.pack(loads(data)) == ast.pack(unit)
+
+      dump_time = best_of(lambda: dumps(unit), repeat=5)
+      load_time = best_of(lambda: loads(data), repeat=5)
+      line = '%8d %-14s %10d %8.2fms %8.2fms' % (classes, name, len(data), dump_time * 1000, load_time * 1000)
+
+      if loads is binary.loads:
+        skip_time = best_of(lambda: binary.loads(data, skip_bodies=True), repeat=5)
+        first_time = best_of(lambda: next(binary.iter_type_declarations(io.BytesIO(data))), repeat=5)
+        line += ' %10.2fms %10.2fms' % (skip_time * 1000, first_time * 1000)
+
+      print(line)
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
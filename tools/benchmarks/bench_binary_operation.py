@@ -0,0 +1,114 @@
+"""Long operator chains through Parser.build_binary_operation.
+
+  python -m tools.benchmarks.bench_binary_operation [terms ...]
+
+Compares the precedence climbing builder with the recursive one it
+replaced, on the flat parts lists of generated expressions (a toString()
+style concatenation and a mix of every precedence level), and checks that
+both build the same tree.
+"""
+import sys
+
+from kuraddo.java import tree
+from kuraddo.java.parser import Parser
+from kuraddo.java.tokenizer import tokenize
+from tools.benchmarks.common import best_of
+
+class RecursiveParser(Parser):
+  """build_binary_operation as it was: one rescan of the parts per
+  precedence level and a sliced copy per recursion."""
+  def build_binary_operation(self, parts, start_level=0):
+    if len(parts) == 1:
+      return parts[0]
+
+    operands = list()
+    operators = list()
+
+    i = 0
+
+    for level in range(start_level, len(self.operator_precedence)):
+      for j in range(1, len(parts) - 1, 2):
+        if parts[j] in self.operator_precedence[level]:
+          operand = self.build_binary_operation(parts[i:j], level + 1)
+          operator = parts[j]
+          i = j + 1
+
+          operands.append(operand)
+          operators.append(operator)
+
+      if operands:
+        break
+
+    operand = self.build_binary_operation(parts[i:], level + 1)
+    operands.append(operand)
+
+    operation = operands[0]
+
+    for operator, operandr in zip(operators, operands[1:]):
+      operation = tree.BinaryOperation(operandl=operation)
+      operation.operator = operator
+      operation.operandr = operandr
+
+    return operation
+
+MIXED_OPERATORS = ['+', '*', '-', '<<', '/', '&', '%', '==', '^', '|', '&&', '<', '||', '>>>', '!=']
+
+def concatenation(terms):
+  return ' + '.join('"f%d=" + f%d' % (i, i) for i in range(terms // 2))
+
+def mixed(terms):
+  parts = ['t0']
+
+  for i in range(1, terms):
+    parts.append(MIXED_OPERATORS[i % len(MIXED_OPERATORS)])
+    parts.append('t%d' % i)
+
+  return ' '.join(parts)
+
+def expression_parts(code):
+  parser = Parser(tokenize(code + ';'))
+  first = parser.parse_expression_3()
+
+  return [first] + parser.parse_expression_2_rest()
+
+def same_tree(a, b):
+  stack = [(a, b)]
+
+  while stack:
+    a, b = stack.pop()
+
+    if type(a) is not type(b):
+      return False
+
+    if isinstance(a, tree.BinaryOperation):
+      if a.operator != b.operator:
+        return False
+
+      stack.append((a.operandl, b.operandl))
+      stack.append((a.operandr, b.operandr))
+    elif a is not b:
+      return False
+
+  return True
+
+def main(*sizes):
+  sizes = sizes or (1000, 2000, 4000)
+  sys.setrecursionlimit(100000)
+
+  print('%-14s %6s %12s %12s %8s' % ('expression', 'terms', 'recursive', 'climbing', 'speedup'))
+
+  for terms in sizes:
+    for name, generate in (('concatenation', concatenation), ('mixed', mixed)):
+      parts = expression_parts(generate(terms))
+      recursive = RecursiveParser([])
+      climbing = Parser([])
+
+      assert same_tree(recursive.build_binary_operation(parts), climbing.build_binary_operation(parts))
+
+      before = best_of(lambda: recursive.build_binary_operation(parts), repeat=3)
+      after = best_of(lambda: climbing.build_binary_operation(parts), repeat=3)
+
+      print('%-14s %6d %10.2fms %10.2fms %7.1fx' % (name, len(parts) // 2 + 1, before * 1000, after * 1000, before / after))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,67 @@
+"""Adding a member to an existing file with cst.SourceFile against
+reprinting the whole file.
+
+  python -m tools.benchmarks.bench_cst [classes ...]
+
+Adds a getter to the last class of a generated file. 'reprint' tokenizes
+the edited source and prints it again with reformat_tokens(), the way a
+file was regenerated before; 'splice' reads the file into a skeleton
+SourceFile, inserts the member and writes it. The byte columns are what
+each writes to the file.
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from kuraddo.java import cst
+from kuraddo.java import tokenizer
+from tools.benchmarks.common import best_of, generate_java_source
+
+GETTER = u'''public int getQuantity() {
+  return quantity;
+}'''
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+  directory = tempfile.mkdtemp()
+  path = os.path.join(directory, 'Entities.java')
+
+  print('%8s %12s %12s %12s %12s' % ('classes', 'reprint', 'bytes', 'splice', 'bytes'))
+
+  try:
+    for classes in sizes:
+      source = generate_java_source(classes)
+
+      def reset():
+        with io.open(path, 'w', encoding='utf-8', newline='') as java_file:
+          java_file.write(source)
+
+      def reprint():
+        reset()
+        edited = source[:source.rindex(u'}')] + u'\n  ' + GETTER + u'\n}\n'
+        text = tokenizer.reformat_tokens(tokenizer.tokenize(edited)).encode('utf-8')
+
+        with open(path, 'wb') as java_file:
+          java_file.write(text)
+
+        return len(text)
+
+      def splice():
+        reset()
+        source_file = cst.SourceFile.read(path, skeleton=True)
+        source_file.insert_member(source_file.unit.types[-1], GETTER)
+
+        return source_file.write()
+
+      reprinted, spliced = reprint(), splice()
+      before = best_of(reprint, repeat=5)
+      after = best_of(splice, repeat=5)
+
+      print('%8d %10.2fms %12d %10.2fms %12d' % (classes, before * 1000, reprinted, after * 1000, spliced))
+  finally:
+    shutil.rmtree(directory)
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,46 @@
+"""Cost of an incremental re-parse against a full parse as the file grows.
+
+  python -m tools.benchmarks.bench_incremental [classes ...]
+
+Each edit is applied to the first class of the file and undone again, so
+the time covers two updates. 'rename' keeps the line count, 'insert' adds
+a line, which moves the shared line deltas of the declarations after it
+rather than the position of every later node.
+"""
+import sys
+
+from kuraddo.java import incremental
+from kuraddo.java import parse
+from tools.benchmarks.common import best_of, generate_java_source
+
+EDITS = [
+  ('rename', 'private String name;', 'private String fullName;'),
+  ('insert', 'private int quantity', 'private int count;\n  private int quantity'),
+  ('method body', 'total += items', 'total -= items'),
+]
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+
+  print('%8s %10s %12s' % ('classes', 'bytes', 'full parse') + ''.join(' %12s' % name for name, _, _ in EDITS))
+
+  for classes in sizes:
+    source = generate_java_source(classes)
+    full = best_of(lambda: parse.parse(source), repeat=3)
+    parser = incremental.IncrementalParser(source)
+    timings = []
+
+    for name, old, new in EDITS:
+      edited = source.replace(old, new, 1)
+
+      def edit():
+        parser.update(edited)
+        parser.update(source)
+
+      timings.append(best_of(edit, repeat=5) / 2)
+      assert parser.reparsed == 1
+
+    print('%8d %10d %10.2fms' % (classes, len(source), full * 1000) + ''.join(' %10.2fms' % (t * 1000) for t in timings))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,59 @@
+"""Model lookups through CompilationUnit.index.
+
+  python -m tools.benchmarks.bench_index [classes ...]
+
+Runs the lookups of a model extraction (entities, ids, columns, relations,
+fields, methods and constructors) on the tree of a generated file, once
+with a Node.filter() walk per lookup and once through the unit index. The
+index column includes building it; 'again' is a second extraction on the
+built index.
+"""
+import sys
+
+from kuraddo.java import parse
+from kuraddo.java import tree
+from tools.benchmarks.common import best_of, generate_java_source
+
+ANNOTATIONS = ('Entity', 'Table', 'Id', 'GeneratedValue', 'Column', 'OneToMany', 'ManyToOne')
+NODE_TYPES = (tree.ClassDeclaration, tree.FieldDeclaration, tree.MethodDeclaration, tree.ConstructorDeclaration)
+
+def filtered(unit):
+  found = []
+
+  for name in ANNOTATIONS:
+    found.append([node for _, node in unit.filter(tree.Declaration)
+                  if any(annotation.name == name for annotation in node.annotations or ())])
+
+  for node_type in NODE_TYPES:
+    found.append([node for _, node in unit.filter(node_type)])
+
+  return found
+
+def indexed(unit):
+  index = unit.index
+
+  return [index.annotated(name) for name in ANNOTATIONS] + [index.nodes(node_type) for node_type in NODE_TYPES]
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+
+  print('%8s %8s %12s %12s %12s %8s' % ('classes', 'lookups', 'filter', 'index', 'again', 'speedup'))
+
+  for classes in sizes:
+    unit = parse.parse(generate_java_source(classes))
+
+    assert filtered(unit) == indexed(unit)
+
+    def build():
+      unit.invalidate_index()
+      indexed(unit)
+
+    before = best_of(lambda: filtered(unit), repeat=5)
+    after = best_of(build, repeat=5)
+    again = best_of(lambda: indexed(unit), repeat=5)
+
+    print('%8d %8d %10.2fms %10.2fms %10.3fms %7.2fx' % (classes, len(ANNOTATIONS) + len(NODE_TYPES), before * 1000,
+                                                         after * 1000, again * 1000, before / after))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,98 @@
+"""Javadoc parsing of a documented project.
+
+  python -m tools.benchmarks.bench_javadoc [comments ...]
+
+Reads the description, params and return of field and accessor comments.
+'legacy' is the four pass parser javadoc.py had before and 'scan' the
+single pass scanner, both on texts that are all different. 'repeated' is
+the scanner on comments that, as in generated entities, repeat the same
+few texts, so most come from the cache. 'unread' only makes the blocks,
+as when the generator never looks at them.
+"""
+import re
+import sys
+
+from kuraddo.java import javadoc
+from tools.benchmarks.common import best_of
+
+blocks_re = re.compile('(^@)', re.MULTILINE)
+leading_space_re = re.compile(r'^\s*\*', re.MULTILINE)
+blocks_justify_re = re.compile(r'^\s*@', re.MULTILINE)
+
+def legacy_parse(raw):
+  s = raw.strip()
+
+  if not (s[:3] == '/**' and s[-2:] == '*/'):
+    raise ValueError('not a valid Javadoc comment')
+
+  s = leading_space_re.sub('', s.replace('\t', '    ')[3:-2].strip())
+  lines = s.rstrip().splitlines()
+
+  if lines:
+    common_indent = min(len(line) - len(line.lstrip()) for line in lines if line.strip())
+
+    if common_indent:
+      s = '\n'.join(line[common_indent:] for line in lines)
+  else:
+    s = ''
+
+  blocks = blocks_re.split(blocks_justify_re.sub('@', s))
+  doc = javadoc.DocBlock()
+
+  if blocks[0] != '@':
+    doc.description = blocks[0].strip()
+    blocks = blocks[2::2]
+  else:
+    blocks = blocks[1::2]
+
+  for block in blocks:
+    try:
+      tag, value = block.split(None, 1)
+    except ValueError:
+      tag, value = block, ''
+
+    doc.add_block(tag, value)
+
+  return doc
+
+TEMPLATES = [
+  u'/**\n   * The %s of the entity.\n   */',
+  u'/**\n   * Returns the %s.\n   *\n   * @return the %s\n   */',
+  u'/**\n   * Sets the %s.\n   *\n   * @param %s the new value\n   * @throws IllegalArgumentException if it is null\n   */',
+]
+
+NAMES = ['id', 'name', 'quantity', 'price', 'items', 'status', 'created', 'updated']
+
+def comments(count, repeated=False):
+  if repeated:
+    names = [NAMES[i // 3 % len(NAMES)] for i in range(count)]
+  else:
+    names = ['%s%d' % (NAMES[i // 3 % len(NAMES)], i) for i in range(count)]
+
+  return [TEMPLATES[i % 3].replace('%s', name) for i, name in enumerate(names)]
+
+def read(parse, texts):
+  return [(doc.description, doc.params, doc.return_doc) for doc in map(parse, texts)]
+
+def main(*counts):
+  counts = counts or (1000, 10000)
+
+  print('%8s %12s %12s %12s %12s' % ('comments', 'legacy', 'scan', 'repeated', 'unread'))
+
+  for count in counts:
+    texts = comments(count)
+    repeated = comments(count, repeated=True)
+
+    assert read(legacy_parse, texts) == read(javadoc.parse, texts)
+
+    def scan(texts):
+      javadoc.scan.cache_clear()
+      read(javadoc.parse, texts)
+
+    timings = [best_of(lambda: read(legacy_parse, texts)), best_of(lambda: scan(texts)),
+               best_of(lambda: scan(repeated)), best_of(lambda: list(map(javadoc.parse, texts)))]
+
+    print('%8d' % (count,) + ''.join(' %10.2fms' % (timing * 1000,) for timing in timings))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
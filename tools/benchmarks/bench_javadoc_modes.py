@@ -0,0 +1,67 @@
+"""Tokenizing and parsing a heavily documented file in each javadoc mode.
+
+  python -m tools.benchmarks.bench_javadoc_modes [classes ...]
+
+Every field, constructor and method of the generated file gets a Javadoc
+comment of a dozen lines. 'tokens' is the time to tokenize with the
+scanner and 'kB' the memory the token list holds; 'parse' parses the
+tokens, which reads the javadoc of every declaration.
+"""
+import re
+import sys
+import tracemalloc
+
+from kuraddo.java import tokenizer
+from kuraddo.java.parser import Parser
+from tools.benchmarks.common import best_of, generate_java_source
+
+JAVADOC = u'''/**
+   * Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do
+   * eiusmod tempor incididunt ut labore et dolore magna aliqua. Ut enim
+   * ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut
+   * aliquip ex ea commodo consequat.
+   *
+   * <p>Duis aute irure dolor in reprehenderit in voluptate velit esse
+   * cillum dolore eu fugiat nulla pariatur.
+   *
+   * @param value the value
+   * @return the result
+   * @throws IllegalStateException when it is not ready
+   */
+  '''
+
+# The first line of each member
+MEMBER = re.compile(r'(?<=\n\n)  (?=public |private |@)')
+
+def documented_source(classes):
+  return MEMBER.sub(lambda match: u'  ' + JAVADOC, generate_java_source(classes))
+
+def held_memory(function):
+  tracemalloc.start()
+  value = function()
+  held = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  del value
+
+  return held
+
+def main(*sizes):
+  sizes = sizes or (40, 160)
+
+  print('%8s %6s %12s %10s %12s' % ('classes', 'mode', 'tokens', 'kB', 'parse'))
+
+  for classes in sizes:
+    source = documented_source(classes)
+
+    for mode in tokenizer.JAVADOC_MODES:
+      tokens = lambda: list(tokenizer.tokenize(source, javadoc=mode))
+
+      tokenize_time = best_of(tokens, repeat=5)
+      memory = held_memory(tokens)
+      parse_time = best_of(lambda: Parser(tokenizer.tokenize(source, javadoc=mode)).parse(), repeat=3)
+
+      print('%8d %6s %10.2fms %10d %10.2fms' % (classes, mode, tokenize_time * 1000, memory // 1024,
+                                                parse_time * 1000))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
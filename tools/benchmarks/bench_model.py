@@ -0,0 +1,71 @@
+"""Modelling a project of one entity per file with model.extract_many().
+
+  python -m tools.benchmarks.bench_model [entities ...]
+
+'cold' parses every file, in this process for 'serial' and over the
+process pool for 'pool', and fills a fresh ParseCache. 'warm' models the
+same files again with all of them in the cache, loaded without method
+bodies. 'extract' is the time model.extract() takes over the already
+parsed units.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+from kuraddo.java import model
+from kuraddo.java import parse
+from kuraddo.java.cache import ParseCache
+from tools.benchmarks.common import ENTITY_TEMPLATE, best_of
+
+HEADER = u'package com.example.generated;\n\nimport java.util.*;\nimport javax.persistence.*;\n'
+
+def write_project(directory, entities):
+  for index in range(entities):
+    path = os.path.join(directory, 'entity', 'Entity%d.java' % (index,))
+
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+
+    with open(path, 'w') as source_file:
+      source_file.write(HEADER + ENTITY_TEMPLATE % {'index': index})
+
+def model_all(paths, workers, cache):
+  results = list(model.extract_many(paths, workers=workers, cache=cache))
+
+  assert all(result.error is None and len(result.entities) == 1 for result in results)
+
+def main(*counts):
+  counts = counts or (100, 400)
+
+  print('%8s %12s %12s %12s %12s' % ('entities', 'serial', 'pool', 'warm', 'extract'))
+
+  for count in counts:
+    directory = tempfile.mkdtemp()
+
+    try:
+      write_project(directory, count)
+      paths = list(model.java_files(directory))
+      caches = iter(range(1000))
+
+      def cold(workers):
+        cache = ParseCache(os.path.join(directory, '.cache%d' % (next(caches),)))
+        model_all(paths, workers, cache)
+
+      serial = best_of(lambda: cold(1), repeat=3)
+      pool = best_of(lambda: cold(None), repeat=3)
+
+      cache = ParseCache(os.path.join(directory, '.warm'))
+      model_all(paths, 1, cache)
+      warm = best_of(lambda: model_all(paths, 1, cache), repeat=5)
+
+      units = [result.unit for result in parse.parse_many(paths, workers=1)]
+      extract = best_of(lambda: [model.extract(unit) for unit in units], repeat=5)
+
+      print('%8d %10.2fms %10.2fms %10.2fms %10.2fms' % (count, serial * 1000, pool * 1000, warm * 1000,
+                                                         extract * 1000))
+    finally:
+      shutil.rmtree(directory)
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,84 @@
+"""Memory and construction time of AST nodes.
+
+  python -m tools.benchmarks.bench_nodes [classes ...]
+
+Compares the slotted node classes with a generated __init__ against node
+classes built the way they were: instance dicts filled by a loop over the
+keyword arguments. The trees of generated files are rebuilt with both from
+their packed form, which times node construction only, and the memory
+they hold is measured with tracemalloc.
+"""
+import sys
+import tracemalloc
+
+from kuraddo.java import ast
+from kuraddo.java import parse
+from kuraddo.java.tokenizer import Position
+from tools.benchmarks.common import best_of, generate_java_source
+
+def legacy_init(self, **kwargs):
+  values = kwargs.copy()
+
+  for attr_name in self.attrs:
+    value = values.pop(attr_name, None)
+    setattr(self, attr_name, value)
+
+  if values:
+    raise ValueError('Extraneous arguments')
+
+class LegacyNode(object):
+  __init__ = legacy_init
+  __repr__ = ast.Node.__repr__
+
+# Plain classes with an instance dict and the attrs of each node class
+LEGACY_TYPES = dict((name, type(name, (LegacyNode,), {'attrs': node_type.attrs}))
+                    for name, node_type in ast.MetaNode.node_types.items())
+
+def legacy_unpack(value):
+  if isinstance(value, tuple):
+    name, position, values = value
+    node_type = LEGACY_TYPES[name]
+    node = node_type(**dict(zip(node_type.attrs, [legacy_unpack(v) for v in values])))
+
+    if position is not None:
+      node._position = Position(*position)
+
+    return node
+  elif isinstance(value, list):
+    return [legacy_unpack(item) for item in value]
+
+  return value
+
+def allocated(unpack, packed):
+  tracemalloc.start()
+  try:
+    before = tracemalloc.get_traced_memory()[0]
+    unit = unpack(packed)
+    return unit, tracemalloc.get_traced_memory()[0] - before
+  finally:
+    tracemalloc.stop()
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+
+  print('%8s %8s %12s %12s %8s %10s %10s %8s' % ('classes', 'nodes', 'dict init', 'slots init', 'speedup', 'dict mem',
+                                                 'slots mem', 'saved'))
+
+  for classes in sizes:
+    packed = ast.pack(parse.parse(generate_java_source(classes)))
+    legacy, legacy_memory = allocated(legacy_unpack, packed)
+    unit, memory = allocated(ast.unpack, packed)
+
+    assert repr(legacy) == repr(unit)
+
+    nodes = sum(1 for _ in unit)
+    before = best_of(lambda: legacy_unpack(packed), repeat=5)
+    after = best_of(lambda: ast.unpack(packed), repeat=5)
+
+    print('%8d %8d %10.2fms %10.2fms %7.2fx %8.1fMB %8.1fMB %7.0f%%' % (classes, nodes, before * 1000, after * 1000,
+                                                                        before / after, legacy_memory / 1e6,
+                                                                        memory / 1e6,
+                                                                        100 - memory * 100.0 / legacy_memory))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
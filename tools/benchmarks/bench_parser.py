@@ -0,0 +1,109 @@
+"""Parse throughput with compiled token expectations.
+
+  python -m tools.benchmarks.bench_parser [classes ...]
+
+Compares accept(), would_accept() and try_accept() matching on token kind
+codes with the isinstance based versions they replaced, over the tokens of
+a generated file (tokenizing is not timed). Then profiles one parse with
+each and lists the number of predicate calls and the share of the profiled
+time spent in them.
+"""
+import cProfile
+import pstats
+import sys
+
+import tools.helper.py3x2.six as six
+
+from kuraddo.java.parser import JavaParserError, Parser
+from kuraddo.java.tokenizer import tokenize
+from tools.benchmarks.common import best_of, generate_java_source
+
+PREDICATES = ('accept', 'would_accept', 'try_accept')
+
+class IntrospectingParser(Parser):
+  """The predicates as they were: every argument is checked for being a
+  string or a token class on every call."""
+  def accept(self, *accepts):
+    last = None
+
+    if len(accepts) == 0:
+      raise JavaParserError("Missing acceptable values")
+
+    for accept in accepts:
+      try:
+        token = next(self.tokens)
+      except StopIteration:
+        self.illegal("Unexpected end of input")
+
+      if isinstance(accept, six.string_types) and (not token.value == accept):
+        self.illegal("Expected '%s'" % (accept,))
+      elif isinstance(accept, type) and not isinstance(token, accept):
+        self.illegal("Expected %s" % (accept.__name__,))
+
+      last = token
+
+    return last.value
+
+  def would_accept(self, *accepts):
+    if len(accepts) == 0:
+      raise JavaParserError("Missing acceptable values")
+
+    for i, accept in enumerate(accepts):
+      token = self.tokens.look(i)
+
+      if isinstance(accept, six.string_types) and (not token.value == accept):
+        return False
+      elif isinstance(accept, type) and not isinstance(token, accept):
+        return False
+
+    return True
+
+  def try_accept(self, *accepts):
+    if len(accepts) == 0:
+      raise JavaParserError("Missing acceptable values")
+
+    for i, accept in enumerate(accepts):
+      token = self.tokens.look(i)
+
+      if isinstance(accept, six.string_types) and (not token.value == accept):
+        return False
+      elif isinstance(accept, type) and not isinstance(token, accept):
+        return False
+    for i in range(0, len(accepts)):
+      next(self.tokens)
+
+    return True
+
+def predicate_share(parser_type, tokens):
+  profile = cProfile.Profile()
+  profile.runcall(lambda: parser_type(tokens).parse())
+  stats = pstats.Stats(profile).stats
+
+  total = sum(tt for _, _, tt, _, _ in stats.values())
+  predicates = sum(ct for (_, _, name), (_, _, _, ct, _) in stats.items() if name in PREDICATES)
+  calls = sum(nc for (_, _, name), (_, nc, _, _, _) in stats.items() if name in PREDICATES)
+
+  return calls, predicates / total
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+
+  print('%8s %8s %8s %12s %12s %8s %10s %10s' % ('classes', 'tokens', 'calls', 'introspect', 'compiled', 'speedup',
+                                                'share was', 'share now'))
+
+  for classes in sizes:
+    tokens = list(tokenize(generate_java_source(classes)))
+
+    assert repr(IntrospectingParser(tokens).parse()) == repr(Parser(tokens).parse())
+
+    before = best_of(lambda: IntrospectingParser(tokens).parse(), repeat=7)
+    after = best_of(lambda: Parser(tokens).parse(), repeat=7)
+    calls, share_before = predicate_share(IntrospectingParser, tokens)
+    _, share_after = predicate_share(Parser, tokens)
+
+    print('%8d %8d %8d %10.2fms %10.2fms %7.2fx %9.1f%% %9.1f%%' % (classes, len(tokens), calls, before * 1000,
+                                                                     after * 1000, before / after, share_before * 100,
+                                                                     share_after * 100))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
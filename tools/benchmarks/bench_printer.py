@@ -0,0 +1,110 @@
+"""Printing generated files with printer.write_files() against building
+each file as one string with the old reformat_tokens().
+
+  python -m tools.benchmarks.bench_printer [files ...]
+
+Each file is a generated source of 10 classes, tokenized lazily as it is
+printed. Peak is the largest amount of memory allocated while printing,
+as tracemalloc reports it.
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from kuraddo.java import printer
+from kuraddo.java.tokenizer import Identifier, Keyword, Literal, Operator, tokenize
+from tools.benchmarks.common import best_of, generate_java_source
+
+def legacy_reformat_tokens(tokens):
+  indent = 0
+  closed_block = False
+  ident_last = False
+
+  output = list()
+
+  for token in tokens:
+    if closed_block:
+      closed_block = False
+      indent -= 4
+
+      output.append('\n')
+      output.append(' ' * indent)
+      output.append('}')
+
+      if isinstance(token, (Literal, Keyword, Identifier)):
+        output.append('\n')
+        output.append(' ' * indent)
+
+    if token.value == '{':
+      indent += 4
+      output.append(' {\n')
+      output.append(' ' * indent)
+    elif token.value == '}':
+      closed_block = True
+    elif token.value == ',':
+      output.append(', ')
+    elif isinstance(token, (Literal, Keyword, Identifier)):
+      if ident_last:
+        output.append(' ')
+      ident_last = True
+      output.append(token.value)
+    elif isinstance(token, Operator):
+      output.append(' ' + token.value + ' ')
+    elif token.value == ';':
+      output.append(';\n')
+      output.append(' ' * indent)
+    else:
+      output.append(token.value)
+
+    ident_last = isinstance(token, (Literal, Keyword, Identifier))
+
+  if closed_block:
+    output.append('\n}')
+
+  output.append('\n')
+
+  return ''.join(output)
+
+def legacy_write_files(files):
+  for path, tokens in files:
+    text = legacy_reformat_tokens(tokens)
+
+    with io.open(path, 'w', encoding='utf-8') as java_file:
+      java_file.write(text)
+
+def peak_memory(function):
+  tracemalloc.start()
+  function()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+
+  return peak
+
+def main(*counts):
+  counts = counts or (10, 100)
+  source = generate_java_source(10)
+  directory = tempfile.mkdtemp()
+
+  def files(count):
+    return ((os.path.join(directory, 'Entities%d.java' % (i,)), tokenize(source)) for i in range(count))
+
+  print('%8s %12s %12s %12s %12s' % ('files', 'legacy', 'peak', 'streaming', 'peak'))
+
+  try:
+    for count in counts:
+      legacy = lambda: legacy_write_files(files(count))
+      streaming = lambda: printer.write_files(files(count))
+
+      before = best_of(legacy, repeat=3)
+      after = best_of(streaming, repeat=3)
+
+      print('%8d %10.2fms %10dkB %10.2fms %10dkB' % (count, before * 1000, peak_memory(legacy) // 1024,
+                                                    after * 1000, peak_memory(streaming) // 1024))
+  finally:
+    shutil.rmtree(directory)
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,36 @@
+"""Skeleton parse, which skips method bodies, against a full parse.
+
+  python -m tools.benchmarks.bench_skeleton [classes ...]
+
+The first pair of times is parse.parse() with tokenizing included, the
+second covers the parser alone over tokens made beforehand.
+"""
+import sys
+
+from kuraddo.java import parse
+from kuraddo.java.parser import Parser
+from kuraddo.java.tokenizer import tokenize, tokenize_buffer
+from tools.benchmarks.common import best_of, generate_java_source
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+
+  print('%8s %10s %12s %12s %8s %12s %12s %8s' % ('classes', 'bytes', 'full', 'skeleton', 'speedup',
+                                                 'parser full', 'skeleton', 'speedup'))
+
+  for classes in sizes:
+    source = generate_java_source(classes)
+    tokens = list(tokenize(source))
+    buffer = tokenize_buffer(source)
+
+    full = best_of(lambda: parse.parse(source), repeat=5)
+    skeleton = best_of(lambda: parse.parse(source, skeleton=True), repeat=5)
+    parser_full = best_of(lambda: Parser(tokens).parse(), repeat=5)
+    parser_skeleton = best_of(lambda: Parser(buffer, skeleton=True).parse(), repeat=5)
+
+    print('%8d %10d %10.2fms %10.2fms %7.1fx %10.2fms %10.2fms %7.1fx' % (
+      classes, len(source), full * 1000, skeleton * 1000, full / skeleton,
+      parser_full * 1000, parser_skeleton * 1000, parser_full / parser_skeleton))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,46 @@
+"""Tokens per second of the Java tokenizer engines on a large generated file.
+
+  python -m tools.benchmarks.bench_tokenizer [classes]
+"""
+import sys
+import unicodedata
+
+from kuraddo.java import tokenizer
+from tools.benchmarks.common import best_of, generate_java_source
+
+class UnicodedataTokenizer(tokenizer.JavaTokenizer):
+  """The scanner as it was before the ASCII identifier tables: one
+  unicodedata.category call per identifier character.
+  """
+  def is_java_identifier_start(self, c):
+    return unicodedata.category(c) in self.IDENT_START_CATEGORIES
+
+  def read_identifier(self):
+    self.j = self.i + 1
+
+    while self.j < len(self.data) and unicodedata.category(self.data[self.j]) in self.IDENT_PART_CATEGORIES:
+      self.j += 1
+
+    return tokenizer.KEYWORD_TYPES.get(self.data[self.i:self.j], tokenizer.Identifier)
+
+ENGINES = [
+  ('scanner (unicodedata)', UnicodedataTokenizer),
+  ('scanner (ascii tables)', tokenizer.JavaTokenizer),
+  ('regex', tokenizer.RegexJavaTokenizer),
+]
+
+def main(classes=500):
+  source = generate_java_source(classes)
+  count = sum(1 for _ in tokenizer.tokenize(source))
+
+  print('%d bytes, %d tokens' % (len(source), count))
+
+  baseline = None
+  for name, engine in ENGINES:
+    elapsed = best_of(lambda: sum(1 for _ in engine(source).tokenize()), repeat=3)
+    baseline = baseline or elapsed
+
+    print('%-24s %10.0f tokens/s  %5.2fx' % (name, count / elapsed, baseline / elapsed))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,42 @@
+"""Streaming type declarations against parsing the whole compilation unit.
+
+  python -m tools.benchmarks.bench_type_declarations [classes ...]
+
+Times parse.parse() and getting the first declaration from
+parse.iter_type_declarations(), and compares the peak memory (traced
+allocations) of parse.parse() with iterating over every declaration
+without keeping them.
+"""
+import sys
+import tracemalloc
+
+from kuraddo.java import parse
+from tools.benchmarks.common import best_of, generate_java_source
+
+def peak_memory(function):
+  tracemalloc.start()
+
+  try:
+    function()
+    return tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+
+  print('%8s %10s %12s %12s %12s %12s' % ('classes', 'bytes', 'parse', 'first', 'parse peak', 'stream peak'))
+
+  for classes in sizes:
+    source = generate_java_source(classes)
+
+    full = best_of(lambda: parse.parse(source), repeat=3)
+    first = best_of(lambda: next(parse.iter_type_declarations(source)), repeat=3)
+    full_peak = peak_memory(lambda: parse.parse(source))
+    stream_peak = peak_memory(lambda: sum(1 for _ in parse.iter_type_declarations(source)))
+
+    print('%8d %10d %10.2fms %10.2fms %10.1fMB %10.1fMB' % (classes, len(source), full * 1000, first * 1000,
+                                                           full_peak / 1e6, stream_peak / 1e6))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
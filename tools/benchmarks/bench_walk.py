@@ -0,0 +1,78 @@
+"""Tree traversal with walk_tree(), walk_nodes() and Node.filter().
+
+  python -m tools.benchmarks.bench_walk [classes ...]
+
+Compares the explicit stack walk_tree() and the path-less walk_nodes()
+with the recursive generator walk_tree() was, then filter() skipping the
+attrs that cannot hold the searched class with filter() over the full walk,
+on the tree of a generated file.
+"""
+import sys
+
+from kuraddo.java import ast
+from kuraddo.java import parse
+from kuraddo.java import tree
+from tools.benchmarks.common import best_of, generate_java_source
+
+FILTERED = (tree.FieldDeclaration, tree.MethodInvocation, tree.Annotation, tree.ReferenceType)
+
+def recursive_walk(root):
+  """walk_tree as it was."""
+  children = None
+
+  if isinstance(root, ast.Node):
+    yield (), root
+    children = root.children
+  else:
+    children = root
+
+  for child in children:
+    if isinstance(child, (ast.Node, list, tuple)):
+      for path, node in recursive_walk(child):
+        yield (root,) + path, node
+
+def full_filter(root, pattern):
+  """Node.filter as it was, for a class."""
+  for path, node in recursive_walk(root):
+    if isinstance(node, pattern):
+      yield path, node
+
+def consume(iterable):
+  for _ in iterable:
+    pass
+
+def main(*sizes):
+  sizes = sizes or (10, 40, 160)
+
+  print('%8s %8s %12s %12s %12s' % ('classes', 'nodes', 'recursive', 'walk_tree', 'walk_nodes'))
+  units = []
+
+  for classes in sizes:
+    unit = parse.parse(generate_java_source(classes))
+    units.append((classes, unit))
+
+    assert list(recursive_walk(unit)) == list(ast.walk_tree(unit))
+
+    recursive = best_of(lambda: consume(recursive_walk(unit)), repeat=5)
+    walk = best_of(lambda: consume(ast.walk_tree(unit)), repeat=5)
+    nodes = best_of(lambda: consume(ast.walk_nodes(unit)), repeat=5)
+
+    print('%8d %8d %10.2fms %10.2fms %10.2fms' % (classes, sum(1 for _ in ast.walk_nodes(unit)), recursive * 1000,
+                                                 walk * 1000, nodes * 1000))
+
+  print('')
+  print('%8s %-18s %8s %12s %12s %8s' % ('classes', 'filter', 'found', 'full walk', 'pruned', 'speedup'))
+
+  for classes, unit in units:
+    for node_type in FILTERED:
+      found = list(unit.filter(node_type))
+      assert found == list(full_filter(unit, node_type))
+
+      before = best_of(lambda: consume(full_filter(unit, node_type)), repeat=5)
+      after = best_of(lambda: consume(unit.filter(node_type)), repeat=5)
+
+      print('%8d %-18s %8d %10.2fms %10.2fms %7.2fx' % (classes, node_type.__name__, len(found), before * 1000,
+                                                        after * 1000, before / after))
+
+if __name__ == '__main__':
+  main(*[int(arg) for arg in sys.argv[1:]])
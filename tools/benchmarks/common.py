@@ -0,0 +1,84 @@
+import time
+
+ENTITY_TEMPLATE = u'''
+/**
+ * Entity number %(index)d.
+ *
+ * @author kuraddo
+ */
+@Entity
+@Table(name = "entity_%(index)d")
+public class Entity%(index)d implements Serializable {
+  private static final long serialVersionUID = %(index)dL;
+
+  @Id
+  @GeneratedValue(strategy = GenerationType.IDENTITY)
+  private Long id;
+
+  @Column(name = "name", nullable = false, length = 120)
+  private String name;
+
+  // Quantity kept in stock
+  private int quantity = 0x%(index)x;
+
+  private double price = %(index)d.5e-2;
+
+  @OneToMany(mappedBy = "entity%(index)d")
+  private List<Item%(index)d> items = new ArrayList<>();
+
+  public Entity%(index)d() {
+  }
+
+  public Long getId() {
+    return id;
+  }
+
+  public void setId(Long id) {
+    this.id = id;
+  }
+
+  public String getName() {
+    return name;
+  }
+
+  public void setName(String name) {
+    this.name = name;
+  }
+
+  public double total() {
+    double total = 0;
+    for (int i = 0; i < items.size(); i++) {
+      total += items.get(i).getPrice() * quantity - price / 2;
+    }
+    return total > 100 && quantity != 0 ? total : -1;
+  }
+
+  @Override
+  public String toString() {
+    return "Entity%(index)d{" + "id=" + id + ", name='" + name + "'" + ", quantity=" + quantity + "}";
+  }
+}
+'''
+
+def generate_java_source(classes=200):
+  """Return a compilation unit with the given number of entity classes."""
+  parts = [u'package com.example.generated;\n\nimport java.util.*;\nimport javax.persistence.*;\n']
+
+  for index in range(classes):
+    parts.append(ENTITY_TEMPLATE % {'index': index})
+
+  return u''.join(parts)
+
+def best_of(function, repeat=5):
+  """Run function repeat times and return the fastest wall time in seconds."""
+  best = None
+
+  for _ in range(repeat):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+
+    if best is None or elapsed < best:
+      best = elapsed
+
+  return best
@@ -8,7 +8,6 @@ import types
 
 import struct
 import io
-import StringIO
 
 PY2 = sys.version_info[0] == 2
 PY3 = sys.version_info[0] == 3
@@ -84,7 +83,7 @@ class MovedModule(_LazyDescr):
   def _resolve(self):
     return _import_module(self.mod)
   
-  def __getattribute__(self, attr):
+  def __getattr__(self, attr):
     _module = self._resolve()
     value = getattr(_module, attr)
     setattr(self, attr, value)
@@ -103,7 +102,7 @@ class _LazyModule(types.ModuleType):
   
   _moved_attributes = []
 
-class MovedAttribute(__LazyDescr):
+class MovedAttribute(_LazyDescr):
   def __init__(self, name, old_mod, new_mod, old_attr=None, new_attr=None):
     super(MovedAttribute, self).__init__(name)
 
@@ -117,7 +116,7 @@ class MovedAttribute(__LazyDescr):
           new_attr = name
         else:
           new_attr = old_attr
-      self.attr = old_attr
+      self.attr = new_attr
     else:
       self.mod = old_mod
       if old_attr is None:
@@ -615,7 +614,7 @@ else:
   
   iterbytes = functools.partial(itertools.imap, ord)
 
-  #import StringIO
+  import StringIO
   StringIO = BytesIO = StringIO.StringIO
 
   _assertCountEqual = "assertItemsEqual"